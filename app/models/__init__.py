@@ -9,8 +9,12 @@ from .user import User
 from .user_session import UserSession
 from .ativo import Ativo
 from .preco_diario import PrecoDiario
+from .cotacao_diaria import CotacaoDiaria
+from .validacao_ticker import ValidacaoTicker
 from .operacao import Operacao
 from .posicao import Posicao
+from .lote import Lote
+from .snapshot_posicao import SnapshotPosicao
 
 # Exportar todos los modelos y configuraciones
 __all__ = [
@@ -22,6 +26,10 @@ __all__ = [
     'UserSession',
     'Ativo',
     'PrecoDiario',
+    'CotacaoDiaria',
+    'ValidacaoTicker',
     'Operacao',
-    'Posicao'
+    'Posicao',
+    'Lote',
+    'SnapshotPosicao'
 ]
\ No newline at end of file
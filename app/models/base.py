@@ -33,6 +33,22 @@ def get_db():
     finally:
         db.close()
 
+def insert_upsert(session):
+    """
+    Devuelve la construcción insert con soporte de ON CONFLICT para el motor de la sesión
+    
+    Args:
+        session: Sesión de base de datos
+        
+    Returns:
+        Función insert del dialecto (PostgreSQL o SQLite)
+    """
+    if session.get_bind().dialect.name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert
+
 def remove_db_session():
     """Cierra y elimina la sesión de la base de datos del hilo actual."""
     SessionLocal.remove()
\ No newline at end of file
@@ -0,0 +1,35 @@
+"""
+Modelo CotacaoDiaria - Cotizaciones OHLCV Diarias Globales
+
+Este módulo define el modelo para almacenar las cotizaciones diarias
+(apertura, máximo, mínimo, cierre y volumen) de cada ticker. Los datos de
+mercado no dependen del usuario, por lo que se guardan una sola vez y se
+comparten entre todas las carteras.
+"""
+
+from sqlalchemy import Column, Integer, BigInteger, String, Date, DateTime, Numeric, UniqueConstraint
+from sqlalchemy.sql import func
+from .base import Base
+
+
+class CotacaoDiaria(Base):
+    """Modelo para cotizaciones OHLCV diarias compartidas entre usuarios"""
+    __tablename__ = "cotacoes_diarias"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    ticker = Column(String(10), nullable=False)
+    data = Column(Date, nullable=False)
+    abertura = Column(Numeric(12, 4))
+    maximo = Column(Numeric(12, 4))
+    minimo = Column(Numeric(12, 4))
+    fechamento = Column(Numeric(12, 4), nullable=False)
+    volume = Column(BigInteger, default=0)
+    
+    # Proveedor de origen (YAHOO_FINANCE, REPLAY, PRECOS_DIARIOS para datos migrados...)
+    fonte = Column(String(20))
+    atualizado_em = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # Una cotización única por ticker y fecha (el índice sirve también las consultas por rango)
+    __table_args__ = (
+        UniqueConstraint('ticker', 'data', name='unique_quote_per_ticker_date'),
+    )
@@ -0,0 +1,33 @@
+"""
+Modelo Lote - Lotes Abiertos de Compra
+
+Este módulo define el modelo para los lotes abiertos de cada posición: la
+cantidad que queda de cada compra y su precio de adquisición. Las ventas
+consumen los lotes desde el más antiguo (FIFO), de modo que una operación
+nueva solo modifica los lotes afectados.
+"""
+
+from sqlalchemy import Column, Integer, Date, Numeric, ForeignKey, Index
+from .base import Base
+
+
+class Lote(Base):
+    """Modelo para lotes abiertos de compra"""
+    __tablename__ = "lotes"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    ativo_id = Column(Integer, ForeignKey("ativos.id", ondelete="CASCADE"), nullable=False)
+    # Compra que abrió el lote
+    operacao_id = Column(Integer, ForeignKey("operacoes.id", ondelete="CASCADE"), nullable=False)
+    data = Column(Date, nullable=False)
+    # Cantidad que queda abierta y precio de adquisición
+    quantidade = Column(Integer, nullable=False)
+    preco = Column(Numeric(12, 4), nullable=False)
+    
+    # Multi-tenancy: Cada lote pertenece a un usuario
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    
+    # Lotes de una posición en orden FIFO
+    __table_args__ = (
+        Index('idx_lotes_posicao_fifo', 'user_id', 'ativo_id', 'data', 'id'),
+    )
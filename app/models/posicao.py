@@ -18,9 +18,13 @@ class Posicao(Base):
     ativo_id = Column(Integer, ForeignKey("ativos.id"), nullable=False)
     quantidade_total = Column(Integer, default=0)
     preco_medio = Column(Numeric(12, 4), default=0)
+    # Coste base de los lotes abiertos (ver Lote), mantenido de forma incremental
+    custo_total = Column(Numeric(16, 4), default=0)
     preco_atual = Column(Numeric(12, 4), default=0)
     resultado_dia = Column(Numeric(12, 4), default=0)
+    # Resultado no realizado (valor de mercado - coste base) y realizado en ventas
     resultado_acumulado = Column(Numeric(12, 4), default=0)
+    resultado_realizado = Column(Numeric(16, 4), default=0)
     
     # Multi-tenancy: Cada posición pertenece a un usuario
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
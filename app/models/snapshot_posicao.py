@@ -0,0 +1,35 @@
+"""
+Modelo SnapshotPosicao - Instantáneas Periódicas de Posiciones
+
+Este módulo define el modelo para las instantáneas de cada posición (cada N
+operaciones y al cerrar cada mes): cantidad, coste base, resultado realizado
+y lotes abiertos tras todas las operaciones hasta la fecha de la instantánea.
+Permiten reconstruir la posición en una fecha reproduciendo solo las
+operaciones posteriores a la instantánea más cercana.
+"""
+
+from sqlalchemy import Column, Integer, Date, Numeric, JSON, ForeignKey, UniqueConstraint
+from .base import Base
+
+
+class SnapshotPosicao(Base):
+    """Modelo para instantáneas de posiciones"""
+    __tablename__ = "snapshots_posicao"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    ativo_id = Column(Integer, ForeignKey("ativos.id", ondelete="CASCADE"), nullable=False)
+    # Incluye todas las operaciones del activo con fecha <= data
+    data = Column(Date, nullable=False)
+    quantidade = Column(Integer, nullable=False, default=0)
+    custo_total = Column(Numeric(16, 4), default=0)
+    resultado_realizado = Column(Numeric(16, 4), default=0)
+    # Lotes abiertos: [[operacao_id, "AAAA-MM-DD", quantidade, preco], ...]
+    lotes = Column(JSON)
+    
+    # Multi-tenancy: Cada instantánea pertenece a un usuario
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    
+    # Una instantánea por posición y fecha (el índice sirve la búsqueda de la más cercana)
+    __table_args__ = (
+        UniqueConstraint('user_id', 'ativo_id', 'data', name='unique_snapshot_per_position_date'),
+    )
@@ -0,0 +1,25 @@
+"""
+Modelo ValidacaoTicker - Cache Persistente de Validación de Tickers
+
+Este módulo define el modelo para guardar el resultado de validar un ticker
+contra el proveedor de datos de mercado, tanto si existe como si no. Las
+validaciones son globales: se comparten entre usuarios y sobreviven a los
+reinicios de la aplicación.
+"""
+
+from sqlalchemy import Column, String, Boolean, DateTime
+from sqlalchemy.sql import func
+from .base import Base
+
+
+class ValidacaoTicker(Base):
+    """Modelo para validaciones de tickers cacheadas (positivas y negativas)"""
+    __tablename__ = "validacoes_ticker"
+    
+    ticker = Column(String(20), primary_key=True)
+    
+    # True si el proveedor devolvió datos del ticker, False si no lo encontró
+    encontrado = Column(Boolean, nullable=False)
+    nome = Column(String(200))
+    fonte = Column(String(20))
+    validado_em = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -13,6 +13,7 @@ from typing import Dict, Any, List
 from app.utils.auth import StreamlitAuth, admin_required
 from app.services.user_service import UserService
 from app.services.auth_service import AuthService
+from app.services.cotacao_service import CotacaoService
 from app.utils.logging_config import get_logger
 
 logger = get_logger(__name__)
@@ -487,6 +488,11 @@ def show_system_tools():
     
     st.markdown("---")
     
+    # Estado del proveedor de datos de mercado
+    show_market_data_status()
+    
+    st.markdown("---")
+    
     # Configuración del sistema
     st.markdown("### ⚙️ Configuración del Sistema")
     
@@ -543,6 +549,48 @@ def show_system_tools():
         )
 
 
+def show_market_data_status():
+    """Estado del circuit breaker del proveedor de datos de mercado"""
+    
+    st.markdown("### 🌐 Proveedor de Datos de Mercado")
+    
+    circuito = CotacaoService.get_circuit_stats()
+    estados = {
+        'CLOSED': '🟢 Cerrado (operativo)',
+        'HALF_OPEN': '🟡 Semiabierto (probando)',
+        'OPEN': '🔴 Abierto (usando fallbacks)'
+    }
+    
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        st.metric("Circuito", estados.get(circuito['estado'], circuito['estado']))
+    
+    with col2:
+        st.metric(
+            "Fallos Consecutivos",
+            f"{circuito['falhas_consecutivas']} / {circuito['failure_threshold']}"
+        )
+    
+    with col3:
+        st.metric("Peticiones Rechazadas", circuito['total_rejeitadas'])
+    
+    with col4:
+        st.metric("Aperturas", circuito['aberturas'])
+    
+    if circuito['estado'] == 'OPEN':
+        st.warning(f"⏳ Nuevo intento contra el proveedor en {circuito['reabre_em_s']:.0f}s")
+    
+    if circuito['ultimo_erro']:
+        st.caption(f"Último error: {circuito['ultimo_erro']}")
+    
+    if circuito['estado'] != 'CLOSED':
+        if st.button("🔄 Cerrar Circuito", use_container_width=True):
+            CotacaoService.reset_circuit()
+            st.success("✅ Circuito cerrado")
+            st.rerun()
+
+
 def export_users_data():
     """Exporta datos de usuarios a CSV"""
     
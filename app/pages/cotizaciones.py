@@ -25,26 +25,28 @@ def show_cotizaciones_page():
     st.markdown("---")
     
     data_cotacoes = []
+    with st.spinner(f"Obteniendo cotizaciones de {len(ativos)} valores..."):
+        cotacoes = CotacaoService.obter_cotacoes_lote([ativo.ticker for ativo in ativos])
+    
     for ativo in ativos:
-        with st.spinner(f"Obteniendo {ativo.ticker}..."):
-            cotacao = CotacaoService.obter_cotacao_atual(ativo.ticker)
-            if cotacao:
-                # Determinar color para la variación
-                color = "🟢" if cotacao['variacao_dia'] >= 0 else "🔴"
-                
-                data_cotacoes.append({
-                    'Ticker': cotacao['ticker'],
-                    'Precio Actual': f"${cotacao['preco_atual']:.2f}",
-                    'Apertura': f"${cotacao['abertura']:.2f}",
-                    'Cierre Anterior': f"${cotacao['fechamento_anterior']:.2f}",
-                    'Variación': f"{color} ${cotacao['variacao_dia']:.2f}",
-                    'Variación %': f"{cotacao['variacao_pct']:.2f}%",
-                    'Volumen': f"{cotacao['volume']:,}",
-                    'Fuente': cotacao.get('fonte', 'N/A')
-                })
-                
-                # Guardar precio diario
-                CotacaoService.salvar_preco_diario(ativo.id, ativo.ticker)
+        cotacao = cotacoes.get(ativo.ticker)
+        if cotacao:
+            # Determinar color para la variación
+            color = "🟢" if cotacao['variacao_dia'] >= 0 else "🔴"
+            
+            data_cotacoes.append({
+                'Ticker': cotacao['ticker'],
+                'Precio Actual': f"${cotacao['preco_atual']:.2f}",
+                'Apertura': f"${cotacao['abertura']:.2f}",
+                'Cierre Anterior': f"${cotacao['fechamento_anterior']:.2f}",
+                'Variación': f"{color} ${cotacao['variacao_dia']:.2f}",
+                'Variación %': f"{cotacao['variacao_pct']:.2f}%",
+                'Volumen': f"{cotacao['volume']:,}",
+                'Fuente': cotacao.get('fonte', 'N/A')
+            })
+    
+    # Guardar los precios diarios reutilizando las cotizaciones obtenidas (un único upsert)
+    CotacaoService.salvar_precos_diarios([(ativo.id, cotacoes.get(ativo.ticker)) for ativo in ativos])
     
     if data_cotacoes:
         df_cotacoes = pd.DataFrame(data_cotacoes)
@@ -58,7 +60,9 @@ def show_cotizaciones_page():
             
             fuente_info = {
                 'YAHOO_FINANCE': '🌐 Yahoo Finance (tiempo real)',
+                'REPLAY': '📼 Datos grabados (proveedor de reproducción)',
                 'CACHE_LOCAL': '⚡ Cache local (actualizado)',
+                'CACHE_STALE': '⏳ Cache local (actualizándose en segundo plano)',
                 'BD_FALLBACK': '💾 Base de datos (fallback)',
                 'VALOR_PADRAO': '⚠️ Valor por defecto (sin conexión)'
             }
@@ -80,7 +84,9 @@ def show_cotizaciones_page():
     """)
     
     # Mostrar estadísticas de cache si hay datos
-    if hasattr(CotacaoService, 'cotizacoes_cache'):
-        cache_items = len(getattr(CotacaoService, 'cotizacoes_cache', {}))
-        if cache_items > 0:
-            st.sidebar.info(f"📊 Cache: {cache_items} cotizaciones almacenadas")
\ No newline at end of file
+    cache_stats = CotacaoService.get_cache_stats()
+    if cache_stats['total_entries'] > 0:
+        st.sidebar.info(
+            f"📊 Cache: {cache_stats['total_entries']} cotizaciones almacenadas "
+            f"({cache_stats['cache_size_kb']} KB, {cache_stats.get('hit_rate', 0)}% aciertos)"
+        )
@@ -247,7 +247,7 @@ def show_historico_page():
     st.markdown("---")
     st.info("""
     💡 **Información sobre el histórico:**
-    - Los datos provienen de Yahoo Finance
+    - Los datos provienen del proveedor de mercado y se guardan en la base de datos compartida
     - Los gráficos de velas muestran apertura, máximo, mínimo y cierre
     - La volatilidad se calcula como la desviación estándar anualizada
     - MA20/MA50: Medias móviles de 20 y 50 días respectivamente
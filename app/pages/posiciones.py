@@ -7,7 +7,7 @@ resultados, rentabilidades y métricas de performance.
 
 import streamlit as st
 import pandas as pd
-from ..services import AtivoService, PosicaoService
+from ..services import PosicaoService
 
 
 def show_posiciones_page():
@@ -23,11 +23,11 @@ def show_posiciones_page():
     
     st.markdown("---")
     
-    # Obtener resumen del portfolio
-    resumo = PosicaoService.obter_resumo_portfolio()
-    posicoes = PosicaoService.listar_posicoes()
+    # Valoración del portfolio (resumen, detalle y análisis salen de la misma pasada)
+    avaliacao = PosicaoService.obter_avaliacao()
+    resumo = avaliacao.resumo()
     
-    if posicoes:
+    if len(avaliacao):
         # Resumen general del portfolio
         st.subheader("💰 Resumen del Portfolio")
         
@@ -65,79 +65,48 @@ def show_posiciones_page():
         
         st.markdown("---")
         
-        # Tabla detallada de posiciones
+        # Tabla detallada de posiciones (ordenada por resultado acumulado, mejores primero)
         st.subheader("📋 Detalle de Posiciones")
         
         data_pos = []
-        ativos = AtivoService.listar_ativos(apenas_ativos=False)  # Incluir inactivos para histórico
-        
-        for pos in posicoes:
-            ativo = next((a for a in ativos if a.id == pos.ativo_id), None)
-            
-            if ativo:
-                financeiro_compra = float(pos.quantidade_total) * float(pos.preco_medio)
-                financeiro_atual = float(pos.quantidade_total) * float(pos.preco_atual)
-                rentabilidad = (float(pos.resultado_acumulado) / financeiro_compra * 100) if financeiro_compra > 0 else 0
-                
-                # Íconos para resultados
-                resultado_icon = "🟢" if float(pos.resultado_acumulado) >= 0 else "🔴"
-                dia_icon = "📈" if float(pos.resultado_dia) >= 0 else "📉"
-                
-                data_pos.append({
-                    'Ticker': ativo.ticker,
-                    'Nombre': ativo.nome or ativo.ticker,
-                    'Cantidad': f"{pos.quantidade_total:,}",
-                    'Precio Medio': f"${float(pos.preco_medio):.2f}",
-                    'Precio Actual': f"${float(pos.preco_atual):.2f}",
-                    'Invertido': f"${financeiro_compra:,.2f}",
-                    'Valor Actual': f"${financeiro_atual:,.2f}",
-                    'Resultado Día': f"{dia_icon} ${float(pos.resultado_dia):,.2f}",
-                    'Resultado Total': f"{resultado_icon} ${float(pos.resultado_acumulado):,.2f}",
-                    'Rentabilidad': f"{rentabilidad:.2f}%",
-                    'Estado': '✅ Activo' if ativo.ativo else '⏸️ Inactivo'
-                })
-        
-        if data_pos:
-            df_pos = pd.DataFrame(data_pos)
-            
-            # Ordenar por resultado acumulado (mejores primero)
-            df_pos['_resultado_sort'] = [float(pos.resultado_acumulado) for pos in posicoes]
-            df_pos = df_pos.sort_values('_resultado_sort', ascending=False)
-            df_pos = df_pos.drop('_resultado_sort', axis=1)
-            
-            st.dataframe(df_pos, use_container_width=True)
-            
-            # Análisis adicional
-            st.markdown("---")
-            st.subheader("📊 Análisis del Portfolio")
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                # Top performers
-                posicoes_ordenadas = sorted(posicoes, key=lambda p: float(p.resultado_acumulado), reverse=True)
-                
-                st.markdown("**🏆 Mejores Performers:**")
-                for i, pos in enumerate(posicoes_ordenadas[:3]):
-                    ativo = next((a for a in ativos if a.id == pos.ativo_id), None)
-                    if ativo:
-                        financeiro_compra = float(pos.quantidade_total) * float(pos.preco_medio)
-                        rentabilidad = (float(pos.resultado_acumulado) / financeiro_compra * 100) if financeiro_compra > 0 else 0
-                        
-                        medal = ["🥇", "🥈", "🥉"][i]
-                        st.write(f"{medal} **{ativo.ticker}**: {rentabilidad:.2f}% (${float(pos.resultado_acumulado):,.2f})")
+        for pos in avaliacao.posicoes():
+            # Íconos para resultados
+            resultado_icon = "🟢" if pos['resultado_acumulado'] >= 0 else "🔴"
+            dia_icon = "📈" if pos['resultado_dia'] >= 0 else "📉"
             
-            with col2:
-                # Distribución del portfolio
-                st.markdown("**💼 Distribución por Valor:**")
-                
-                for pos in sorted(posicoes, key=lambda p: float(p.quantidade_total) * float(p.preco_atual), reverse=True)[:5]:
-                    ativo = next((a for a in ativos if a.id == pos.ativo_id), None)
-                    if ativo:
-                        valor_atual = float(pos.quantidade_total) * float(pos.preco_atual)
-                        porcentaje = (valor_atual / resumo['valor_atual_portfolio'] * 100) if resumo['valor_atual_portfolio'] > 0 else 0
-                        
-                        st.write(f"📊 **{ativo.ticker}**: {porcentaje:.1f}% (${valor_atual:,.2f})")
+            data_pos.append({
+                'Ticker': pos['ticker'],
+                'Nombre': pos['nome'],
+                'Cantidad': f"{pos['quantidade_total']:,}",
+                'Precio Medio': f"${pos['preco_medio']:.2f}",
+                'Precio Actual': f"${pos['preco_atual']:.2f}",
+                'Invertido': f"${pos['investido']:,.2f}",
+                'Valor Actual': f"${pos['valor_atual']:,.2f}",
+                'Resultado Día': f"{dia_icon} ${pos['resultado_dia']:,.2f}",
+                'Resultado Total': f"{resultado_icon} ${pos['resultado_acumulado']:,.2f}",
+                'Rentabilidad': f"{pos['rentabilidade']:.2f}%",
+                'Estado': '✅ Activo' if pos['ativo'] else '⏸️ Inactivo'
+            })
+        
+        st.dataframe(pd.DataFrame(data_pos), use_container_width=True)
+        
+        # Análisis adicional
+        st.markdown("---")
+        st.subheader("📊 Análisis del Portfolio")
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            # Top performers
+            st.markdown("**🏆 Mejores Performers:**")
+            for medal, pos in zip(["🥇", "🥈", "🥉"], avaliacao.melhores(3)):
+                st.write(f"{medal} **{pos['ticker']}**: {pos['rentabilidade']:.2f}% (${pos['resultado_acumulado']:,.2f})")
+        
+        with col2:
+            # Distribución del portfolio
+            st.markdown("**💼 Distribución por Valor:**")
+            for pos in avaliacao.distribuicao(5):
+                st.write(f"📊 **{pos['ticker']}**: {pos['peso']:.1f}% (${pos['valor_atual']:,.2f})")
         
         # Información adicional
         st.markdown("---")
@@ -153,12 +122,12 @@ def show_posiciones_page():
         if st.button("💾 Guardar Precios Diarios", help="Guarda los precios actuales en la base de datos para históricos"):
             from ..services import CotacaoService
             
-            guardados = 0
-            for pos in posicoes:
-                ativo = next((a for a in ativos if a.id == pos.ativo_id), None)
-                if ativo:
-                    if CotacaoService.salvar_preco_diario(ativo.id, ativo.ticker):
-                        guardados += 1
+            cotacoes = CotacaoService.obter_cotacoes_lote(avaliacao.tickers)
+            
+            guardados = CotacaoService.salvar_precos_diarios([
+                (int(ativo_id), cotacoes.get(ticker))
+                for ativo_id, ticker in zip(avaliacao.ativo_ids, avaliacao.tickers)
+            ])
             
             st.success(f"✅ Precios guardados para {guardados} activos")
         
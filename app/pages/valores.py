@@ -8,6 +8,7 @@ desactivar y reactivar valores.
 import streamlit as st
 import pandas as pd
 from ..services import AtivoService
+from ..utils.symbol_master import get_symbol_master
 
 
 def show_valores_page():
@@ -18,10 +19,25 @@ def show_valores_page():
     
     with col1:
         st.subheader("➕ Añadir Nuevo Valor")
+        busca = st.text_input("Ticker o nombre (ej: AAPL, Apple, Microsoft)", max_chars=50, key="busca_nuevo_ativo")
+        
+        # Autocompletado desde el maestro de símbolos en memoria (sin red)
+        sugestoes = get_symbol_master().buscar(busca, limite=10) if busca.strip() else []
+        if sugestoes:
+            escolha = st.selectbox(
+                "Sugerencias",
+                sugestoes,
+                format_func=lambda s: f"{s['ticker']} - {s['nome']}" + (f" ({s['bolsa']}, {s['moeda']})" if s['bolsa'] else "")
+            )
+            ticker_input = escolha['ticker']
+            nome_sugerido = escolha['nome']
+        else:
+            ticker_input = busca.strip()[:10]
+            nome_sugerido = ""
+        
         with st.form("form_nuevo_ativo"):
-            ticker_input = st.text_input("Ticker (ej: AAPL, MSFT, GOOGL)", max_chars=10)
-            nome_input = st.text_input("Nombre (opcional)")
-            submitted = st.form_submit_button("Añadir Valor")
+            nome_input = st.text_input("Nombre (opcional)", value=nome_sugerido)
+            submitted = st.form_submit_button(f"Añadir {ticker_input.upper()}" if ticker_input else "Añadir Valor")
             
             if submitted and ticker_input:
                 if AtivoService.adicionar_ativo(ticker_input, nome_input):
@@ -0,0 +1,83 @@
+"""
+Módulo de Proveedores de Datos de Mercado
+
+Este módulo contiene la interfaz MarketDataProvider y sus implementaciones.
+El proveedor activo se selecciona con la variable MARKET_DATA_PROVIDER.
+"""
+
+import threading
+from datetime import date
+from typing import Optional
+from ..utils import Config
+from .base import MarketDataProvider, ProviderUnavailableError, montar_cotacao
+from .replay import ReplayProvider, gravar_historicos
+
+_provider: Optional[MarketDataProvider] = None
+_provider_lock = threading.Lock()
+
+
+def criar_provider(nome: str) -> MarketDataProvider:
+    """
+    Crea un proveedor de datos de mercado por nombre
+
+    Args:
+        nome: 'yahoo' o 'replay'
+
+    Returns:
+        MarketDataProvider: Proveedor configurado
+
+    Raises:
+        ValueError: Si el proveedor no existe
+    """
+    nome = nome.lower().strip()
+    if nome == 'yahoo':
+        # Import diferido: el proveedor de reproducción no necesita yfinance
+        from .yahoo import YahooFinanceProvider
+        return YahooFinanceProvider()
+    if nome == 'replay':
+        provider_config = Config.get_market_data_config()
+        data_referencia = provider_config['replay_as_of']
+        return ReplayProvider(
+            diretorio=provider_config['replay_data_dir'],
+            data_referencia=date.fromisoformat(data_referencia) if data_referencia else None,
+            latencia_ms=provider_config['replay_latency_ms']
+        )
+    raise ValueError(f"Proveedor de datos de mercado desconocido: {nome}")
+
+
+def get_provider() -> MarketDataProvider:
+    """
+    Obtiene el proveedor de datos de mercado configurado (instancia compartida)
+
+    Returns:
+        MarketDataProvider: Proveedor seleccionado en Config.MARKET_DATA_PROVIDER
+    """
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = criar_provider(Config.MARKET_DATA_PROVIDER)
+        return _provider
+
+
+def set_provider(provider: MarketDataProvider):
+    """
+    Sustituye el proveedor compartido (benchmarks y pruebas)
+
+    Args:
+        provider: Proveedor a usar a partir de ahora
+    """
+    global _provider
+    with _provider_lock:
+        _provider = provider
+
+
+__all__ = [
+    'MarketDataProvider',
+    'ProviderUnavailableError',
+    'ReplayProvider',
+    'montar_cotacao',
+    'gravar_historicos',
+    'criar_provider',
+    'get_provider',
+    'set_provider'
+]
@@ -0,0 +1,141 @@
+"""
+Interfaz de Proveedores de Datos de Mercado
+
+Este módulo define la interfaz común que deben implementar los proveedores de
+datos de mercado (cotizaciones, histórico OHLCV e información del símbolo),
+de modo que los servicios no dependan de una fuente concreta.
+"""
+
+from abc import ABC, abstractmethod
+from datetime import date
+from typing import Dict, List, Optional
+import pandas as pd
+
+
+class ProviderUnavailableError(Exception):
+    """El proveedor respondió sin datos para ninguno de los tickers pedidos"""
+
+
+class MarketDataProvider(ABC):
+    """Proveedor de datos de mercado"""
+
+    # Identificador del proveedor (se usa como 'fonte' de las cotizaciones y en las claves de cache)
+    nome: str = ''
+
+    @abstractmethod
+    def obter_historicos(self, tickers: List[str], dias: int = 5,
+                         inicio: Optional[date] = None, fim: Optional[date] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Obtiene el histórico OHLCV reciente de varios tickers en una sola petición
+
+        Args:
+            tickers: Lista de símbolos de ticker
+            dias: Número de días de histórico (si no se indica inicio)
+            inicio: Primera fecha del rango (incluida); tiene prioridad sobre dias
+            fim: Última fecha del rango (incluida, None = hasta hoy)
+
+        Returns:
+            Dict[str, pd.DataFrame]: Histórico por ticker, con índice de fechas y
+            columnas Open/High/Low/Close/Volume (los tickers sin datos no aparecen)
+
+        Raises:
+            Exception: Si falla la petición al proveedor
+        """
+
+    @abstractmethod
+    def obter_info(self, ticker: str) -> dict:
+        """
+        Obtiene la información básica de un símbolo
+
+        Args:
+            ticker: Símbolo del ticker
+
+        Returns:
+            dict: Información del símbolo (longName, shortName, regularMarketPrice...)
+            o dict vacío si no hay información
+        """
+
+    def obter_historico(self, ticker: str, dias: int = 30,
+                        inicio: Optional[date] = None, fim: Optional[date] = None) -> pd.DataFrame:
+        """
+        Obtiene el histórico OHLCV de un ticker
+
+        Args:
+            ticker: Símbolo del ticker
+            dias: Número de días de histórico (si no se indica inicio)
+            inicio: Primera fecha del rango (incluida)
+            fim: Última fecha del rango (incluida, None = hasta hoy)
+
+        Returns:
+            pd.DataFrame: Histórico del ticker (vacío si no hay datos)
+        """
+        return self.obter_historicos([ticker], dias, inicio, fim).get(ticker, pd.DataFrame())
+
+    def e_falha_transporte(self, erro: BaseException) -> bool:
+        """
+        Indica si un error significa que el proveedor no responde (y debe
+        contar en el circuit breaker) y no que el símbolo no existe
+
+        Args:
+            erro: Excepción de una llamada al proveedor
+
+        Returns:
+            bool: True para errores de red, timeouts, HTTP 5xx/429 y lotes
+            sin ningún dato
+        """
+        if isinstance(erro, ProviderUnavailableError):
+            return True
+        if not isinstance(erro, OSError):
+            # Los clientes HTTP (requests, curl_cffi) y los timeouts derivan de OSError
+            return False
+        status = getattr(getattr(erro, 'response', None), 'status_code', None)
+        return status is None or status >= 500 or status == 429
+
+    def obter_cotacoes(self, tickers: List[str]) -> Dict[str, dict]:
+        """
+        Obtiene la cotización actual de varios tickers a partir de su histórico reciente
+
+        Args:
+            tickers: Lista de símbolos de ticker
+
+        Returns:
+            Dict[str, dict]: Cotizaciones por ticker (los tickers sin datos no aparecen)
+
+        Raises:
+            Exception: Si falla la petición al proveedor
+        """
+        return {
+            ticker: montar_cotacao(ticker, hist, self.nome)
+            for ticker, hist in self.obter_historicos(tickers, dias=5).items()
+            if not hist.empty
+        }
+
+
+def montar_cotacao(ticker: str, hist: pd.DataFrame, fonte: str) -> dict:
+    """
+    Construye el diccionario de cotización a partir de un histórico OHLCV
+
+    Args:
+        ticker: Símbolo del ticker
+        hist: Histórico con al menos una fila (columnas Open/High/Low/Close/Volume)
+        fonte: Proveedor de origen
+
+    Returns:
+        dict: Datos de cotización
+    """
+    ultimo = hist.iloc[-1]
+    anterior = hist.iloc[-2] if len(hist) > 1 else ultimo
+
+    return {
+        'ticker': ticker,
+        'preco_atual': round(float(ultimo['Close']), 4),
+        'abertura': round(float(ultimo['Open']), 4),
+        'maximo': round(float(ultimo['High']), 4),
+        'minimo': round(float(ultimo['Low']), 4),
+        'fechamento_anterior': round(float(anterior['Close']), 4),
+        'variacao_dia': round(float(ultimo['Close'] - anterior['Close']), 4),
+        'variacao_pct': round(float((ultimo['Close'] - anterior['Close']) / anterior['Close']) * 100, 2),
+        'volume': int(ultimo['Volume']) if pd.notna(ultimo['Volume']) else 0,
+        'data': ultimo.name.date(),
+        'fonte': fonte
+    }
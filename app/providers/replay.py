@@ -0,0 +1,134 @@
+"""
+Proveedor de Reproducción (Replay)
+
+Implementación de MarketDataProvider que sirve datos OHLCV grabados en
+ficheros CSV locales, sin acceso a red. Permite ejecutar la aplicación,
+benchmarks y pruebas de carga de forma reproducible.
+
+Formato del directorio:
+    <TICKER>.csv   Columnas Date,Open,High,Low,Close,Volume (formato de
+                   DataFrame.to_csv de yfinance)
+    symbols.csv    Opcional: columnas ticker,nome para la información del símbolo
+"""
+
+import os
+import threading
+import time
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+import pandas as pd
+from ..utils.logging_config import get_logger
+from .base import MarketDataProvider
+
+# Configurar logger
+logger = get_logger(__name__)
+
+COLUNAS_OHLCV = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+class ReplayProvider(MarketDataProvider):
+    """Datos de mercado grabados en ficheros locales"""
+
+    nome = 'REPLAY'
+
+    def __init__(self, diretorio: str, data_referencia: Optional[date] = None, latencia_ms: int = 0):
+        """
+        Args:
+            diretorio: Directorio con los ficheros CSV grabados
+            data_referencia: Fecha que se considera "hoy" (None = última fecha grabada)
+            latencia_ms: Latencia simulada por petición en milisegundos
+        """
+        self.diretorio = diretorio
+        self.data_referencia = data_referencia
+        self.latencia_ms = latencia_ms
+
+        self._historicos: Dict[str, pd.DataFrame] = {}
+        self._simbolos: Optional[Dict[str, str]] = None
+        self._lock = threading.Lock()
+
+    def _carregar(self, ticker: str) -> pd.DataFrame:
+        """Carga (una sola vez) el histórico grabado de un ticker"""
+        with self._lock:
+            if ticker not in self._historicos:
+                caminho = os.path.join(self.diretorio, f"{ticker}.csv")
+                if os.path.exists(caminho):
+                    hist = pd.read_csv(caminho, index_col=0)
+                    hist.index = pd.to_datetime(hist.index, utc=True).tz_localize(None)
+                    hist = hist.sort_index().dropna(subset=['Close'])
+                    if self.data_referencia:
+                        hist = hist[hist.index.date <= self.data_referencia]
+                else:
+                    logger.warning(f"Sem dados gravados para {ticker} em {self.diretorio}")
+                    hist = pd.DataFrame(columns=COLUNAS_OHLCV)
+                self._historicos[ticker] = hist
+            return self._historicos[ticker]
+
+    def _simular_latencia(self):
+        if self.latencia_ms > 0:
+            time.sleep(self.latencia_ms / 1000)
+
+    def obter_historicos(self, tickers: List[str], dias: int = 5,
+                         inicio: Optional[date] = None, fim: Optional[date] = None) -> Dict[str, pd.DataFrame]:
+        self._simular_latencia()
+
+        historicos = {}
+        for ticker in tickers:
+            hist = self._carregar(ticker)
+            if hist.empty:
+                continue
+            if inicio:
+                datas = hist.index.date
+                hist = hist[(datas >= inicio) & (datas <= (fim or date.max))]
+            else:
+                hist = hist[hist.index > hist.index[-1] - timedelta(days=dias)]
+            if not hist.empty:
+                historicos[ticker] = hist
+
+        return historicos
+
+    def obter_info(self, ticker: str) -> dict:
+        self._simular_latencia()
+
+        with self._lock:
+            if self._simbolos is None:
+                caminho = os.path.join(self.diretorio, "symbols.csv")
+                if os.path.exists(caminho):
+                    simbolos = pd.read_csv(caminho)
+                    self._simbolos = dict(zip(simbolos['ticker'].str.upper(), simbolos['nome']))
+                else:
+                    self._simbolos = {}
+
+        hist = self._carregar(ticker)
+        if hist.empty:
+            return {}
+
+        nome = self._simbolos.get(ticker, ticker)
+        return {
+            'symbol': ticker,
+            'shortName': nome,
+            'longName': nome,
+            'regularMarketPrice': float(hist['Close'].iloc[-1])
+        }
+
+
+def gravar_historicos(provider: MarketDataProvider, tickers: List[str], dias: int, diretorio: str) -> int:
+    """
+    Graba el histórico de varios tickers en el formato del proveedor de reproducción
+
+    Args:
+        provider: Proveedor de origen (normalmente Yahoo Finance)
+        tickers: Lista de símbolos de ticker
+        dias: Número de días de histórico
+        diretorio: Directorio de destino
+
+    Returns:
+        int: Número de tickers grabados
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    historicos = provider.obter_historicos(tickers, dias)
+    for ticker, hist in historicos.items():
+        hist[[c for c in COLUNAS_OHLCV if c in hist.columns]].to_csv(
+            os.path.join(diretorio, f"{ticker}.csv"),
+            index_label='Date'
+        )
+    return len(historicos)
@@ -0,0 +1,114 @@
+"""
+Proveedor Yahoo Finance
+
+Implementación de MarketDataProvider sobre yfinance. Todas las peticiones
+pasan por el limitador de tasa compartido del proceso.
+"""
+
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+import yfinance as yf
+import pandas as pd
+from ..utils import Config
+from ..utils.logging_config import get_logger
+from ..utils.rate_limiter import yahoo_rate_limiter
+from .base import MarketDataProvider
+
+# Configurar logger
+logger = get_logger(__name__)
+
+# Los cierres se guardan sin ajustar por dividendos ni splits
+AUTO_ADJUST = False
+
+try:
+    from yfinance.exceptions import YFRateLimitError
+    ERROS_LIMITE_TAXA = (YFRateLimitError,)
+except ImportError:
+    # Versiones de yfinance sin excepción propia de rate limit
+    ERROS_LIMITE_TAXA = ()
+
+
+class YahooFinanceProvider(MarketDataProvider):
+    """Datos de mercado de Yahoo Finance"""
+
+    nome = 'YAHOO_FINANCE'
+
+    def _aguardar_rate_limit(self):
+        """Espera solo si el presupuesto de peticiones está agotado"""
+        espera = yahoo_rate_limiter.acquire()
+        if espera > 0:
+            logger.info(f"Rate limit Yahoo Finance: aguardou {espera:.2f}s na fila")
+
+    def obter_historicos(self, tickers: List[str], dias: int = 5,
+                         inicio: Optional[date] = None, fim: Optional[date] = None) -> Dict[str, pd.DataFrame]:
+        yahoo_config = Config.get_yahoo_config()
+        self._aguardar_rate_limit()
+
+        if inicio:
+            # yfinance trata 'end' como exclusivo
+            periodo = {'start': inicio, 'end': (fim or date.today()) + timedelta(days=1)}
+        else:
+            periodo = {'period': f"{dias}d"}
+
+        # Cierres sin ajustar en ambos caminos: el cierre guardado de un día no
+        # debe depender de cuántos tickers se pidieron juntos
+        if len(tickers) == 1:
+            # Usar timeout más bajo y menos datos para reducir rate limiting
+            dados = yf.Ticker(tickers[0]).history(
+                **periodo,
+                auto_adjust=AUTO_ADJUST,
+                timeout=yahoo_config['timeout']
+            )
+        else:
+            dados = yf.download(
+                tickers,
+                **periodo,
+                group_by="ticker",
+                auto_adjust=AUTO_ADJUST,
+                threads=True,
+                progress=False,
+                timeout=yahoo_config['timeout']
+            )
+
+        historicos = {}
+        for ticker in tickers:
+            hist = self._extrair_historico_lote(dados, ticker)
+            if hist.empty:
+                logger.warning(f"Histórico vazio do Yahoo Finance para {ticker}")
+                continue
+            historicos[ticker] = hist
+
+        return historicos
+
+    def obter_info(self, ticker: str) -> dict:
+        self._aguardar_rate_limit()
+        return yf.Ticker(ticker).info or {}
+
+    def e_falha_transporte(self, erro: BaseException) -> bool:
+        return isinstance(erro, ERROS_LIMITE_TAXA) or super().e_falha_transporte(erro)
+
+    @staticmethod
+    def _extrair_historico_lote(dados: pd.DataFrame, ticker: str) -> pd.DataFrame:
+        """
+        Extrae el histórico de un ticker del resultado de yf.download o Ticker.history
+
+        Args:
+            dados: DataFrame devuelto por yf.download (agrupado por ticker)
+                o por Ticker.history (un único ticker)
+            ticker: Símbolo del ticker
+
+        Returns:
+            pd.DataFrame: Histórico OHLCV del ticker (vacío si no hay datos)
+        """
+        if dados is None or dados.empty:
+            return pd.DataFrame()
+
+        if isinstance(dados.columns, pd.MultiIndex):
+            if ticker not in dados.columns.get_level_values(0):
+                return pd.DataFrame()
+            hist = dados[ticker]
+        else:
+            # yf.download no agrupa las columnas cuando se pide un único ticker
+            hist = dados
+
+        return hist.dropna(subset=['Close'])
@@ -5,7 +5,9 @@ Este módulo contiene todos los servicios de lógica de negocio para BolsaV1.
 """
 
 from .ativo_service import AtivoService
+from .atualizador_service import AtualizadorMercado
 from .cotacao_service import CotacaoService
+from .matriz_precos_service import MatrizPrecosService
 from .operacao_service import OperacaoService
 from .posicao_service import PosicaoService
 from .validacao_service import validar_ticker
@@ -13,7 +15,9 @@ from .validacao_service import validar_ticker
 # Exportar todos los servicios
 __all__ = [
     'AtivoService',
+    'AtualizadorMercado',
     'CotacaoService',
+    'MatrizPrecosService',
     'OperacaoService',
     'PosicaoService',
     'validar_ticker'
@@ -67,6 +67,8 @@ class AtivoService(BaseService):
             fonte = validacao.get('fonte', 'UNKNOWN')
             if fonte == 'LISTA_CONOCIDA':
                 st.info(f"📋 {ticker} validado desde lista de tickers conocidos")
+            elif fonte == 'MAESTRO_SIMBOLOS':
+                st.info(f"📋 {ticker} validado desde el maestro de símbolos ({validacao.get('bolsa') or 'N/A'})")
             elif fonte == 'MANUAL' or fonte == 'MANUAL_FALLBACK':
                 st.warning(f"🔧 {ticker} agregado manualmente - validación offline")
             
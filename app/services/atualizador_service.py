@@ -0,0 +1,243 @@
+"""
+Servicio de Actualización de Mercado en Segundo Plano
+
+Este módulo contiene el actualizador de cotizaciones que, en un hilo de fondo,
+refresca periódicamente todos los tickers en cartera (de todos los usuarios)
+en el cache compartido y en el almacén global de cotizaciones diarias. Así las páginas
+solo leen datos locales y no dependen de que un usuario abra la página de
+cotizaciones.
+
+Se inicia desde main.py o como proceso independiente:
+
+    python -m app.services.atualizador_service
+"""
+
+import threading
+from datetime import datetime, time as dt_time, timedelta, timezone
+from typing import List, Optional
+from ..models import SessionLocal, Ativo
+from ..models.base import remove_db_session
+from ..utils import Config
+from ..utils.logging_config import get_logger
+from .cotacao_service import CotacaoService
+from .posicao_service import PosicaoService
+
+# Configurar logger
+logger = get_logger(__name__)
+
+try:
+    from zoneinfo import ZoneInfo
+    FUSO_MERCADO = ZoneInfo("America/New_York")
+except Exception:
+    # Sin base de datos de zonas horarias: aproximación con horario estándar de Nueva York
+    FUSO_MERCADO = timezone(timedelta(hours=-5))
+
+# Horario regular de NYSE/NASDAQ (hora de Nueva York, lunes a viernes)
+ABERTURA_MERCADO = dt_time(9, 30)
+FECHAMENTO_MERCADO = dt_time(16, 0)
+
+# Tickers por petición agrupada al proveedor
+TAMANHO_LOTE = 50
+
+
+class AtualizadorMercado:
+    """Actualizador periódico de cotizaciones para todos los tickers en cartera"""
+
+    _thread: Optional[threading.Thread] = None
+    _parar = threading.Event()
+    _lock = threading.Lock()
+
+    _status = {
+        'ultimo_ciclo': None,
+        'proximo_ciclo': None,
+        'tickers': 0,
+        'cotacoes_atualizadas': 0,
+        'precos_salvos': 0,
+        'posicoes_reavaliadas': 0,
+        'falhas_consecutivas': 0,
+        'ultimo_erro': None
+    }
+
+    @staticmethod
+    def mercado_aberto(agora: Optional[datetime] = None) -> bool:
+        """
+        Indica si el mercado de referencia está en horario regular
+
+        Args:
+            agora: Instante a evaluar (por defecto, ahora)
+
+        Returns:
+            bool: True si es día laborable y está entre apertura y cierre
+        """
+        agora = (agora or datetime.now(timezone.utc)).astimezone(FUSO_MERCADO)
+        if agora.weekday() >= 5:
+            return False
+        return ABERTURA_MERCADO <= agora.time() < FECHAMENTO_MERCADO
+
+    @staticmethod
+    def intervalo_atual() -> int:
+        """
+        Calcula los segundos hasta el próximo ciclo
+
+        Con el mercado cerrado se refresca con menos frecuencia, y tras fallos
+        consecutivos se aplica un backoff exponencial limitado al intervalo
+        de mercado cerrado.
+
+        Returns:
+            int: Segundos de espera
+        """
+        refresher_config = Config.get_refresher_config()
+        if AtualizadorMercado.mercado_aberto():
+            intervalo = refresher_config['interval_open']
+        else:
+            intervalo = refresher_config['interval_closed']
+
+        falhas = AtualizadorMercado._status['falhas_consecutivas']
+        if falhas:
+            intervalo = min(intervalo * (2 ** falhas), max(intervalo, refresher_config['interval_closed']))
+
+        return intervalo
+
+    @staticmethod
+    def obter_tickers_ativos() -> List[str]:
+        """
+        Obtiene el conjunto de tickers activos en las carteras de todos los usuarios
+
+        Returns:
+            List[str]: Tickers distintos ordenados
+        """
+        session = SessionLocal()
+        try:
+            tickers = session.query(Ativo.ticker).filter(
+                Ativo.ativo == True
+            ).distinct().all()
+            return sorted(ticker for (ticker,) in tickers)
+        finally:
+            session.close()
+
+    @staticmethod
+    def executar_ciclo() -> dict:
+        """
+        Refresca una vez todos los tickers activos en el cache y en cotacoes_diarias
+        y revaloriza las posiciones abiertas de todos los usuarios
+
+        Returns:
+            dict: Estado actualizado del actualizador
+        """
+        status = AtualizadorMercado._status
+        try:
+            CotacaoService.limpar_cache_antigo()
+
+            tickers = AtualizadorMercado.obter_tickers_ativos()
+            cotacoes = CotacaoService.buscar_cotacoes_em_lotes(tickers, TAMANHO_LOTE)
+
+            salvos = CotacaoService.salvar_cotacoes_diarias(list(cotacoes.values()))
+
+            # Revalorizar las posiciones de todos los usuarios con las mismas cotizaciones
+            reavaliacao = PosicaoService.reavaliar_posicoes_sistema(cotacoes)
+
+            status.update({
+                'ultimo_ciclo': datetime.now(),
+                'tickers': len(tickers),
+                'cotacoes_atualizadas': len(cotacoes),
+                'precos_salvos': salvos,
+                'posicoes_reavaliadas': reavaliacao['posicoes']
+            })
+
+            if tickers and not cotacoes:
+                raise Exception("Nenhuma cotação obtida do provedor")
+
+            status['falhas_consecutivas'] = 0
+            status['ultimo_erro'] = None
+            logger.info(
+                f"Atualizador: {len(cotacoes)} de {len(tickers)} tickers atualizados, {salvos} preços salvos, "
+                f"{reavaliacao['posicoes']} posições reavaliadas"
+            )
+
+        except Exception as e:
+            status['falhas_consecutivas'] += 1
+            status['ultimo_erro'] = str(e)
+            logger.error(f"Atualizador: erro no ciclo de atualização: {e}", exc_info=True)
+        finally:
+            remove_db_session()
+
+        return dict(status)
+
+    @staticmethod
+    def _loop():
+        """Bucle principal del hilo de actualización"""
+        logger.info("Atualizador de mercado iniciado")
+        while not AtualizadorMercado._parar.is_set():
+            AtualizadorMercado.executar_ciclo()
+
+            intervalo = AtualizadorMercado.intervalo_atual()
+            AtualizadorMercado._status['proximo_ciclo'] = datetime.now() + timedelta(seconds=intervalo)
+            AtualizadorMercado._parar.wait(intervalo)
+        logger.info("Atualizador de mercado parado")
+
+    @staticmethod
+    def iniciar() -> bool:
+        """
+        Inicia el hilo de actualización si no está ya en ejecución (idempotente)
+
+        Returns:
+            bool: True si el hilo se ha iniciado en esta llamada
+        """
+        with AtualizadorMercado._lock:
+            if AtualizadorMercado.em_execucao():
+                return False
+
+            AtualizadorMercado._parar.clear()
+            AtualizadorMercado._thread = threading.Thread(
+                target=AtualizadorMercado._loop,
+                name="atualizador-mercado",
+                daemon=True
+            )
+            AtualizadorMercado._thread.start()
+            return True
+
+    @staticmethod
+    def parar(timeout: Optional[float] = None):
+        """
+        Detiene el hilo de actualización
+
+        Args:
+            timeout: Segundos máximos de espera a que el hilo termine
+        """
+        AtualizadorMercado._parar.set()
+        thread = AtualizadorMercado._thread
+        if thread and thread.is_alive():
+            thread.join(timeout)
+
+    @staticmethod
+    def em_execucao() -> bool:
+        """Indica si el hilo de actualización está activo"""
+        thread = AtualizadorMercado._thread
+        return thread is not None and thread.is_alive()
+
+    @staticmethod
+    def get_status() -> dict:
+        """
+        Obtiene el estado del actualizador
+
+        Returns:
+            dict: Último/próximo ciclo, tickers, cotizaciones y errores
+        """
+        return dict(
+            AtualizadorMercado._status,
+            em_execucao=AtualizadorMercado.em_execucao(),
+            mercado_aberto=AtualizadorMercado.mercado_aberto()
+        )
+
+
+if __name__ == "__main__":
+    from ..utils import setup_logging, init_database
+
+    setup_logging()
+    if not init_database():
+        raise SystemExit("Erro ao conectar com a base de dados")
+
+    try:
+        AtualizadorMercado._loop()
+    except KeyboardInterrupt:
+        pass
@@ -2,29 +2,91 @@
 Servicio de Cotizaciones - Multi-Usuario (FASE 3)
 
 Este módulo contiene la lógica de negocio para obtener cotizaciones de activos
-financieros con soporte multi-usuario y cache personalizado por usuario.
+financieros con soporte multi-usuario, un cache de cotizaciones compartido
+por todos los usuarios del proceso y un almacén OHLCV diario global
+(cotacoes_diarias) que no depende del usuario.
 """
 
-import logging
-import time
-import random
-import yfinance as yf
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import streamlit as st
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
-from typing import Optional
-from ..models import SessionLocal, Ativo, PrecoDiario
+from datetime import date, datetime, timedelta
+from sqlalchemy import func
+from typing import Dict, Iterator, List, Optional, Tuple
+from ..models import SessionLocal, Ativo, CotacaoDiaria
+from ..models.base import insert_upsert
 from ..utils import Config
 from ..utils.auth import StreamlitAuth
 from ..utils.logging_config import get_logger
+from ..utils.cache import QuoteCache
+from ..utils.columnar_cache import (
+    ColumnarHistoryCache, data_para_dia, COLUNAS, DATA, ABERTURA, MINIMO, FECHAMENTO, VOLUME
+)
+from ..utils.rate_limiter import yahoo_rate_limiter
+from ..providers import ProviderUnavailableError, get_provider
+from ..utils.singleflight import SingleFlight
+from ..utils.circuit_breaker import market_data_circuit
+from .matriz_precos_service import MatrizPrecosService
 
 # Configurar logger
 logger = get_logger(__name__)
 
-# Cache global para cotizaciones (en memoria) - organizado por usuario
-cotizacoes_cache = {}
+# Cache global para cotizaciones (en memoria) - compartido entre usuarios
 cache_config = Config.get_cache_config()
 cache_timeout = cache_config['timeout']
+cotizacoes_cache = QuoteCache(
+    ttl=cache_timeout,
+    max_entries=cache_config['max_entries'],
+    max_bytes=cache_config['max_bytes'],
+    # Ventana en la que una cotización expirada se sirve mientras se revalida
+    stale_ttl=cache_config['stale_max_age'] if cache_config['stale_while_revalidate'] else 0
+)
+
+# Rango de histórico ya sincronizado con el proveedor por ticker: mientras la
+# entrada no expire, obter_historico sirve directamente desde la BD
+historico_sincronizado = QuoteCache(ttl=cache_timeout, max_entries=cache_config['max_entries'])
+
+# Últimas cotizaciones del almacén de BD usadas como fallback: durante una caída
+# del proveedor evita repetir la consulta a la BD por cada ticker y petición.
+# Se invalida al guardar nuevos cierres del ticker
+cotacoes_bd_cache = QuoteCache(ttl=cache_timeout, max_entries=cache_config['max_entries'])
+
+# Copia columnar en disco del almacén (ficheros .npy leídos con memory mapping)
+historico_colunar = ColumnarHistoryCache(Config.COLUMNAR_CACHE_DIR) if Config.COLUMNAR_CACHE_ENABLED else None
+
+# Pool acotado de hilos para consultas por ticker, revalidaciones y fallbacks a BD.
+# Las peticiones a Yahoo Finance pasan por yahoo_rate_limiter, por lo que el
+# paralelismo nunca supera el presupuesto de peticiones configurado.
+_executor_cotacoes = ThreadPoolExecutor(
+    max_workers=Config.QUOTE_FETCH_WORKERS,
+    thread_name_prefix="cotacoes"
+)
+
+# Coalescencia de peticiones: llamadas concurrentes por el mismo ticker
+# esperan a la descarga en curso y comparten su resultado
+_voos_cotacoes = SingleFlight(timeout=Config.YAHOO_TIMEOUT * 2)
+
+# Tickers con una revalidación en segundo plano en curso
+_revalidacoes_em_curso = set()
+_revalidacoes_lock = threading.Lock()
+
+# Intervalo de las cotizaciones almacenadas en cache
+INTERVALO_COTACOES = '5d'
+
+# Cotizaciones que no proceden del proveedor y no deben guardarse en el almacén
+FONTES_SEM_PERSISTENCIA = ('BD_FALLBACK', 'VALOR_PADRAO')
+
+# Días sin sesión (fin de semana y festivos) tolerados al inicio de un rango
+# antes de considerar que falta histórico antiguo
+MARGEM_DIAS_SEM_SESSAO = 4
+
+# Tickers por petición agrupada al proveedor en los trabajos de sistema
+TAMANHO_LOTE_PROVEDOR = 50
+
+# Filas por sentencia INSERT ... ON CONFLICT (límite de parámetros de PostgreSQL)
+TAMANHO_LOTE_UPSERT = 5000
 
 
 class CotacaoService:
@@ -52,99 +114,276 @@ class CotacaoService:
     
     @staticmethod
     def limpar_cache_antigo():
-        """Limpia entradas de cache expiradas para todos los usuarios"""
-        global cotizacoes_cache
-        agora = datetime.now()
-        users_to_clean = []
+        """Limpia entradas de cache expiradas (solo procesa las vencidas, vía heap de expiración)"""
+        removidas = cotizacoes_cache.purge_expired()
+        if removidas:
+            logger.info(f"Limpeza de cache: {removidas} cotações expiradas removidas")
+    
+    @staticmethod
+    def _chave_cache(ticker: str) -> tuple:
+        """
+        Construye la clave de cache compartida de un ticker
         
-        for user_id in cotizacoes_cache.keys():
-            keys_expiradas = []
-            for key, (timestamp, _) in cotizacoes_cache[user_id].items():
-                if (agora - timestamp).seconds > cache_timeout:
-                    keys_expiradas.append(key)
+        Args:
+            ticker: Símbolo del ticker
             
-            for key in keys_expiradas:
-                del cotizacoes_cache[user_id][key]
+        Returns:
+            tuple: Clave (ticker, proveedor, intervalo)
+        """
+        return QuoteCache.make_key(ticker, get_provider().nome, INTERVALO_COTACOES)
+    
+    @staticmethod
+    def _obter_do_cache(ticker: str) -> Optional[dict]:
+        """
+        Obtiene una copia de la cotización en cache de un ticker
+        
+        Si la cotización ha superado CACHE_TIMEOUT pero sigue dentro de la
+        ventana de stale-while-revalidate, se devuelve igualmente y se lanza
+        su actualización en segundo plano.
+        
+        Args:
+            ticker: Símbolo del ticker
             
-            # Si el cache del usuario está vacío, marcarlo para eliminación
-            if not cotizacoes_cache[user_id]:
-                users_to_clean.append(user_id)
+        Returns:
+            Optional[dict]: Cotización marcada como CACHE_LOCAL o CACHE_STALE,
+            con su antigüedad en 'age_s', o None si no hay datos en cache
+        """
+        entrada = cotizacoes_cache.get_with_age(CotacaoService._chave_cache(ticker))
+        if entrada is None:
+            return None
         
-        # Limpiar caches de usuarios vacíos
-        for user_id in users_to_clean:
-            del cotizacoes_cache[user_id]
+        cached_data, idade, fresco = entrada
+        if not fresco:
+            CotacaoService._revalidar_em_segundo_plano([ticker])
         
-        if users_to_clean:
-            logger.info(f"Limpeza de cache: {len(users_to_clean)} caches de usuários removidos")
+        # Copia para no modificar la entrada compartida con otros usuarios
+        return dict(
+            cached_data,
+            fonte='CACHE_LOCAL' if fresco else 'CACHE_STALE',
+            age_s=round(idade, 1)
+        )
     
     @staticmethod
-    def obter_ultima_cotacao_bd(ticker: str) -> Optional[dict]:
+    def _revalidar_em_segundo_plano(tickers: List[str]):
         """
-        Obtiene la última cotización guardada en BD como fallback del usuario actual
+        Actualiza en un hilo de fondo las cotizaciones obsoletas del cache
+        
+        Los tickers que ya se están revalidando se ignoran para no lanzar
+        peticiones duplicadas.
         
         Args:
-            ticker: Símbolo del ticker
+            tickers: Lista de símbolos de ticker a revalidar
+        """
+        with _revalidacoes_lock:
+            novos = [t for t in tickers if t not in _revalidacoes_em_curso]
+            _revalidacoes_em_curso.update(novos)
+        
+        if not novos:
+            return
+        
+        def revalidar():
+            try:
+                cotacoes = CotacaoService._buscar_cotacoes_provedor(novos)
+                logger.info(f"Revalidação em segundo plano: {len(cotacoes)} de {len(novos)} cotações atualizadas")
+            except Exception as e:
+                logger.warning(f"Erro na revalidação em segundo plano para {novos}: {e}")
+            finally:
+                with _revalidacoes_lock:
+                    _revalidacoes_em_curso.difference_update(novos)
+        
+        _executor_cotacoes.submit(revalidar)
+    
+    @staticmethod
+    def _buscar_cotacoes_provedor(tickers: List[str]) -> Dict[str, dict]:
+        """
+        Obtiene cotizaciones del proveedor coalesciendo peticiones concurrentes
+        
+        Los tickers que otra sesión ya está descargando no se vuelven a pedir:
+        se espera a esa descarga y se comparte su resultado. Solo los tickers
+        libres se descargan, en una única petición.
+        
+        No depende de la sesión de Streamlit, por lo que puede ejecutarse
+        desde hilos de fondo.
+        
+        Args:
+            tickers: Lista de símbolos de ticker
             
         Returns:
-            Optional[dict]: Datos de cotización desde BD o None
-        """
-        session = SessionLocal()
-        try:
-            # Obtener usuario actual
-            user_id = CotacaoService._get_current_user_id()
+            Dict[str, dict]: Cotizaciones obtenidas (los tickers sin datos no aparecen)
             
-            # Buscar el ativo por ticker del usuario
-            ativo = session.query(Ativo).filter(
-                Ativo.ticker == ticker,
-                Ativo.user_id == user_id
-            ).first()
+        Raises:
+            Exception: Si falla la petición propia al proveedor
+        """
+        return _voos_cotacoes.do_many(tickers, CotacaoService._descarregar_cotacoes)
+    
+    @staticmethod
+    def buscar_cotacoes_em_lotes(tickers: List[str], tamanho_lote: int = TAMANHO_LOTE_PROVEDOR) -> Dict[str, dict]:
+        """
+        Obtiene cotizaciones del proveedor para muchos tickers en peticiones agrupadas
+        
+        Un lote que falla se registra y se omite sin interrumpir el resto. No
+        depende de la sesión de Streamlit (trabajos de fondo y de sistema).
+        
+        Args:
+            tickers: Lista de símbolos de ticker
+            tamanho_lote: Tickers por petición al proveedor
             
-            if not ativo:
-                logger.warning(f"Ativo {ticker} não encontrado para usuario {user_id}")
-                return None
+        Returns:
+            Dict[str, dict]: Cotizaciones obtenidas (los tickers sin datos no aparecen)
+        """
+        cotacoes = {}
+        for i in range(0, len(tickers), tamanho_lote):
+            lote = tickers[i:i + tamanho_lote]
+            try:
+                cotacoes.update(CotacaoService._buscar_cotacoes_provedor(lote))
+            except Exception as e:
+                logger.warning(f"Erro no lote de cotações {lote[0]}..{lote[-1]}: {e}")
+        return cotacoes
+    
+    @staticmethod
+    def _descarregar_cotacoes(tickers: List[str]) -> Dict[str, dict]:
+        """
+        Descarga cotizaciones del proveedor configurado y las guarda en el cache compartido
+        
+        La petición pasa por el circuit breaker del proveedor: con el circuito
+        abierto falla de inmediato y los llamadores usan sus fallbacks sin
+        esperar al timeout. Solo cuentan como fallo los errores de transporte
+        y un lote de varios tickers sin ninguna cotización (Yahoo Finance
+        devuelve datos vacíos cuando limita la tasa); un único ticker sin datos
+        (desconocido o deslistado) es una respuesta válida y no aparece en el
+        resultado.
+        
+        Args:
+            tickers: Lista de símbolos de ticker
             
-            # Buscar el precio más reciente del usuario
-            ultimo_preco = session.query(PrecoDiario).filter(
-                PrecoDiario.ativo_id == ativo.id,
-                PrecoDiario.user_id == user_id
-            ).order_by(PrecoDiario.data.desc()).first()
+        Returns:
+            Dict[str, dict]: Cotizaciones obtenidas (los tickers sin datos no aparecen)
             
-            if not ultimo_preco:
-                logger.warning(f"Nenhum preço histórico encontrado para {ticker} do usuario {user_id}")
-                return None
+        Raises:
+            CircuitOpenError: Si el circuito del proveedor está abierto
+            Exception: Si falla la petición al proveedor
+        """
+        provider = get_provider()
+        
+        def descarregar():
+            cotacoes = provider.obter_cotacoes(tickers)
+            if not cotacoes and len(tickers) > 1:
+                raise ProviderUnavailableError("Nenhuma cotação retornada pelo provedor")
+            return cotacoes
+        
+        cotacoes = market_data_circuit.call(descarregar, provider.e_falha_transporte)
+        for ticker, cotacao in cotacoes.items():
+            cotizacoes_cache.set(CotacaoService._chave_cache(ticker), dict(cotacao))
+        
+        return cotacoes
+    
+    @staticmethod
+    def obter_ultima_cotacao_bd(ticker: str) -> Optional[dict]:
+        """
+        Obtiene la última cotización guardada en el almacén global como fallback
+        
+        Args:
+            ticker: Símbolo del ticker
             
-            # Buscar precio anterior para calcular variación
-            preco_anterior = session.query(PrecoDiario).filter(
-                PrecoDiario.ativo_id == ativo.id,
-                PrecoDiario.user_id == user_id,
-                PrecoDiario.data < ultimo_preco.data
-            ).order_by(PrecoDiario.data.desc()).first()
+        Returns:
+            Optional[dict]: Datos de cotización desde BD o None
+        """
+        return CotacaoService.obter_ultimas_cotacoes_bd([ticker]).get(ticker.upper().strip())
+    
+    @staticmethod
+    def obter_ultimas_cotacoes_bd(tickers: List[str]) -> Dict[str, dict]:
+        """
+        Obtiene la última cotización guardada de varios tickers con una sola consulta
+        
+        El último cierre y el anterior (para la variación) de todos los tickers
+        se leen con una consulta con ROW_NUMBER() OVER (PARTITION BY ticker
+        ORDER BY data DESC). Los resultados se guardan en cotacoes_bd_cache, de
+        modo que durante una caída del proveedor las siguientes peticiones no
+        vuelven a consultar la BD.
+        
+        Args:
+            tickers: Lista de símbolos de ticker
             
-            preco_anterior_valor = float(preco_anterior.preco_fechamento) if preco_anterior else float(ultimo_preco.preco_fechamento)
+        Returns:
+            Dict[str, dict]: Cotizaciones con fonte BD_FALLBACK indexadas por
+            ticker (los tickers sin precios guardados no aparecen)
+        """
+        tickers = list(dict.fromkeys(t.upper().strip() for t in tickers if t))
+        
+        cotacoes = {}
+        pendentes = []
+        for ticker in tickers:
+            cotacao = cotacoes_bd_cache.get(QuoteCache.make_key(ticker, 'BD', 'ultima'))
+            if cotacao:
+                cotacoes[ticker] = dict(cotacao)
+            else:
+                pendentes.append(ticker)
+        
+        if not pendentes:
+            return cotacoes
+        
+        session = SessionLocal()
+        try:
+            ultimas = session.query(
+                CotacaoDiaria.ticker,
+                CotacaoDiaria.data,
+                CotacaoDiaria.abertura,
+                CotacaoDiaria.fechamento,
+                CotacaoDiaria.volume,
+                func.row_number().over(
+                    partition_by=CotacaoDiaria.ticker,
+                    order_by=CotacaoDiaria.data.desc()
+                ).label('posicao')
+            ).filter(
+                CotacaoDiaria.ticker.in_(pendentes)
+            ).subquery()
             
-            logger.info(f"Usuario {user_id} usando última cotação da BD para {ticker}: {ultimo_preco.preco_fechamento} ({ultimo_preco.data})")
+            linhas = session.query(ultimas).filter(
+                ultimas.c.posicao <= 2
+            ).order_by(ultimas.c.ticker, ultimas.c.posicao).all()
+        except Exception as e:
+            logger.error(f"Erro ao obter últimas cotações da BD para {pendentes}: {e}", exc_info=True)
+            return cotacoes
+        finally:
+            session.close()
+        
+        # Filas ordenadas por ticker: la primera es el último cierre y la segunda el anterior
+        por_ticker: Dict[str, list] = {}
+        for linha in linhas:
+            por_ticker.setdefault(linha.ticker, []).append(linha)
+        
+        for ticker, (ultima, *anteriores) in por_ticker.items():
+            preco_atual = float(ultima.fechamento)
+            preco_anterior_valor = float(anteriores[0].fechamento) if anteriores else preco_atual
             
-            return {
+            cotacao = {
                 'ticker': ticker,
-                'preco_atual': float(ultimo_preco.preco_fechamento),
-                'abertura': float(ultimo_preco.preco_fechamento),  # Aproximación
+                'preco_atual': preco_atual,
+                'abertura': float(ultima.abertura) if ultima.abertura is not None else preco_atual,
                 'fechamento_anterior': preco_anterior_valor,
-                'variacao_dia': float(ultimo_preco.preco_fechamento) - preco_anterior_valor,
-                'variacao_pct': round(((float(ultimo_preco.preco_fechamento) - preco_anterior_valor) / preco_anterior_valor) * 100, 2) if preco_anterior_valor > 0 else 0,
-                'volume': 0,  # No tenemos volume histórico
-                'data': ultimo_preco.data,
-                'fonte': 'BD_FALLBACK_USER'  # Indicador de que es fallback del usuario
+                'variacao_dia': preco_atual - preco_anterior_valor,
+                'variacao_pct': round(((preco_atual - preco_anterior_valor) / preco_anterior_valor) * 100, 2) if preco_anterior_valor > 0 else 0,
+                'volume': int(ultima.volume or 0),
+                'data': ultima.data,
+                'fonte': 'BD_FALLBACK'  # Indicador de que es fallback de BD
             }
-        except Exception as e:
-            logger.error(f"Erro ao obter última cotação da BD para {ticker} usuario {user_id}: {e}", exc_info=True)
-            return None
-        finally:
-            session.close()
+            cotacoes_bd_cache.set(QuoteCache.make_key(ticker, 'BD', 'ultima'), cotacao)
+            cotacoes[ticker] = dict(cotacao)
+        
+        sem_dados = [ticker for ticker in pendentes if ticker not in por_ticker]
+        if sem_dados:
+            logger.warning(f"Nenhum preço histórico encontrado para {sem_dados}")
+        logger.info(f"Usando últimas cotações da BD para {len(por_ticker)} de {len(pendentes)} tickers")
+        
+        return cotacoes
     
     @staticmethod
     def obter_cotacao_atual(ticker: str) -> Optional[dict]:
         """
-        Obtiene la cotización actual de un ticker con cache por usuario y fallback a BD
+        Obtiene la cotización actual de un ticker con cache compartido y fallback a BD
+        
+        Si existe una cotización en cache (aunque esté obsoleta) se devuelve sin
+        esperar al proveedor; las obsoletas se revalidan en segundo plano.
         
         Args:
             ticker: Símbolo del ticker
@@ -152,8 +391,6 @@ class CotacaoService:
         Returns:
             Optional[dict]: Datos de cotización o None
         """
-        global cotizacoes_cache
-        
         try:
             # Obtener usuario actual
             user_id = CotacaoService._get_current_user_id()
@@ -161,173 +398,648 @@ class CotacaoService:
             # Limpiar cache expirado
             CotacaoService.limpar_cache_antigo()
             
-            # Inicializar cache del usuario si no existe
-            if user_id not in cotizacoes_cache:
-                cotizacoes_cache[user_id] = {}
-            
-            # Verificar cache del usuario primero
-            cache_key = f"{ticker}_{datetime.now().strftime('%Y%m%d_%H%M')}"
-            if cache_key in cotizacoes_cache[user_id]:
-                cached_time, cached_data = cotizacoes_cache[user_id][cache_key]
-                if (datetime.now() - cached_time).seconds < cache_timeout:
-                    logger.info(f"Usuario {user_id} usando cotação em cache para {ticker}")
-                    cached_data['fonte'] = 'CACHE_USER'
-                    return cached_data
+            # Verificar cache compartido primero
+            cached_data = CotacaoService._obter_do_cache(ticker)
+            if cached_data:
+                logger.info(f"Usuario {user_id} usando cotação em cache para {ticker}")
+                return cached_data
             
             logger.info(f"Usuario {user_id} obtendo cotação para {ticker}")
             
-            # Rate limiting: delay aleatorio para evitar exceso de requests
-            yahoo_config = Config.get_yahoo_config()
-            delay = random.uniform(yahoo_config['request_delay_min'], yahoo_config['request_delay_max'])
-            time.sleep(delay)
+            cotacao = CotacaoService._buscar_cotacoes_provedor([ticker]).get(ticker)
+            if not cotacao:
+                raise Exception("Histórico vazio")
             
-            stock = yf.Ticker(ticker)
+            logger.info(f"Usuario {user_id} obteve cotação de {cotacao['fonte']} para {ticker}: {cotacao['preco_atual']}")
+            return cotacao
             
-            # Usar timeout más bajo y menos datos para reducir rate limiting
-            hist = stock.history(period="5d", timeout=yahoo_config['yahoo_timeout'])
+        except Exception as e:
+            logger.warning(f"Erro no provedor de cotações para {ticker}: {e}. Tentando fallback da BD...")
+            cotacao = CotacaoService._cotacao_fallback(ticker)
+            CotacaoService._notificar_fallback(cotacao)
+            return cotacao
+    
+    @staticmethod
+    def obter_cotacoes_lote(tickers: List[str]) -> Dict[str, dict]:
+        """
+        Obtiene las cotizaciones actuales de varios tickers en una sola petición
+        
+        Los tickers presentes en cache (frescos u obsoletos) se sirven
+        directamente; el resto se descarga con una única llamada al proveedor. Los tickers sin datos
+        usan el mismo fallback que obter_cotacao_atual (BD y valor por defecto).
+        
+        Args:
+            tickers: Lista de símbolos de ticker
             
-            if hist.empty:
-                logger.warning(f"Histórico vazio do Yahoo Finance para {ticker}")
-                raise Exception("Histórico vazio")
+        Returns:
+            Dict[str, dict]: Cotizaciones indexadas por ticker, con el mismo
+            formato que obter_cotacao_atual
+        """
+        # Normalizar y eliminar duplicados manteniendo el orden
+        tickers = list(dict.fromkeys(t.upper().strip() for t in tickers if t))
+        if not tickers:
+            return {}
+        
+        cotacoes = {}
+        pendentes = []
+        user_id = None
+        lote_falhou = False
+        
+        try:
+            user_id = CotacaoService._get_current_user_id()
             
-            ultimo = hist.iloc[-1]
-            anterior = hist.iloc[-2] if len(hist) > 1 else ultimo
+            CotacaoService.limpar_cache_antigo()
             
-            cotacao = {
-                'ticker': ticker,
-                'preco_atual': round(ultimo['Close'], 4),
-                'abertura': round(ultimo['Open'], 4),
-                'fechamento_anterior': round(anterior['Close'], 4),
-                'variacao_dia': round(ultimo['Close'] - anterior['Close'], 4),
-                'variacao_pct': round(((ultimo['Close'] - anterior['Close']) / anterior['Close']) * 100, 2),
-                'volume': int(ultimo['Volume']),
-                'data': ultimo.name.date(),
-                'fonte': 'YAHOO_FINANCE'
-            }
+            # Servir desde cache lo que esté disponible
+            for ticker in tickers:
+                cached_data = CotacaoService._obter_do_cache(ticker)
+                if cached_data:
+                    cotacoes[ticker] = cached_data
+                else:
+                    pendentes.append(ticker)
             
-            # Guardar en cache del usuario
-            cotizacoes_cache[user_id][cache_key] = (datetime.now(), cotacao)
+            if pendentes:
+                logger.info(f"Usuario {user_id} obtendo cotações em lote para {len(pendentes)} tickers: {pendentes}")
+                
+                cotacoes.update(CotacaoService._buscar_cotacoes_provedor(pendentes))
+                
+                logger.info(f"Usuario {user_id} obteve {len([t for t in pendentes if t in cotacoes])} de {len(pendentes)} cotações em lote")
+                
+        except Exception as e:
+            lote_falhou = True
+            logger.warning(f"Erro no lote do provedor de cotações para {pendentes or tickers}: {e}. Tentando fallback da BD...")
+        
+        # Los tickers que faltan se reintentan de forma individual y concurrente;
+        # si el lote entero falló se va directamente al fallback de BD, con una
+        # única consulta para todos ellos
+        faltantes = [ticker for ticker in tickers if ticker not in cotacoes]
+        if lote_falhou and faltantes:
+            cotacoes_bd = CotacaoService.obter_ultimas_cotacoes_bd(faltantes)
+            for ticker in faltantes:
+                cotacao = cotacoes_bd.get(ticker)
+                if not cotacao:
+                    logger.error(f"Falha total ao obter cotação para {ticker}")
+                    cotacao = CotacaoService._cotacao_padrao(ticker)
+                cotacoes[ticker] = cotacao
+                CotacaoService._notificar_fallback(cotacao)
+        else:
+            for ticker, cotacao in CotacaoService.iterar_cotacoes(faltantes):
+                cotacoes[ticker] = cotacao
+                CotacaoService._notificar_fallback(cotacao)
+        
+        return {ticker: cotacoes[ticker] for ticker in tickers}
+    
+    @staticmethod
+    def iterar_cotacoes(tickers: List[str], consultar_provedor: bool = True) -> Iterator[Tuple[str, dict]]:
+        """
+        Obtiene cotizaciones ticker a ticker en paralelo sobre el pool acotado de hilos
+        
+        Cada ticker se consulta al proveedor (respetando el rate limiter global)
+        y, si falla, al almacén de cotizaciones de la BD. Los resultados se devuelven en orden
+        de finalización, de modo que N tickers tardan aproximadamente lo mismo
+        que una sola petición.
+        
+        Args:
+            tickers: Lista de símbolos de ticker
+            consultar_provedor: Si False, solo se usa el fallback de BD
             
-            logger.info(f"Usuario {user_id} obteve cotação do Yahoo Finance para {ticker}: {cotacao['preco_atual']}")
-            return cotacao
+        Yields:
+            Tuple[str, dict]: (ticker, cotización) a medida que se completan
+        """
+        futuros = {
+            _executor_cotacoes.submit(
+                CotacaoService._obter_cotacao_individual, ticker, consultar_provedor
+            ): ticker
+            for ticker in tickers
+        }
+        
+        for futuro in as_completed(futuros):
+            ticker = futuros[futuro]
+            try:
+                yield ticker, futuro.result()
+            except Exception as e:
+                logger.error(f"Erro ao obter cotação individual para {ticker}: {e}")
+                yield ticker, CotacaoService._cotacao_padrao(ticker)
+    
+    @staticmethod
+    def _obter_cotacao_individual(ticker: str, consultar_provedor: bool) -> dict:
+        """
+        Obtiene la cotización de un ticker desde un hilo del pool
+        
+        No usa la sesión de Streamlit, por lo que puede ejecutarse fuera del
+        hilo del script.
+        
+        Args:
+            ticker: Símbolo del ticker
+            consultar_provedor: Si False, se salta la consulta al proveedor
             
-        except Exception as e:
-            logger.warning(f"Erro no Yahoo Finance para {ticker}: {e}. Tentando fallback da BD...")
+        Returns:
+            dict: Cotización del proveedor, de la BD o por defecto
+        """
+        if consultar_provedor:
+            try:
+                cotacao = CotacaoService._buscar_cotacoes_provedor([ticker]).get(ticker)
+                if cotacao:
+                    return cotacao
+            except Exception as e:
+                logger.warning(f"Erro no provedor de cotações para {ticker}: {e}. Tentando fallback da BD...")
+        
+        return CotacaoService._cotacao_fallback(ticker)
+    
+    @staticmethod
+    def _cotacao_fallback(ticker: str) -> dict:
+        """
+        Obtiene una cotización de respaldo cuando el proveedor no responde
+        
+        Args:
+            ticker: Símbolo del ticker
             
-            # Fallback: usar última cotación del usuario desde BD
+        Returns:
+            dict: Última cotización de la BD o, en su defecto, valores por defecto
+        """
+        # Fallback: usar última cotización del almacén global de BD
+        try:
             cotacao_bd = CotacaoService.obter_ultima_cotacao_bd(ticker)
-            if cotacao_bd:
-                st.info(f"📊 {ticker}: Usando tu cotización de BD ({cotacao_bd['data']}) - API temporalmente limitada")
-                return cotacao_bd
-            else:
-                logger.error(f"Falha total ao obter cotação para {ticker}")
-                # Crear una cotización de emergencia
-                st.error(f"❌ No hay conexión. Usando valores por defecto para {ticker}")
-                return {
-                    'ticker': ticker,
-                    'preco_atual': 100.00,  # Valor por defecto
-                    'abertura': 100.00,
-                    'fechamento_anterior': 100.00,
-                    'variacao_dia': 0.00,
-                    'variacao_pct': 0.00,
-                    'volume': 0,
-                    'data': datetime.now().date(),
-                    'fonte': 'VALOR_PADRAO'
-                }
+        except Exception as e:
+            logger.error(f"Erro no fallback da BD para {ticker}: {e}")
+            cotacao_bd = None
+        
+        if cotacao_bd:
+            return cotacao_bd
+        
+        logger.error(f"Falha total ao obter cotação para {ticker}")
+        return CotacaoService._cotacao_padrao(ticker)
+    
+    @staticmethod
+    def _cotacao_padrao(ticker: str) -> dict:
+        """
+        Crea una cotización de emergencia con valores por defecto
+        
+        Args:
+            ticker: Símbolo del ticker
+            
+        Returns:
+            dict: Cotización con fonte VALOR_PADRAO
+        """
+        return {
+            'ticker': ticker,
+            'preco_atual': 100.00,  # Valor por defecto
+            'abertura': 100.00,
+            'fechamento_anterior': 100.00,
+            'variacao_dia': 0.00,
+            'variacao_pct': 0.00,
+            'volume': 0,
+            'data': datetime.now().date(),
+            'fonte': 'VALOR_PADRAO'
+        }
+    
+    @staticmethod
+    def _notificar_fallback(cotacao: dict):
+        """
+        Informa al usuario en la interfaz cuando una cotización no viene del proveedor
+        
+        Debe llamarse desde el hilo del script de Streamlit.
+        
+        Args:
+            cotacao: Cotización obtenida
+        """
+        fonte = cotacao.get('fonte')
+        ticker = cotacao['ticker']
+        if fonte == 'BD_FALLBACK':
+            st.info(f"📊 {ticker}: Usando la última cotización de BD ({cotacao['data']}) - API temporalmente limitada")
+        elif fonte == 'VALOR_PADRAO':
+            st.error(f"❌ No hay conexión. Usando valores por defecto para {ticker}")
     
     @staticmethod
     def obter_historico(ticker: str, dias: int = 30) -> pd.DataFrame:
         """
-        Obtiene el histórico de precios de un ticker
+        Obtiene el histórico OHLCV de un ticker desde el almacén global
+        
+        Antes de leer la BD se descargan del proveedor solo los tramos que
+        faltan (días nuevos desde la última fecha guardada y, si el rango pedido
+        es más largo que lo guardado, el tramo antiguo). Si el proveedor no
+        responde se sirve lo que haya en la BD.
         
         Args:
             ticker: Símbolo del ticker
             dias: Número de días de histórico
             
         Returns:
-            pd.DataFrame: DataFrame con el histórico de precios
+            pd.DataFrame: DataFrame con el histórico de precios (vacío si no
+            hay datos o falla la consulta)
         """
         try:
-            stock = yf.Ticker(ticker)
-            hist = stock.history(period=f"{dias}d")
-            return hist
+            data_inicio = datetime.now().date() - timedelta(days=dias)
+            
+            chave = QuoteCache.make_key(ticker, get_provider().nome, 'historico')
+            sincronizado_desde = historico_sincronizado.get(chave)
+            if sincronizado_desde is None or sincronizado_desde > data_inicio:
+                CotacaoService._sincronizar_historico(ticker, data_inicio)
+            
+            janela = CotacaoService.obter_historico_colunar(ticker, dias)
+            if janela is not None:
+                return ColumnarHistoryCache.para_dataframe(janela)
+            
+            return CotacaoService.obter_historico_bd(ticker, dias)
         except Exception as e:
-            logger.error(f"Erro ao obter histórico para {ticker}: {e}")
-            return pd.DataFrame()  # DataFrame vacío en caso de error
+            logger.error(f"Erro ao obter histórico de {ticker}: {e}")
+            return pd.DataFrame()
     
     @staticmethod
-    def salvar_preco_diario(ativo_id: int, ticker: str) -> bool:
+    def _sincronizar_historico(ticker: str, data_inicio: date) -> int:
         """
-        Guarda el precio diario actual en la BD para el usuario actual
+        Descarga del proveedor los tramos de histórico que faltan en la BD
         
         Args:
-            ativo_id: ID del activo
             ticker: Símbolo del ticker
+            data_inicio: Primera fecha que debe estar disponible
             
         Returns:
-            bool: True si se guardó correctamente, False en caso contrario
+            int: Número de filas descargadas y guardadas
+        """
+        hoje = datetime.now().date()
+        guardadas = 0
+        
+        try:
+            session = SessionLocal()
+            try:
+                # Rango guardado con OHLCV completo (los cierres migrados no cuentan)
+                primeira, ultima = session.query(
+                    func.min(CotacaoDiaria.data),
+                    func.max(CotacaoDiaria.data)
+                ).filter(
+                    CotacaoDiaria.ticker == ticker,
+                    CotacaoDiaria.abertura.isnot(None)
+                ).one()
+            finally:
+                session.close()
+            
+            tramos = []
+            if primeira is None:
+                tramos.append((data_inicio, hoje))
+            else:
+                if primeira > data_inicio + timedelta(days=MARGEM_DIAS_SEM_SESSAO):
+                    tramos.append((data_inicio, primeira - timedelta(days=1)))
+                if ultima < hoje:
+                    # Se incluye la última fecha guardada para actualizar un cierre provisional
+                    tramos.append((ultima, hoje))
+            
+            provider = get_provider()
+            for inicio, fim in tramos:
+                hist = market_data_circuit.call(
+                    lambda: provider.obter_historico(ticker, inicio=inicio, fim=fim),
+                    provider.e_falha_transporte
+                )
+                if not hist.empty:
+                    guardadas += CotacaoService.salvar_historico_diario(ticker, hist)
+            
+            logger.info(f"Histórico de {ticker} sincronizado desde {data_inicio}: {len(tramos)} trechos, {guardadas} dias baixados")
+            historico_sincronizado.set(
+                QuoteCache.make_key(ticker, provider.nome, 'historico'),
+                min(data_inicio, primeira or data_inicio)
+            )
+        except Exception as e:
+            logger.warning(f"Erro ao sincronizar histórico de {ticker} com o provedor: {e}. Usando histórico da BD...")
+        
+        # La BD también recibe cierres del actualizador y de las cotizaciones guardadas
+        CotacaoService._atualizar_historico_colunar(ticker, data_inicio)
+        
+        return guardadas
+    
+    @staticmethod
+    def obter_historico_colunar(ticker: str, dias: int = 30) -> Optional[np.ndarray]:
+        """
+        Obtiene una ventana del histórico columnar en disco sin copiar datos
+        
+        Pensado para análisis vectorizados: cada fila del resultado es una
+        columna (ver COLUNAS) y es una vista sobre el fichero mapeado.
+        
+        Args:
+            ticker: Símbolo del ticker
+            dias: Número de días de histórico
+            
+        Returns:
+            Optional[np.ndarray]: Vista (6, n) de solo lectura, o None si el
+            cache columnar está desactivado o el ticker no está en él
+        """
+        if historico_colunar is None:
+            return None
+        
+        try:
+            return historico_colunar.janela(ticker, datetime.now().date() - timedelta(days=dias))
+        except Exception as e:
+            logger.error(f"Erro ao ler histórico columnar de {ticker}: {e}")
+            return None
+    
+    @staticmethod
+    def _atualizar_historico_colunar(ticker: str, data_inicio: date):
+        """
+        Actualiza el fichero columnar de un ticker a partir del almacén de la BD
+        
+        Solo se leen las filas desde la última fecha del fichero (incluida, por
+        si era un cierre provisional); el fichero se reconstruye entero si no
+        existe o no cubre data_inicio.
+        
+        Args:
+            ticker: Símbolo del ticker
+            data_inicio: Primera fecha que debe cubrir el fichero
+        """
+        if historico_colunar is None:
+            return
+        
+        try:
+            existente = historico_colunar.carregar(ticker)
+            if existente is None or existente.shape[1] == 0 or \
+                    existente[DATA, 0] > data_para_dia(data_inicio) + MARGEM_DIAS_SEM_SESSAO:
+                dados = CotacaoService._consultar_historico_colunas(ticker)
+                if dados.shape[1]:
+                    historico_colunar.gravar(ticker, dados)
+            else:
+                ultima = np.datetime64(int(existente[DATA, -1]), 'D').astype(date)
+                historico_colunar.mesclar(ticker, CotacaoService._consultar_historico_colunas(ticker, ultima))
+        except Exception as e:
+            logger.error(f"Erro ao atualizar histórico columnar de {ticker}: {e}")
+    
+    @staticmethod
+    def _consultar_historico_colunas(ticker: str, desde: Optional[date] = None) -> np.ndarray:
+        """
+        Lee el histórico OHLCV de un ticker del almacén en formato columnar
+        
+        Args:
+            ticker: Símbolo del ticker
+            desde: Primera fecha (None = todo el histórico)
+            
+        Returns:
+            np.ndarray: Array (6, n) ordenado por fecha (ver COLUNAS)
         """
         session = SessionLocal()
         try:
-            # Obtener usuario actual
-            user_id = CotacaoService._get_current_user_id()
+            query = session.query(
+                CotacaoDiaria.data,
+                CotacaoDiaria.abertura,
+                CotacaoDiaria.maximo,
+                CotacaoDiaria.minimo,
+                CotacaoDiaria.fechamento,
+                CotacaoDiaria.volume
+            ).filter(CotacaoDiaria.ticker == ticker)
+            if desde:
+                query = query.filter(CotacaoDiaria.data >= desde)
+            linhas = query.order_by(CotacaoDiaria.data).all()
+        finally:
+            session.close()
+        
+        dados = np.empty((len(COLUNAS), len(linhas)), dtype=np.float64)
+        if not linhas:
+            return dados
+        
+        dados[DATA] = np.array([l[0] for l in linhas], dtype='datetime64[D]').astype(np.int64)
+        dados[ABERTURA:] = np.array([l[1:] for l in linhas], dtype=np.float64).T
+        
+        # Los cierres migrados de precos_diarios no tienen apertura/máximo/mínimo
+        for linha in range(ABERTURA, MINIMO + 1):
+            vazios = np.isnan(dados[linha])
+            dados[linha, vazios] = dados[FECHAMENTO, vazios]
+        dados[VOLUME, np.isnan(dados[VOLUME])] = 0
+        
+        return dados
+    
+    @staticmethod
+    def obter_historico_bd(ticker: str, dias: int = 30) -> pd.DataFrame:
+        """
+        Obtiene el histórico OHLCV de un ticker desde el almacén global
+        
+        Args:
+            ticker: Símbolo del ticker
+            dias: Número de días de histórico
             
-            # Obtener cotización actual
-            cotacao = CotacaoService.obter_cotacao_atual(ticker)
-            if not cotacao:
-                logger.warning(f"Não foi possível obter cotação para salvar preço de {ticker} para usuario {user_id}")
-                return False
-            
-            # Verificar si ya existe precio para hoy del usuario
-            hoje = datetime.now().date()
-            preco_existente = session.query(PrecoDiario).filter(
-                PrecoDiario.ativo_id == ativo_id,
-                PrecoDiario.data == hoje,
-                PrecoDiario.user_id == user_id
-            ).first()
+        Returns:
+            pd.DataFrame: Histórico con índice de fechas y columnas
+            Open/High/Low/Close/Volume (vacío si no hay datos)
+        """
+        try:
+            data_inicio = datetime.now().date() - timedelta(days=dias)
+            return ColumnarHistoryCache.para_dataframe(
+                CotacaoService._consultar_historico_colunas(ticker, data_inicio)
+            )
+        except Exception as e:
+            logger.error(f"Erro ao obter histórico de BD para {ticker}: {e}")
+            return pd.DataFrame()
+    
+    @staticmethod
+    def salvar_cotacoes_diarias(cotacoes: List[dict]) -> int:
+        """
+        Guarda cotizaciones en el almacén global (una fila por ticker y fecha)
+        
+        Las cotizaciones de respaldo (BD o valores por defecto) se ignoran.
+        
+        Args:
+            cotacoes: Cotizaciones con el formato de obter_cotacao_atual
             
-            if preco_existente:
-                # Actualizar precio existente
-                preco_existente.preco_fechamento = cotacao['preco_atual']
-                logger.info(f"Preço atualizado para {ticker} usuario {user_id}: {cotacao['preco_atual']}")
+        Returns:
+            int: Número de filas insertadas o actualizadas
+        """
+        fonte = get_provider().nome
+        linhas = [
+            {
+                'ticker': cotacao['ticker'],
+                'data': cotacao['data'],
+                'abertura': cotacao.get('abertura'),
+                'maximo': cotacao.get('maximo'),
+                'minimo': cotacao.get('minimo'),
+                'fechamento': cotacao['preco_atual'],
+                'volume': cotacao.get('volume', 0),
+                'fonte': fonte
+            }
+            for cotacao in cotacoes
+            if cotacao and cotacao.get('fonte') not in FONTES_SEM_PERSISTENCIA
+        ]
+        return CotacaoService._gravar_cotacoes_diarias(linhas)
+    
+    @staticmethod
+    def salvar_historico_diario(ticker: str, hist: pd.DataFrame) -> int:
+        """
+        Guarda un histórico OHLCV del proveedor en el almacén global
+        
+        Args:
+            ticker: Símbolo del ticker
+            hist: Histórico con índice de fechas y columnas Open/High/Low/Close/Volume
+            
+        Returns:
+            int: Número de filas insertadas o actualizadas
+        """
+        fonte = get_provider().nome
+        linhas = [
+            {
+                'ticker': ticker,
+                'data': data.date(),
+                'abertura': round(float(row['Open']), 4),
+                'maximo': round(float(row['High']), 4),
+                'minimo': round(float(row['Low']), 4),
+                'fechamento': round(float(row['Close']), 4),
+                'volume': int(row['Volume']) if pd.notna(row['Volume']) else 0,
+                'fonte': fonte
+            }
+            for data, row in hist.dropna(subset=['Close']).iterrows()
+        ]
+        return CotacaoService._gravar_cotacoes_diarias(linhas)
+    
+    @staticmethod
+    def _gravar_cotacoes_diarias(linhas: List[dict]) -> int:
+        """
+        Inserta o actualiza filas de cotacoes_diarias en una sola transacción
+        
+        Se usa INSERT ... ON CONFLICT (ticker, data) DO UPDATE, de modo que la
+        base de datos resuelve en la misma sentencia qué filas son nuevas y
+        cuáles se actualizan, sin leer antes las existentes. Los valores nulos
+        de apertura/máximo/mínimo/volumen no sobrescriben los ya guardados.
+        
+        Args:
+            linhas: Filas con ticker, data, abertura, maximo, minimo, fechamento, volume y fonte
+            
+        Returns:
+            int: Número de filas insertadas o actualizadas (0 si falla)
+        """
+        if not linhas:
+            return 0
+        
+        # Una sola fila por (ticker, data): ON CONFLICT no admite afectar dos veces la misma fila
+        unicas: Dict[tuple, dict] = {}
+        for linha in linhas:
+            chave = (linha['ticker'], linha['data'])
+            if chave in unicas:
+                unicas[chave].update({campo: valor for campo, valor in linha.items() if valor is not None})
             else:
-                # Crear nuevo registro para el usuario
-                novo_preco = PrecoDiario(
-                    ativo_id=ativo_id,
-                    data=hoje,
-                    preco_fechamento=cotacao['preco_atual'],
-                    user_id=user_id  # Asignar al usuario actual
+                unicas[chave] = dict(linha)
+        linhas = list(unicas.values())
+        
+        session = SessionLocal()
+        try:
+            tabela = CotacaoDiaria.__table__
+            for i in range(0, len(linhas), TAMANHO_LOTE_UPSERT):
+                stmt = insert_upsert(session)(tabela).values(linhas[i:i + TAMANHO_LOTE_UPSERT])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[tabela.c.ticker, tabela.c.data],
+                    set_={
+                        'abertura': func.coalesce(stmt.excluded.abertura, tabela.c.abertura),
+                        'maximo': func.coalesce(stmt.excluded.maximo, tabela.c.maximo),
+                        'minimo': func.coalesce(stmt.excluded.minimo, tabela.c.minimo),
+                        'fechamento': stmt.excluded.fechamento,
+                        'volume': func.coalesce(stmt.excluded.volume, tabela.c.volume),
+                        'fonte': stmt.excluded.fonte,
+                        'atualizado_em': func.now()
+                    }
                 )
-                session.add(novo_preco)
-                logger.info(f"Novo preço salvo para {ticker} usuario {user_id}: {cotacao['preco_atual']}")
+                session.execute(stmt)
             
             session.commit()
-            return True
+            
+            # Las últimas cotizaciones de BD en cache de estos tickers ya no son las últimas
+            for ticker in {linha['ticker'] for linha in linhas}:
+                cotacoes_bd_cache.delete(QuoteCache.make_key(ticker, 'BD', 'ultima'))
+            
+            # Aplicar los cierres a la matriz de precios compartida
+            MatrizPrecosService.registrar_fechamentos(linhas)
+            return len(linhas)
             
         except Exception as e:
             session.rollback()
-            logger.error(f"Erro ao salvar preço diário para {ticker}: {e}", exc_info=True)
-            return False
+            logger.error(f"Erro ao salvar cotações diárias: {e}", exc_info=True)
+            return 0
         finally:
             session.close()
     
+    @staticmethod
+    def salvar_precos_diarios(itens: List[Tuple[int, Optional[dict]]]) -> int:
+        """
+        Guarda de una vez las cotizaciones de varios activos del usuario
+        
+        Reutiliza las cotizaciones ya obtenidas (p. ej. con obter_cotacoes_lote):
+        no vuelve a consultar el proveedor. La propiedad de los activos se
+        comprueba con una sola consulta y todas las filas se escriben en un
+        único upsert dentro de una transacción.
+        
+        Args:
+            itens: Pares (ativo_id, cotacao) de activos del usuario actual
+            
+        Returns:
+            int: Número de activos cuyo precio se guardó
+        """
+        itens = [(ativo_id, cotacao) for ativo_id, cotacao in itens
+                 if cotacao and cotacao.get('fonte') not in FONTES_SEM_PERSISTENCIA]
+        if not itens:
+            return 0
+        
+        session = SessionLocal()
+        try:
+            user_id = CotacaoService._get_current_user_id()
+            
+            proprios = {
+                ativo_id for (ativo_id,) in session.query(Ativo.id).filter(
+                    Ativo.id.in_({ativo_id for ativo_id, _ in itens}),
+                    Ativo.user_id == user_id
+                ).all()
+            }
+        except Exception as e:
+            logger.error(f"Erro ao verificar ativos para salvar preços diários: {e}", exc_info=True)
+            return 0
+        finally:
+            session.close()
+        
+        alheios = {ativo_id for ativo_id, _ in itens} - proprios
+        if alheios:
+            logger.warning(f"Ativos {sorted(alheios)} não pertencem ao usuario {user_id}")
+        
+        cotacoes = [cotacao for ativo_id, cotacao in itens if ativo_id in proprios]
+        if not cotacoes or not CotacaoService.salvar_cotacoes_diarias(cotacoes):
+            return 0
+        
+        logger.info(f"Preços salvos para {len(cotacoes)} ativos pelo usuario {user_id}")
+        return len(cotacoes)
+    
+    @staticmethod
+    def salvar_preco_diario(ativo_id: int, ticker: str, cotacao: Optional[dict] = None) -> bool:
+        """
+        Guarda la cotización actual de un activo del usuario en el almacén global
+        
+        La cotización se guarda una sola vez por ticker y fecha de mercado,
+        compartida por todos los usuarios que tienen el activo. Para varios
+        activos, usar salvar_precos_diarios.
+        
+        Args:
+            ativo_id: ID del activo (debe pertenecer al usuario actual)
+            ticker: Símbolo del ticker
+            cotacao: Cotización ya obtenida (si no se especifica, se consulta)
+            
+        Returns:
+            bool: True si se guardó correctamente, False en caso contrario
+        """
+        # Obtener cotización actual si no se ha proporcionado
+        if cotacao is None:
+            cotacao = CotacaoService.obter_cotacao_atual(ticker)
+        if not cotacao or cotacao.get('fonte') in FONTES_SEM_PERSISTENCIA:
+            logger.warning(f"Não foi possível obter cotação do provedor para salvar preço de {ticker}")
+            return False
+        
+        return CotacaoService.salvar_precos_diarios([(ativo_id, cotacao)]) == 1
+    
     @staticmethod
     def obter_historico_usuario(ticker: str, dias: int = 30) -> pd.DataFrame:
         """
-        Obtiene el histórico de precios de un ticker del usuario actual desde la BD
+        Obtiene el histórico de precios guardado de un ticker del usuario actual
         
         Args:
             ticker: Símbolo del ticker
             dias: Número de días de histórico
             
         Returns:
-            pd.DataFrame: DataFrame con el histórico de precios del usuario
+            pd.DataFrame: Histórico OHLCV del almacén global (vacío si el
+            activo no pertenece al usuario o no hay datos)
         """
         session = SessionLocal()
         try:
             user_id = CotacaoService._get_current_user_id()
             
-            # Buscar el activo del usuario
+            # Verificar que el activo pertenece al usuario
             ativo = session.query(Ativo).filter(
                 Ativo.ticker == ticker,
                 Ativo.user_id == user_id
@@ -337,76 +1049,71 @@ class CotacaoService:
                 logger.warning(f"Ativo {ticker} não encontrado para usuario {user_id}")
                 return pd.DataFrame()
             
-            # Obtener histórico del usuario
-            data_inicio = datetime.now() - timedelta(days=dias)
-            precos = session.query(PrecoDiario).filter(
-                PrecoDiario.ativo_id == ativo.id,
-                PrecoDiario.user_id == user_id,
-                PrecoDiario.data >= data_inicio.date()
-            ).order_by(PrecoDiario.data).all()
-            
-            if not precos:
-                logger.warning(f"Nenhum histórico encontrado para {ticker} usuario {user_id}")
-                return pd.DataFrame()
-            
-            # Convertir a DataFrame
-            data = {
-                'Date': [p.data for p in precos],
-                'Close': [float(p.preco_fechamento) for p in precos]
-            }
-            
-            df = pd.DataFrame(data)
-            df.set_index('Date', inplace=True)
-            
-            logger.info(f"Histórico obtido para {ticker} usuario {user_id}: {len(df)} dias")
-            return df
-            
         except Exception as e:
             logger.error(f"Erro ao obter histórico de BD para {ticker}: {e}")
             return pd.DataFrame()
         finally:
             session.close()
+        
+        df = CotacaoService.obter_historico_bd(ticker, dias)
+        if df.empty:
+            logger.warning(f"Nenhum histórico encontrado para {ticker}")
+        else:
+            logger.info(f"Histórico obtido para {ticker} usuario {user_id}: {len(df)} dias")
+        return df
     
     @staticmethod
-    def get_cache_stats(user_id: int = None) -> dict:
+    def get_rate_limit_stats() -> dict:
         """
-        Obtiene estadísticas del cache de cotizaciones
+        Obtiene métricas del limitador de peticiones a Yahoo Finance
+        
+        Returns:
+            dict: Tasa, ráfaga, tokens disponibles y tiempos de espera en cola
+        """
+        return yahoo_rate_limiter.stats()
+    
+    @staticmethod
+    def get_circuit_stats() -> dict:
+        """
+        Obtiene el estado del circuit breaker del proveedor de datos de mercado
         
-        Args:
-            user_id: ID del usuario (si no se especifica, usa el usuario actual)
-            
         Returns:
-            dict: Estadísticas del cache
+            dict: Estado (CLOSED/OPEN/HALF_OPEN), fallos consecutivos y contadores
+        """
+        return market_data_circuit.stats()
+    
+    @staticmethod
+    def reset_circuit():
+        """Cierra manualmente el circuit breaker del proveedor"""
+        market_data_circuit.reset()
+        logger.info("Circuit breaker do provedor de cotações fechado manualmente")
+    
+    @staticmethod
+    def get_coalescing_stats() -> dict:
+        """
+        Obtiene métricas de coalescencia de peticiones (single-flight)
+        
+        Returns:
+            dict: Descargas líderes, tickers compartidos con otra descarga y en curso
+        """
+        return _voos_cotacoes.stats()
+    
+    @staticmethod
+    def get_cache_stats() -> dict:
+        """
+        Obtiene estadísticas del cache compartido de cotizaciones
+        
+        Returns:
+            dict: Estadísticas del cache (entradas, tamaño, aciertos, fallos y desalojos)
         """
         try:
-            if user_id is None:
-                user_id = CotacaoService._get_current_user_id()
-            
-            global cotizacoes_cache
-            
-            if user_id not in cotizacoes_cache:
-                return {
-                    'total_entries': 0,
-                    'user_id': user_id,
-                    'cache_size_kb': 0
-                }
-            
-            user_cache = cotizacoes_cache[user_id]
-            total_entries = len(user_cache)
-            
-            # Estimar tamaño del cache (aproximado)
-            cache_size = sum(len(str(data)) for _, data in user_cache.values())
-            
-            return {
-                'total_entries': total_entries,
-                'user_id': user_id,
-                'cache_size_kb': round(cache_size / 1024, 2)
-            }
-            
+            return cotizacoes_cache.stats()
         except Exception as e:
             logger.error(f"Erro ao obter estatísticas de cache: {e}")
             return {
                 'total_entries': 0,
-                'user_id': user_id,
-                'cache_size_kb': 0
-            }
\ No newline at end of file
+                'cache_size_kb': 0,
+                'hits': 0,
+                'misses': 0,
+                'evictions': 0
+            }
@@ -0,0 +1,211 @@
+"""
+Servicio de Matriz de Precios
+
+Este módulo mantiene una matriz de cierres diarios compartida por todas las
+sesiones del proceso. Los tickers se cargan de cotacoes_diarias la primera
+vez que se consultan (en una sola consulta por lote) y los cierres nuevos
+se aplican in situ a medida que se guardan, de modo que valoraciones,
+resultados e indicadores pueden leer precios con consultas vectorizadas.
+
+Los cálculos que guardan resultados derivados de la matriz (p. ej. las
+series de patrimonio) se registran con ao_alterar para saber desde qué día
+dejan de ser válidos cuando se guardan o corrigen cierres, o cuando la matriz
+se recarga.
+"""
+
+import threading
+import time
+from datetime import date
+from typing import Callable, Dict, List, Optional, Tuple
+from collections import defaultdict
+import numpy as np
+from ..models import SessionLocal, CotacaoDiaria
+from ..utils import Config
+from ..utils.logging_config import get_logger
+from ..utils.columnar_cache import data_para_dia
+from ..utils.price_matrix import MatrizPrecos
+
+# Configurar logger
+logger = get_logger(__name__)
+
+# Matriz compartida por todas las sesiones del proceso
+matriz_precos = MatrizPrecos()
+_carga_lock = threading.Lock()
+_carregada_em = time.monotonic()
+
+# Funciones avisadas con {ticker: primer día modificado} o None (matriz recargada)
+_ouvintes: List[Callable[[Optional[Dict[str, int]]], None]] = []
+
+
+def _notificar(alteracoes: Optional[Dict[str, int]]):
+    """Avisa a los ouvintes registrados (sin mantener ningún lock de la matriz)"""
+    for ouvinte in list(_ouvintes):
+        try:
+            ouvinte(alteracoes)
+        except Exception as e:
+            logger.error(f"Erro ao notificar alteração da matriz de preços: {e}")
+
+
+class MatrizPrecosService:
+    """Servicio de consultas vectorizadas de cierres diarios"""
+
+    @staticmethod
+    def _garantir_carregados(tickers: List[str]):
+        """
+        Carga en la matriz los tickers que todavía no están en ella
+
+        Si la matriz supera MATRIZ_PRECOS_TTL se vacía antes, para recoger los
+        cierres escritos por otros procesos (por ejemplo, el actualizador
+        ejecutado de forma independiente).
+
+        Args:
+            tickers: Lista de símbolos de ticker
+        """
+        global _carregada_em
+
+        recarregada = False
+        with _carga_lock:
+            if time.monotonic() - _carregada_em > Config.MATRIZ_PRECOS_TTL:
+                matriz_precos.limpar()
+                _carregada_em = time.monotonic()
+                recarregada = True
+
+            MatrizPrecosService._carregar_faltantes(tickers)
+
+        if recarregada:
+            _notificar(None)
+
+    @staticmethod
+    def _carregar_faltantes(tickers: List[str]):
+        """Carga de la BD los tickers que no están en la matriz (requiere _carga_lock)"""
+        faltantes = sorted({t for t in tickers if not matriz_precos.contem(t)})
+        if not faltantes:
+            return
+
+        session = SessionLocal()
+        try:
+            linhas = session.query(
+                CotacaoDiaria.ticker,
+                CotacaoDiaria.data,
+                CotacaoDiaria.fechamento
+            ).filter(
+                CotacaoDiaria.ticker.in_(faltantes)
+            ).order_by(CotacaoDiaria.ticker, CotacaoDiaria.data).all()
+        finally:
+            session.close()
+
+        series = defaultdict(list)
+        for ticker, data, fechamento in linhas:
+            series[ticker].append((data_para_dia(data), float(fechamento)))
+
+        for ticker in faltantes:
+            serie = series.get(ticker, [])
+            dias = np.array([d for d, _ in serie], dtype=np.int64)
+            precos = np.array([p for _, p in serie], dtype=np.float64)
+            matriz_precos.definir_serie(ticker, dias, precos)
+
+        logger.info(f"Matriz de preços: {len(faltantes)} tickers carregados ({len(linhas)} fechamentos)")
+
+    @staticmethod
+    def obter_fechamentos(tickers: List[str], data: Optional[date] = None) -> Dict[str, Optional[float]]:
+        """
+        Obtiene el último cierre conocido de varios tickers en una fecha
+
+        Args:
+            tickers: Lista de símbolos de ticker
+            data: Fecha de referencia, incluida (None = hoy)
+
+        Returns:
+            Dict[str, Optional[float]]: Cierre por ticker (None si no hay datos)
+        """
+        precos = MatrizPrecosService.obter_fechamentos_array(tickers, data)
+        return {
+            ticker: None if np.isnan(preco) else float(preco)
+            for ticker, preco in zip(tickers, precos)
+        }
+
+    @staticmethod
+    def obter_fechamentos_array(tickers: List[str], data: Optional[date] = None) -> np.ndarray:
+        """
+        Versión vectorizada de obter_fechamentos
+
+        Args:
+            tickers: Lista de símbolos de ticker
+            data: Fecha de referencia, incluida (None = hoy)
+
+        Returns:
+            np.ndarray: Cierres en el orden de tickers (NaN si no hay datos)
+        """
+        MatrizPrecosService._garantir_carregados(tickers)
+        return matriz_precos.fechamentos_em(tickers, data_para_dia(data or date.today()))
+
+    @staticmethod
+    def obter_matriz(tickers: List[str], inicio: date, fim: Optional[date] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Obtiene la matriz de cierres de varios tickers en un rango de fechas
+
+        Args:
+            tickers: Lista de símbolos de ticker
+            inicio: Primera fecha (incluida)
+            fim: Última fecha (incluida, None = hoy)
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (fechas datetime64[D] de las
+            sesiones, matriz len(tickers) x sesiones con el último cierre
+            conocido; NaN antes del primer cierre)
+        """
+        MatrizPrecosService._garantir_carregados(tickers)
+        dias, valores = matriz_precos.janela(
+            tickers, data_para_dia(inicio), data_para_dia(fim or date.today())
+        )
+        return dias.astype('datetime64[D]'), valores
+
+    @staticmethod
+    def registrar_fechamentos(linhas: List[dict]):
+        """
+        Aplica in situ cierres recién guardados a los tickers ya cargados
+
+        Los tickers que no están en la matriz se ignoran: se cargarán de la BD
+        cuando se consulten.
+
+        Args:
+            linhas: Filas con al menos ticker, data y fechamento
+        """
+        alteracoes: Dict[str, int] = {}
+        for linha in linhas:
+            dia = data_para_dia(linha['data'])
+            alteracoes[linha['ticker']] = min(dia, alteracoes.get(linha['ticker'], dia))
+            if matriz_precos.contem(linha['ticker']):
+                matriz_precos.atualizar(linha['ticker'], dia, float(linha['fechamento']))
+
+        _notificar(alteracoes)
+
+    @staticmethod
+    def invalidar():
+        """Vacía la matriz (se recargará bajo demanda)"""
+        matriz_precos.limpar()
+        _notificar(None)
+
+    @staticmethod
+    def ao_alterar(ouvinte: Callable[[Optional[Dict[str, int]]], None]):
+        """
+        Registra una función a la que se avisa cuando cambian los cierres
+
+        Se llama con {ticker: primer día modificado} al guardar cierres y con
+        None cuando la matriz se vacía o se recarga entera. Debe ser rápida y
+        no bloquearse: se ejecuta en el hilo que guarda los cierres.
+
+        Args:
+            ouvinte: Función a registrar
+        """
+        _ouvintes.append(ouvinte)
+
+    @staticmethod
+    def get_stats() -> dict:
+        """
+        Obtiene estadísticas de la matriz de precios
+
+        Returns:
+            dict: Tickers, sesiones, rango de fechas y memoria reservada
+        """
+        return matriz_precos.stats()
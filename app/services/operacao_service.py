@@ -60,7 +60,7 @@ class OperacaoService(BaseService):
                 posicao_atual = session.query(Posicao).filter(
                     Posicao.ativo_id == ativo_id,
                     Posicao.user_id == user_id
-                ).first()
+                ).with_for_update().first()
                 
                 if not posicao_atual:
                     logger.warning(f"Usuario {user_id} tentou venda sem posição: ativo_id={ativo_id}")
@@ -82,14 +82,15 @@ class OperacaoService(BaseService):
                 user_id=user_id  # Asignar al usuario actual
             )
             session.add(nova_operacao)
+            
+            # Ajustar la posición en la misma transacción (importar aquí para evitar circular)
+            from .posicao_service import PosicaoService
+            PosicaoService.aplicar_operacao(session, nova_operacao)
             session.commit()
+            PosicaoService.invalidar_avaliacao(user_id)
             
             logger.info(f"Usuario {user_id} registrou operação com sucesso para ativo {ativo_id}")
             
-            # Actualizar posición del usuario (importar aquí para evitar circular)
-            from .posicao_service import PosicaoService
-            PosicaoService.atualizar_posicao(ativo_id)
-            
             st.success(f"✅ Operación de {tipo} registrada correctamente en tu cartera")
             return True
             
@@ -200,18 +201,15 @@ class OperacaoService(BaseService):
                 st.error(f"❌ Operación {operacao_id} no encontrada en tu cartera")
                 return False
             
-            ativo_id = operacao.ativo_id
-            
-            # Eliminar la operación
+            # Eliminar la operación y revertir su efecto en la posición en la misma transacción
+            from .posicao_service import PosicaoService
+            PosicaoService.aplicar_operacao(session, operacao, sinal=-1)
             session.delete(operacao)
             session.commit()
+            PosicaoService.invalidar_avaliacao(user_id)
             
             logger.info(f"Usuario {user_id} eliminó operação {operacao_id} com sucesso")
             
-            # Actualizar posición del usuario
-            from .posicao_service import PosicaoService
-            PosicaoService.atualizar_posicao(ativo_id)
-            
             st.success(f"✅ Operación eliminada correctamente de tu cartera")
             return True
             
@@ -5,17 +5,43 @@ Este módulo contiene la lógica de negocio para el manejo de posiciones
 consolidadas de activos financieros con soporte multi-usuario.
 """
 
-import logging
+import threading
+from collections import defaultdict
+import numpy as np
+import pandas as pd
 import streamlit as st
-from datetime import datetime, timedelta
-from typing import List, Optional
-from ..models import SessionLocal, Posicao, Operacao, Ativo, PrecoDiario
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import Float, and_, bindparam, case, cast, func, insert, literal, or_, update
+from sqlalchemy.orm import aliased
+from ..models import SessionLocal, Posicao, Operacao, Ativo, CotacaoDiaria, Lote, SnapshotPosicao
+from ..models.base import insert_upsert
+from ..utils import Config
 from ..utils.auth import StreamlitAuth
+from ..utils.cache import QuoteCache
+from ..utils.columnar_cache import data_para_dia
+from ..utils.cost_basis import CarteiraLotes
 from ..utils.logging_config import get_logger
+from ..utils.nav_series import SeriePatrimonio
+from ..utils.portfolio_valuation import AvaliacaoCarteira
+from ..utils.position_snapshots import (
+    deserializar_lotes, gerar_snapshots, instantanea, precisa_snapshot
+)
+from .matriz_precos_service import MatrizPrecosService
 
 # Configurar logger
 logger = get_logger(__name__)
 
+# Valoración de la cartera por usuario, compartida por todas las páginas y
+# estadísticas. Se invalida cuando cambian las posiciones del usuario
+avaliacoes_cache = QuoteCache(ttl=Config.CACHE_TIMEOUT, max_entries=Config.CACHE_MAX_ENTRIES)
+
+# Series de patrimonio por usuario (estado incremental, ver SeriePatrimonio).
+# Su valoración depende de la matriz de precios, que se recarga cada
+# MATRIZ_PRECOS_TTL, por lo que las entradas no viven más que ella
+series_patrimonio = QuoteCache(ttl=Config.MATRIZ_PRECOS_TTL, max_entries=Config.CACHE_MAX_ENTRIES)
+_series_lock = threading.Lock()
+
 
 class PosicaoService:
     """Servicio para gestión de posiciones de activos financieros con soporte multi-usuario"""
@@ -40,10 +66,347 @@ class PosicaoService:
         
         return user['id']
     
+    @staticmethod
+    def _ler_operacoes(session, user_id: int, ativo_id: int = None, excluir_operacao_id: int = None) -> List[dict]:
+        """
+        Lee las operaciones del usuario en el orden en que se procesan los lotes
+        
+        Args:
+            session: Sesión de base de datos
+            user_id: ID del usuario
+            ativo_id: ID del activo (None = todos)
+            excluir_operacao_id: Operación a omitir (la que se está eliminando)
+            
+        Returns:
+            List[dict]: Operaciones ordenadas por activo, fecha e id
+        """
+        query = session.query(
+            Operacao.id,
+            Operacao.ativo_id,
+            Operacao.data,
+            Operacao.tipo,
+            Operacao.quantidade,
+            cast(Operacao.preco, Float).label('preco')
+        ).filter(Operacao.user_id == user_id)
+        if ativo_id is not None:
+            query = query.filter(Operacao.ativo_id == ativo_id)
+        if excluir_operacao_id is not None:
+            query = query.filter(Operacao.id != excluir_operacao_id)
+        return [
+            operacao._asdict()
+            for operacao in query.order_by(Operacao.ativo_id, Operacao.data, Operacao.id).all()
+        ]
+    
+    @staticmethod
+    def _reconstruir_lotes(session, user_id: int, ativo_id: int = None,
+                           excluir_operacao_id: int = None) -> CarteiraLotes:
+        """
+        Reconstruye los lotes abiertos y las instantáneas desde las operaciones en una sola pasada
+        
+        Se ejecuta dentro de la transacción del llamador (no hace commit):
+        sustituye los lotes y las instantáneas guardados del usuario (o de un
+        activo) por los que resultan de procesar todas sus operaciones.
+        
+        Args:
+            session: Sesión de la transacción
+            user_id: ID del usuario
+            ativo_id: ID del activo (None = todos los del usuario)
+            excluir_operacao_id: Operación a omitir (la que se está eliminando)
+            
+        Returns:
+            CarteiraLotes: Lotes, coste base y resultado realizado por activo
+            
+        Raises:
+            ValueError: Si alguna venta supera la cantidad en cartera a su fecha
+        """
+        carteira, snapshots = gerar_snapshots(
+            PosicaoService._ler_operacoes(session, user_id, ativo_id, excluir_operacao_id),
+            Config.COST_BASIS_METHOD,
+            Config.POSITION_SNAPSHOT_EVERY
+        )
+        
+        for modelo in (Lote, SnapshotPosicao):
+            guardados = session.query(modelo).filter(modelo.user_id == user_id)
+            if ativo_id is not None:
+                guardados = guardados.filter(modelo.ativo_id == ativo_id)
+            guardados.delete(synchronize_session=False)
+        
+        lotes = [
+            {
+                'ativo_id': ativo,
+                'operacao_id': lote['operacao_id'],
+                'data': lote['data'],
+                'quantidade': lote['quantidade'],
+                'preco': lote['preco'],
+                'user_id': user_id
+            }
+            for ativo in carteira.ativos()
+            for lote in carteira.lotes_abertos(ativo)
+        ]
+        if lotes:
+            session.execute(insert(Lote), lotes)
+        if snapshots:
+            session.execute(insert(SnapshotPosicao), [dict(snapshot, user_id=user_id) for snapshot in snapshots])
+        
+        return carteira
+    
+    @staticmethod
+    def _registrar_snapshot(session, operacao: Operacao, carteira: CarteiraLotes) -> bool:
+        """
+        Guarda la instantánea de la posición antes de aplicar una operación, si corresponde
+        
+        La cartera contiene el estado tras todas las operaciones anteriores
+        del activo; si la nueva operación es de un día posterior y desde la
+        última instantánea hay POSITION_SNAPSHOT_EVERY operaciones o cambia el
+        mes, ese estado se guarda con la fecha de la última operación.
+        
+        Args:
+            session: Sesión de la transacción de la operación
+            operacao: Operación que se va a aplicar (no retroactiva)
+            carteira: Estado del activo antes de aplicarla
+            
+        Returns:
+            bool: True si se guardó una instantánea
+        """
+        ultimo_snapshot = session.query(func.max(SnapshotPosicao.data)).filter(
+            SnapshotPosicao.ativo_id == operacao.ativo_id,
+            SnapshotPosicao.user_id == operacao.user_id
+        ).scalar()
+        anteriores = session.query(func.max(Operacao.data), func.count(Operacao.id)).filter(
+            Operacao.ativo_id == operacao.ativo_id,
+            Operacao.user_id == operacao.user_id,
+            Operacao.id != operacao.id
+        )
+        if ultimo_snapshot:
+            anteriores = anteriores.filter(Operacao.data > ultimo_snapshot)
+        ultima_data, operacoes_desde = anteriores.one()
+        
+        if not precisa_snapshot(ultima_data, operacao.data, operacoes_desde, Config.POSITION_SNAPSHOT_EVERY):
+            return False
+        
+        session.add(SnapshotPosicao(user_id=operacao.user_id, **instantanea(carteira, operacao.ativo_id, ultima_data)))
+        return True
+    
+    @staticmethod
+    def aplicar_operacao(session, operacao: Operacao, sinal: int = 1) -> Posicao:
+        """
+        Ajusta la posición y los lotes de un activo con una operación nueva o eliminada
+        
+        Se ejecuta dentro de la transacción de la operación (no hace commit).
+        El caso habitual, una operación con la fecha más reciente del activo,
+        es incremental: una compra abre un lote y una venta consume los lotes
+        abiertos desde el más antiguo, y solo se escriben los lotes afectados,
+        sin releer el histórico de operaciones ni consultar el proveedor de
+        cotizaciones.
+        
+        La reconstrucción de todos los lotes del usuario y activo desde sus
+        operaciones (_reconstruir_lotes) es solo el camino de respaldo para
+        tres casos: eliminar una operación, registrar una con fecha anterior
+        a otras del activo y lotes guardados que no cuadran con la posición.
+        tests/test_posicao_incremental.py comprueba que el caso habitual no
+        reconstruye.
+        
+        La fila de la posición se bloquea (SELECT ... FOR UPDATE) para que dos
+        operaciones simultáneas no pierdan ajustes.
+        
+        Args:
+            session: Sesión de la transacción de la operación
+            operacao: Operación registrada o eliminada
+            sinal: 1 al registrar la operación, -1 al eliminarla
+            
+        Returns:
+            Posicao: Posición actualizada (pendiente de commit)
+            
+        Raises:
+            ValueError: Si una venta supera la cantidad en cartera a su fecha
+        """
+        posicao = session.query(Posicao).filter(
+            Posicao.ativo_id == operacao.ativo_id,
+            Posicao.user_id == operacao.user_id
+        ).with_for_update().first()
+        
+        if not posicao:
+            posicao = Posicao(
+                ativo_id=operacao.ativo_id,
+                user_id=operacao.user_id,
+                quantidade_total=0,
+                preco_medio=0,
+                custo_total=0,
+                preco_atual=0,
+                resultado_dia=0,
+                resultado_acumulado=0,
+                resultado_realizado=0
+            )
+            session.add(posicao)
+        
+        # El lote guarda el id de la compra que lo abre
+        if operacao.id is None:
+            session.flush()
+        
+        quantidade_anterior = posicao.quantidade_total or 0
+        ativo_id = operacao.ativo_id
+        
+        reconstruir = sinal < 0 or session.query(Operacao.id).filter(
+            Operacao.ativo_id == ativo_id,
+            Operacao.user_id == operacao.user_id,
+            Operacao.id != operacao.id,
+            Operacao.data > operacao.data
+        ).first() is not None
+        
+        if not reconstruir:
+            lotes = session.query(Lote).filter(
+                Lote.ativo_id == ativo_id,
+                Lote.user_id == operacao.user_id
+            ).order_by(Lote.data, Lote.id).with_for_update().all()
+            # Lotes ausentes (posiciones anteriores a los lotes) o inconsistentes
+            reconstruir = sum(lote.quantidade for lote in lotes) != quantidade_anterior
+        
+        if reconstruir:
+            carteira = PosicaoService._reconstruir_lotes(
+                session, operacao.user_id, ativo_id,
+                excluir_operacao_id=operacao.id if sinal < 0 else None
+            )
+        else:
+            carteira = CarteiraLotes.de_lotes(
+                ativo_id,
+                [
+                    {'id': lote.id, 'operacao_id': lote.operacao_id, 'data': lote.data,
+                     'quantidade': lote.quantidade, 'preco': float(lote.preco)}
+                    for lote in lotes
+                ],
+                Config.COST_BASIS_METHOD,
+                custo=float(posicao.custo_total or 0) if Config.COST_BASIS_METHOD == 'MEDIO' else None,
+                realizado=float(posicao.resultado_realizado or 0)
+            )
+            
+            # Instantánea del estado anterior (cada N operaciones o al cerrar el mes)
+            PosicaoService._registrar_snapshot(session, operacao, carteira)
+            efeito = carteira.processar({
+                'id': operacao.id,
+                'ativo_id': ativo_id,
+                'data': operacao.data,
+                'tipo': operacao.tipo,
+                'quantidade': operacao.quantidade,
+                'preco': operacao.preco
+            })
+            
+            # Escribir solo los lotes afectados
+            por_id = {lote.id: lote for lote in lotes}
+            for lote in efeito['lotes']:
+                if lote['id'] is None:
+                    session.add(Lote(
+                        ativo_id=ativo_id,
+                        operacao_id=lote['operacao_id'],
+                        data=lote['data'],
+                        quantidade=lote['quantidade'],
+                        preco=lote['preco'],
+                        user_id=operacao.user_id
+                    ))
+                elif lote['quantidade'] == 0:
+                    session.delete(por_id[lote['id']])
+                else:
+                    por_id[lote['id']].quantidade = lote['quantidade']
+        
+        resumo = carteira.resumo(ativo_id)
+        quantidade_total = resumo['quantidade']
+        preco_medio = resumo['preco_medio']
+        
+        # Precio de valoración: el último guardado en la posición o, si es
+        # nueva, el último cierre guardado (sin acceder a la red). Se consulta
+        # con la misma sesión: SessionLocal es una scoped_session y otro
+        # servicio que la cerrase descartaría la transacción en curso
+        preco_atual = float(posicao.preco_atual or 0)
+        if not preco_atual:
+            ultimo_fechamento = session.query(CotacaoDiaria.fechamento).join(
+                Ativo, Ativo.ticker == CotacaoDiaria.ticker
+            ).filter(
+                Ativo.id == ativo_id
+            ).order_by(CotacaoDiaria.data.desc()).limit(1).scalar()
+            preco_atual = float(ultimo_fechamento) if ultimo_fechamento is not None else float(operacao.preco)
+        
+        # La variación del día por acción no cambia: se reescala a la nueva cantidad
+        if quantidade_anterior > 0 and quantidade_total > 0:
+            resultado_dia = float(posicao.resultado_dia or 0) / quantidade_anterior * quantidade_total
+        else:
+            resultado_dia = 0
+        
+        posicao.quantidade_total = quantidade_total
+        posicao.custo_total = round(resumo['custo_total'], 4)
+        posicao.preco_medio = round(preco_medio, 4)
+        posicao.preco_atual = preco_atual
+        posicao.resultado_dia = round(resultado_dia, 4)
+        posicao.resultado_acumulado = round(carteira.resumo(ativo_id, preco_atual)['resultado_nao_realizado'], 4)
+        posicao.resultado_realizado = round(resumo['resultado_realizado'], 4)
+        
+        logger.info(
+            f"Posição ajustada para ativo {ativo_id} usuario {operacao.user_id}: "
+            f"quantidade={quantidade_total}, preço_médio={preco_medio:.4f}, "
+            f"realizado={resumo['resultado_realizado']:.2f}{' (lotes reconstruídos)' if reconstruir else ''}"
+        )
+        return posicao
+    
+    @staticmethod
+    def verificar_posicao(ativo_id: int, user_id: int = None) -> dict:
+        """
+        Compara la posición y los lotes mantenidos de forma incremental con los calculados desde las operaciones
+        
+        Args:
+            ativo_id: ID del activo
+            user_id: ID del usuario (si no se especifica, usa el usuario actual)
+            
+        Returns:
+            dict: Cantidad, coste base, resultado realizado y cantidad en
+            lotes guardados y esperados, y 'consistente'
+        """
+        session = SessionLocal()
+        try:
+            if user_id is None:
+                user_id = PosicaoService._get_current_user_id()
+            
+            esperado = CarteiraLotes(Config.COST_BASIS_METHOD).processar_todas(
+                PosicaoService._ler_operacoes(session, user_id, ativo_id)
+            ).resumo(ativo_id)
+            
+            posicao = session.query(Posicao).filter(
+                Posicao.ativo_id == ativo_id,
+                Posicao.user_id == user_id
+            ).first()
+            
+            quantidade_lotes = session.query(func.coalesce(func.sum(Lote.quantidade), 0)).filter(
+                Lote.ativo_id == ativo_id,
+                Lote.user_id == user_id
+            ).scalar()
+            
+            quantidade_atual = posicao.quantidade_total if posicao else 0
+            custo_atual = float(posicao.custo_total or 0) if posicao else 0
+            realizado_atual = float(posicao.resultado_realizado or 0) if posicao else 0
+            
+            return {
+                'ativo_id': ativo_id,
+                'quantidade': quantidade_atual,
+                'quantidade_esperada': esperado['quantidade'],
+                'quantidade_lotes': int(quantidade_lotes),
+                'custo_total': custo_atual,
+                'custo_total_esperado': esperado['custo_total'],
+                'resultado_realizado': realizado_atual,
+                'resultado_realizado_esperado': esperado['resultado_realizado'],
+                'consistente': (
+                    quantidade_atual == esperado['quantidade'] == int(quantidade_lotes)
+                    and abs(custo_atual - esperado['custo_total']) < 0.01
+                    and abs(realizado_atual - esperado['resultado_realizado']) < 0.01
+                )
+            }
+        finally:
+            session.close()
+    
     @staticmethod
     def atualizar_posicao(ativo_id: int, user_id: int = None) -> bool:
         """
-        Actualiza la posición consolidada de un activo para un usuario específico
+        Reconstruye la posición consolidada de un activo desde todas sus operaciones
+        
+        Las operaciones mantienen la posición de forma incremental con
+        aplicar_operacao; esta reconstrucción completa (que además consulta la
+        cotización actual) queda para reparar posiciones inconsistentes.
         
         Args:
             ativo_id: ID del activo
@@ -70,29 +433,8 @@ class PosicaoService:
                 logger.warning(f"Ativo {ativo_id} não pertence ao usuario {user_id}")
                 return False
             
-            # Obtener todas las operaciones del activo del usuario
-            operacoes = session.query(Operacao).filter(
-                Operacao.ativo_id == ativo_id,
-                Operacao.user_id == user_id
-            ).all()
-            
-            logger.info(f"Encontradas {len(operacoes)} operações para ativo {ativo_id} usuario {user_id}")
-            
-            quantidade_total = 0
-            valor_total = 0
-            
-            for op in operacoes:
-                if op.tipo == 'compra':
-                    quantidade_total += op.quantidade
-                    valor_total += op.quantidade * float(op.preco)
-                else:  # venda
-                    quantidade_total -= op.quantidade
-                    valor_total -= op.quantidade * float(op.preco)
-            
-            preco_medio = valor_total / quantidade_total if quantidade_total > 0 else 0
-            logger.info(f"Posição calculada para usuario {user_id}: quantidade={quantidade_total}, preço_médio={preco_medio:.4f}")
-            
-            # Obtener precio actual
+            # Obtener precio actual (antes de escribir: los servicios de
+            # cotizaciones cierran la sesión compartida)
             from .cotacao_service import CotacaoService
             cotacao = CotacaoService.obter_cotacao_atual(ativo.ticker)
             preco_atual = cotacao['preco_atual'] if cotacao else 0
@@ -100,18 +442,28 @@ class PosicaoService:
             if preco_atual == 0:
                 logger.warning(f"Preço atual não disponível para {ativo.ticker}, usando 0")
             
-            # Calcular resultados
-            resultado_acumulado = (preco_atual - preco_medio) * quantidade_total if quantidade_total > 0 else 0
-            
-            # Obtener precio de ayer para resultado del día (del usuario)
-            ontem = datetime.now().date() - timedelta(days=1)
-            preco_ontem = session.query(PrecoDiario).filter(
-                PrecoDiario.ativo_id == ativo_id,
-                PrecoDiario.user_id == user_id,
-                PrecoDiario.data == ontem
-            ).first()
+            # Obtener el cierre de la sesión anterior a la cotización para resultado del día
+            data_cotacao = cotacao['data'] if cotacao else datetime.now().date()
+            preco_ontem = MatrizPrecosService.obter_fechamentos(
+                [ativo.ticker], data_cotacao - timedelta(days=1)
+            )[ativo.ticker]
+            
+            # Lotes abiertos, coste base y resultado realizado desde todas las operaciones
+            carteira = PosicaoService._reconstruir_lotes(session, user_id, ativo_id)
+            resumo = carteira.resumo(ativo_id, preco_atual)
+            
+            quantidade_total = resumo['quantidade']
+            valor_total = resumo['custo_total']
+            preco_medio = resumo['preco_medio']
+            resultado_realizado = resumo['resultado_realizado']
+            logger.info(
+                f"Posição calculada para usuario {user_id}: quantidade={quantidade_total}, "
+                f"preço_médio={preco_medio:.4f}, realizado={resultado_realizado:.2f}"
+            )
             
-            resultado_dia = (preco_atual - float(preco_ontem.preco_fechamento)) * quantidade_total if preco_ontem and quantidade_total > 0 else 0
+            # Calcular resultados
+            resultado_acumulado = resumo['resultado_nao_realizado']
+            resultado_dia = (preco_atual - preco_ontem) * quantidade_total if preco_ontem and quantidade_total > 0 else 0
             
             # Actualizar o crear posición del usuario
             posicao = session.query(Posicao).filter(
@@ -123,23 +475,28 @@ class PosicaoService:
                 logger.info(f"Atualizando posição existente para {ativo.ticker} usuario {user_id}")
                 posicao.quantidade_total = quantidade_total
                 posicao.preco_medio = preco_medio
+                posicao.custo_total = valor_total
                 posicao.preco_atual = preco_atual
                 posicao.resultado_dia = resultado_dia
                 posicao.resultado_acumulado = resultado_acumulado
+                posicao.resultado_realizado = resultado_realizado
             else:
                 logger.info(f"Criando nova posição para {ativo.ticker} usuario {user_id}")
                 nova_posicao = Posicao(
                     ativo_id=ativo_id,
                     quantidade_total=quantidade_total,
                     preco_medio=preco_medio,
+                    custo_total=valor_total,
                     preco_atual=preco_atual,
                     resultado_dia=resultado_dia,
                     resultado_acumulado=resultado_acumulado,
+                    resultado_realizado=resultado_realizado,
                     user_id=user_id  # Asignar al usuario
                 )
                 session.add(nova_posicao)
             
             session.commit()
+            PosicaoService.invalidar_avaliacao(user_id)
             logger.info(f"Posição atualizada com sucesso para {ativo.ticker} usuario {user_id}: resultado_acumulado={resultado_acumulado:.2f}")
             return True
             
@@ -210,108 +567,569 @@ class PosicaoService:
             session.close()
     
     @staticmethod
-    def atualizar_todas_posicoes(user_id: int = None) -> bool:
+    def atualizar_todas_posicoes(user_id: int = None, atualizar_cotacoes: bool = True) -> bool:
         """
-        Actualiza todas las posiciones con precios actuales del usuario
+        Recalcula todas las posiciones del usuario con sentencias agrupadas en una transacción
+        
+        Un agregado agrupado sobre operacoes (cantidad por activo), unido a
+        los dos últimos cierres de cotacoes_diarias de cada ticker, se inserta
+        o actualiza en posicoes con INSERT ... SELECT ... ON CONFLICT; después
+        los lotes se reconstruyen en una pasada sobre las operaciones y el
+        coste base y el resultado realizado se escriben con un UPDATE
+        agrupado, todo en una sola transacción.
         
         Args:
             user_id: ID del usuario (si no se especifica, usa el usuario actual)
+            atualizar_cotacoes: Si True, antes se obtienen las cotizaciones de
+                todos los tickers en un único lote y se guardan como último cierre
             
         Returns:
-            bool: True si todas se actualizaron correctamente
+            bool: True si las posiciones se actualizaron correctamente
         """
         session = SessionLocal()
         try:
             if user_id is None:
                 user_id = PosicaoService._get_current_user_id()
             
-            # Obtener todas las posiciones del usuario
-            posicoes = session.query(Posicao).filter(
-                Posicao.user_id == user_id
-            ).all()
+            if atualizar_cotacoes:
+                tickers = [
+                    ticker for (ticker,) in session.query(Ativo.ticker).filter(
+                        Ativo.user_id == user_id,
+                        Ativo.id.in_(
+                            session.query(Operacao.ativo_id).filter(Operacao.user_id == user_id)
+                        )
+                    ).all()
+                ]
+                session.close()
+                
+                # Una petición agrupada (o cache) y un único upsert en cotacoes_diarias
+                if tickers:
+                    from .cotacao_service import CotacaoService
+                    cotacoes = CotacaoService.obter_cotacoes_lote(tickers)
+                    CotacaoService.salvar_cotacoes_diarias(list(cotacoes.values()))
+            
+            session = SessionLocal()
+            
+            # Cantidad y coste netos por activo
+            sinal = case((Operacao.tipo == 'compra', 1), else_=-1)
+            agregado = session.query(
+                Operacao.ativo_id.label('ativo_id'),
+                func.sum(sinal * Operacao.quantidade).label('quantidade'),
+                func.sum(sinal * Operacao.quantidade * Operacao.preco).label('custo')
+            ).filter(
+                Operacao.user_id == user_id
+            ).group_by(Operacao.ativo_id).subquery()
+            
+            # Último cierre (posicao = 1) y el anterior (posicao = 2) de los tickers del usuario
+            ultimos = session.query(
+                CotacaoDiaria.ticker.label('ticker'),
+                CotacaoDiaria.fechamento.label('fechamento'),
+                func.row_number().over(
+                    partition_by=CotacaoDiaria.ticker,
+                    order_by=CotacaoDiaria.data.desc()
+                ).label('posicao')
+            ).filter(
+                CotacaoDiaria.ticker.in_(session.query(Ativo.ticker).filter(Ativo.user_id == user_id))
+            ).subquery()
+            atual = aliased(ultimos)
+            anterior = aliased(ultimos)
             
-            total_atualizadas = 0
+            quantidade = agregado.c.quantidade
+            custo = agregado.c.custo
+            preco_atual = func.coalesce(atual.c.fechamento, 0)
+            com_posicao = quantidade > 0
             
-            for posicao in posicoes:
-                try:
-                    PosicaoService.atualizar_posicao(posicao.ativo_id, user_id)
-                    total_atualizadas += 1
-                except Exception as e:
-                    logger.error(f"Erro ao atualizar posição {posicao.ativo_id} usuario {user_id}: {e}")
-                    continue
+            selecao = session.query(
+                agregado.c.ativo_id,
+                literal(user_id),
+                quantidade,
+                custo,
+                case((com_posicao, custo / quantidade), else_=0),
+                preco_atual,
+                case(
+                    (and_(com_posicao, anterior.c.fechamento.isnot(None)), (atual.c.fechamento - anterior.c.fechamento) * quantidade),
+                    else_=0
+                ),
+                case((and_(com_posicao, atual.c.fechamento.isnot(None)), atual.c.fechamento * quantidade - custo), else_=0)
+            ).join(
+                Ativo, and_(Ativo.id == agregado.c.ativo_id, Ativo.user_id == user_id)
+            ).outerjoin(
+                atual, and_(atual.c.ticker == Ativo.ticker, atual.c.posicao == 1)
+            ).outerjoin(
+                anterior, and_(anterior.c.ticker == Ativo.ticker, anterior.c.posicao == 2)
+            )
             
-            logger.info(f"Usuario {user_id}: atualizadas {total_atualizadas} de {len(posicoes)} posições")
-            return total_atualizadas == len(posicoes)
+            tabela = Posicao.__table__
+            colunas = ['ativo_id', 'user_id', 'quantidade_total', 'custo_total', 'preco_medio',
+                       'preco_atual', 'resultado_dia', 'resultado_acumulado']
+            stmt = insert_upsert(session)(tabela).from_select(colunas, selecao.statement)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[tabela.c.ativo_id, tabela.c.user_id],
+                set_={coluna: stmt.excluded[coluna] for coluna in colunas[2:]}
+            )
+            resultado = session.execute(stmt)
+            
+            # Posiciones cuyas operaciones se eliminaron todas: quedan a cero
+            session.query(Posicao).filter(
+                Posicao.user_id == user_id,
+                ~Posicao.ativo_id.in_(session.query(agregado.c.ativo_id))
+            ).update({
+                Posicao.quantidade_total: 0,
+                Posicao.custo_total: 0,
+                Posicao.preco_medio: 0,
+                Posicao.resultado_dia: 0,
+                Posicao.resultado_acumulado: 0,
+                Posicao.resultado_realizado: 0
+            }, synchronize_session=False)
+            
+            # Coste base y resultado realizado por lotes: una pasada sobre las
+            # operaciones del usuario y un UPDATE agrupado en la misma transacción
+            carteira = PosicaoService._reconstruir_lotes(session, user_id)
+            custos = []
+            for ativo_id in carteira.ativos():
+                resumo = carteira.resumo(ativo_id)
+                custos.append({
+                    'b_ativo_id': ativo_id,
+                    'b_custo': round(resumo['custo_total'], 4),
+                    'b_preco_medio': round(resumo['preco_medio'], 4),
+                    'b_realizado': round(resumo['resultado_realizado'], 4)
+                })
+            if custos:
+                session.execute(
+                    update(tabela).where(
+                        tabela.c.user_id == user_id,
+                        tabela.c.ativo_id == bindparam('b_ativo_id')
+                    ).values(
+                        custo_total=bindparam('b_custo'),
+                        preco_medio=bindparam('b_preco_medio'),
+                        resultado_realizado=bindparam('b_realizado'),
+                        resultado_acumulado=case(
+                            (and_(tabela.c.quantidade_total > 0, tabela.c.preco_atual > 0),
+                             tabela.c.preco_atual * tabela.c.quantidade_total - bindparam('b_custo')),
+                            else_=0
+                        )
+                    ),
+                    custos
+                )
+            
+            session.commit()
+            PosicaoService.invalidar_avaliacao(user_id)
+            
+            logger.info(f"Usuario {user_id}: {resultado.rowcount} posições recalculadas numa única transação")
+            return True
             
         except Exception as e:
-            logger.error(f"Erro ao atualizar todas as posições: {e}")
+            session.rollback()
+            logger.error(f"Erro ao atualizar todas as posições: {e}", exc_info=True)
             return False
         finally:
             session.close()
     
     @staticmethod
-    def obter_resumo_portfolio(user_id: int = None) -> dict:
+    def reavaliar_posicoes_sistema(cotacoes: Optional[Dict[str, dict]] = None) -> dict:
         """
-        Obtiene un resumen completo del portfolio del usuario
+        Revaloriza las posiciones abiertas de todos los usuarios pidiendo cada ticker una sola vez
+        
+        Se reúnen los tickers distintos de todas las posiciones abiertas, se
+        obtiene cada cotización una única vez (en peticiones agrupadas, con
+        fallback a la BD) y se actualizan preco_atual, resultado_dia y
+        resultado_acumulado de todas las posiciones con un UPDATE masivo en
+        una transacción. Pensado para el actualizador de mercado y trabajos
+        nocturnos: no depende de la sesión de Streamlit.
+        
+        Args:
+            cotacoes: Cotizaciones ya obtenidas por ticker. Si se indican, los
+                tickers que falten (los que el llamador ya no pudo obtener del
+                proveedor) se valoran con la última cotización de la BD sin
+                volver a consultar el proveedor
+            
+        Returns:
+            dict: Número de tickers, cotizaciones usadas y posiciones actualizadas
+        """
+        from .cotacao_service import CotacaoService
+        
+        consultar_provedor = cotacoes is None
+        session = SessionLocal()
+        try:
+            posicoes = session.query(
+                Posicao.id,
+                Posicao.quantidade_total,
+                Posicao.preco_medio,
+                Ativo.ticker
+            ).join(
+                Ativo, Ativo.id == Posicao.ativo_id
+            ).filter(
+                Posicao.quantidade_total > 0
+            ).all()
+        finally:
+            session.close()
+        
+        tickers = sorted({posicao.ticker.upper().strip() for posicao in posicoes})
+        cotacoes = {ticker: cotacoes[ticker] for ticker in tickers if ticker in (cotacoes or {})}
+        
+        # Cada ticker una sola vez: lo que falte, al proveedor (si el llamador no
+        # lo consultó ya en este ciclo) y después a la BD en una sola consulta
+        faltantes = [ticker for ticker in tickers if ticker not in cotacoes]
+        if faltantes and consultar_provedor:
+            novas = CotacaoService.buscar_cotacoes_em_lotes(faltantes)
+            CotacaoService.salvar_cotacoes_diarias(list(novas.values()))
+            cotacoes.update(novas)
+        faltantes = [ticker for ticker in tickers if ticker not in cotacoes]
+        if faltantes:
+            cotacoes.update(CotacaoService.obter_ultimas_cotacoes_bd(faltantes))
+        
+        atualizacoes = []
+        for posicao in posicoes:
+            cotacao = cotacoes.get(posicao.ticker.upper().strip())
+            if not cotacao or cotacao.get('fonte') == 'VALOR_PADRAO':
+                continue
+            
+            preco_atual = float(cotacao['preco_atual'])
+            preco_anterior = float(cotacao.get('fechamento_anterior') or preco_atual)
+            quantidade = posicao.quantidade_total
+            atualizacoes.append({
+                'id': posicao.id,
+                'preco_atual': preco_atual,
+                'resultado_dia': round((preco_atual - preco_anterior) * quantidade, 4),
+                'resultado_acumulado': round((preco_atual - float(posicao.preco_medio or 0)) * quantidade, 4)
+            })
+        
+        if atualizacoes:
+            session = SessionLocal()
+            try:
+                session.execute(update(Posicao), atualizacoes)
+                session.commit()
+                PosicaoService.invalidar_avaliacao()
+            except Exception as e:
+                session.rollback()
+                logger.error(f"Erro na reavaliação de posições do sistema: {e}", exc_info=True)
+                atualizacoes = []
+            finally:
+                session.close()
+        
+        logger.info(
+            f"Reavaliação do sistema: {len(tickers)} tickers, {len(cotacoes)} cotações, "
+            f"{len(atualizacoes)} de {len(posicoes)} posições atualizadas"
+        )
+        return {
+            'tickers': len(tickers),
+            'cotacoes': len(cotacoes),
+            'posicoes': len(atualizacoes)
+        }
+    
+    @staticmethod
+    def obter_avaliacao(user_id: int = None, forcar: bool = False) -> AvaliacaoCarteira:
+        """
+        Obtiene la valoración vectorizada de las posiciones abiertas del usuario
+        
+        Las posiciones se leen con una única consulta (ya como float y con el
+        ticker y nombre del activo) y se cargan en arrays NumPy una sola vez;
+        resumen, pesos, mejores/peores posiciones y distribución salen de la
+        misma valoración, que se comparte entre páginas hasta que cambian las
+        posiciones del usuario.
         
         Args:
             user_id: ID del usuario (si no se especifica, usa el usuario actual)
+            forcar: Ignorar la valoración en cache
             
         Returns:
-            dict: Resumen del portfolio con valores totales del usuario
+            AvaliacaoCarteira: Valoración de la cartera (vacía si hay error)
         """
         session = SessionLocal()
         try:
             if user_id is None:
                 user_id = PosicaoService._get_current_user_id()
             
-            posicoes = session.query(Posicao).filter(
+            if not forcar:
+                avaliacao = avaliacoes_cache.get(user_id)
+                if avaliacao is not None:
+                    return avaliacao
+            
+            linhas = session.query(
+                Posicao.ativo_id,
+                Ativo.ticker,
+                Ativo.nome,
+                Ativo.ativo,
+                Posicao.quantidade_total,
+                cast(Posicao.preco_medio, Float).label('preco_medio'),
+                cast(Posicao.preco_atual, Float).label('preco_atual'),
+                cast(Posicao.resultado_dia, Float).label('resultado_dia'),
+                cast(Posicao.resultado_acumulado, Float).label('resultado_acumulado')
+            ).join(
+                Ativo, Ativo.id == Posicao.ativo_id
+            ).filter(
                 Posicao.quantidade_total > 0,
                 Posicao.user_id == user_id
             ).all()
             
-            valor_total_investido = 0
-            valor_atual_portfolio = 0
-            resultado_total_dia = 0
-            resultado_total_acumulado = 0
-            total_ativos = len(posicoes)
+            avaliacao = AvaliacaoCarteira([linha._asdict() for linha in linhas], user_id)
+            avaliacoes_cache.set(user_id, avaliacao)
+            
+            logger.info(f"Avaliação portfolio usuario {user_id}: {len(avaliacao)} ativos, valor atual: {avaliacao.total_atual:.2f}")
+            return avaliacao
+            
+        except Exception as e:
+            logger.error(f"Erro ao avaliar portfolio do usuario {user_id}: {e}")
+            return AvaliacaoCarteira([], user_id)
+        finally:
+            session.close()
+    
+    @staticmethod
+    def invalidar_avaliacao(user_id: int = None):
+        """
+        Descarta la valoración en cache tras modificar posiciones
+        
+        Args:
+            user_id: ID del usuario (si no se especifica, se descartan las de todos)
+        """
+        if user_id is None:
+            avaliacoes_cache.clear()
+        else:
+            avaliacoes_cache.delete(user_id)
+    
+    @staticmethod
+    def invalidar_series_patrimonio(alteracoes: Optional[Dict[str, int]] = None):
+        """
+        Invalida las series de patrimonio afectadas por cierres guardados o corregidos
+        
+        Se registra en MatrizPrecosService.ao_alterar. Cada serie recalcula en
+        su próximo acceso las sesiones desde el primer día modificado de sus
+        tickers.
+        
+        Args:
+            alteracoes: Primer día modificado por ticker (None = todos los cierres)
+        """
+        for serie in series_patrimonio.values():
+            serie.invalidar_precos(alteracoes)
+    
+    @staticmethod
+    def obter_resumo_portfolio(user_id: int = None) -> dict:
+        """
+        Obtiene un resumen completo del portfolio del usuario
+        
+        Args:
+            user_id: ID del usuario (si no se especifica, usa el usuario actual)
+            
+        Returns:
+            dict: Resumen del portfolio con valores totales del usuario
+        """
+        return PosicaoService.obter_avaliacao(user_id).resumo()
+    
+    @staticmethod
+    def serie_patrimonio(user_id: int = None, inicio: Optional[date] = None,
+                         fim: Optional[date] = None, forcar: bool = False) -> pd.DataFrame:
+        """
+        Obtiene la curva diaria de patrimonio (NAV) de la cartera del usuario
+        
+        Las cantidades en cartera de cada sesión salen de las sumas acumuladas
+        de las operaciones (vectorizadas) y se valoran con la matriz de cierres.
+        La serie se guarda por usuario y se extiende de forma incremental: solo
+        se leen las operaciones con id posterior a la última aplicada y solo se
+        valoran las sesiones posteriores a la última calculada (o desde la
+        fecha de una operación retroactiva o del primer cierre guardado o
+        corregido desde el último cálculo, ver invalidar_series_patrimonio).
+        Si el número de operaciones no cuadra (se eliminó alguna) la serie se
+        reconstruye.
+        
+        Args:
+            user_id: ID del usuario (si no se especifica, usa el usuario actual)
+            inicio: Primera fecha (None = primera operación)
+            fim: Última fecha (None = hoy)
+            forcar: Descartar la serie guardada y reconstruirla
+            
+        Returns:
+            pd.DataFrame: Columnas data, patrimonio, investido (efectivo neto
+            aportado) y resultado, una fila por sesión
+        """
+        colunas = ['data', 'patrimonio', 'investido', 'resultado']
+        session = SessionLocal()
+        try:
+            if user_id is None:
+                user_id = PosicaoService._get_current_user_id()
+            
+            with _series_lock:
+                serie = series_patrimonio.get(user_id)
+                if serie is None:
+                    serie = SeriePatrimonio()
+                    series_patrimonio.set(user_id, serie)
             
-            for posicao in posicoes:
-                valor_investido = float(posicao.preco_medio) * posicao.quantidade_total
-                valor_atual = float(posicao.preco_atual) * posicao.quantidade_total
+            def ler_operacoes(desde_id: int) -> list:
+                return session.query(
+                    Operacao.id,
+                    Ativo.ticker,
+                    Operacao.data,
+                    Operacao.tipo,
+                    Operacao.quantidade,
+                    cast(Operacao.preco, Float).label('preco')
+                ).join(
+                    Ativo, Ativo.id == Operacao.ativo_id
+                ).filter(
+                    Operacao.user_id == user_id,
+                    Operacao.id > desde_id
+                ).order_by(Operacao.data, Operacao.id).all()
+            
+            with serie.bloqueio():
+                if forcar:
+                    serie.limpar()
+                serie.aplicar_invalidacoes()
+                
+                total, ultimo_id = session.query(
+                    func.count(Operacao.id), func.max(Operacao.id)
+                ).filter(Operacao.user_id == user_id).one()
+                
+                novas = ler_operacoes(serie.ultima_operacao_id) if (ultimo_id or 0) > serie.ultima_operacao_id else []
+                
+                # Se eliminaron operaciones ya aplicadas: reconstruir desde cero
+                if serie.n_operacoes + len(novas) != total:
+                    serie.limpar()
+                    novas = ler_operacoes(0)
                 
-                valor_total_investido += valor_investido
-                valor_atual_portfolio += valor_atual
-                resultado_total_dia += float(posicao.resultado_dia)
-                resultado_total_acumulado += float(posicao.resultado_acumulado)
+                serie.aplicar_operacoes([{
+                    'id': op.id,
+                    'ticker': op.ticker.upper().strip(),
+                    'dia': data_para_dia(op.data),
+                    'quantidade': op.quantidade if op.tipo == 'compra' else -op.quantidade,
+                    'preco': op.preco
+                } for op in novas])
+                
+                if not serie.dias_operacao.shape[0]:
+                    return pd.DataFrame(columns=colunas)
+                
+                # Valorar solo las sesiones que faltan (la última calculada se revalora)
+                dia_fim = data_para_dia(fim or date.today())
+                if not len(serie) or serie.dias[-1] <= dia_fim:
+                    desde = int(serie.dias[-1]) if len(serie) else int(serie.dias_operacao[0])
+                    dias, precos = MatrizPrecosService.obter_matriz(
+                        serie.tickers, np.datetime64(desde, 'D').astype(date), fim
+                    )
+                    serie.estender(dias.astype(np.int64), precos)
+                
+                dia_inicio = data_para_dia(inicio) if inicio else int(serie.dias_operacao[0])
+                dias, patrimonio, investido = serie.janela(dia_inicio, dia_fim)
             
-            percentual_resultado = (resultado_total_acumulado / valor_total_investido * 100) if valor_total_investido > 0 else 0
+            return pd.DataFrame({
+                'data': dias.astype('datetime64[D]'),
+                'patrimonio': patrimonio,
+                'investido': investido,
+                'resultado': patrimonio - investido
+            })
             
-            logger.info(f"Resumo portfolio usuario {user_id}: {total_ativos} ativos, valor atual: {valor_atual_portfolio:.2f}")
+        except Exception as e:
+            logger.error(f"Erro ao obter série de patrimônio do usuario {user_id}: {e}", exc_info=True)
+            return pd.DataFrame(columns=colunas)
+        finally:
+            session.close()
+    
+    @staticmethod
+    def posicoes_em(data: date, user_id: int = None) -> List[dict]:
+        """
+        Reconstruye las posiciones del usuario en una fecha pasada
+        
+        Para cada activo se busca la instantánea más cercana anterior o igual
+        a la fecha (MAX(data) sobre el índice único (user_id, ativo_id, data),
+        una búsqueda en el árbol del índice) y solo se reproducen las
+        operaciones entre esa instantánea y la fecha, en lugar de todo el
+        histórico. Las posiciones se valoran con el cierre de la fecha.
+        
+        Args:
+            data: Fecha de referencia (incluida)
+            user_id: ID del usuario (si no se especifica, usa el usuario actual)
             
-            return {
-                'total_ativos': total_ativos,
-                'valor_total_investido': valor_total_investido,
-                'valor_atual_portfolio': valor_atual_portfolio,
-                'resultado_total_dia': resultado_total_dia,
-                'resultado_total_acumulado': resultado_total_acumulado,
-                'percentual_resultado': percentual_resultado,
-                'user_id': user_id
-            }
+        Returns:
+            List[dict]: Posiciones con cantidad > 0 (ativo_id, ticker,
+            quantidade, custo_total, preco_medio, resultado_realizado, preco,
+            valor, snapshot y operacoes_reproduzidas)
+        """
+        session = SessionLocal()
+        try:
+            if user_id is None:
+                user_id = PosicaoService._get_current_user_id()
+            
+            # Instantánea más cercana de cada activo
+            anterior = aliased(SnapshotPosicao)
+            mais_recente = session.query(func.max(anterior.data)).filter(
+                anterior.user_id == SnapshotPosicao.user_id,
+                anterior.ativo_id == SnapshotPosicao.ativo_id,
+                anterior.data <= data
+            ).scalar_subquery()
+            snapshots = session.query(SnapshotPosicao).filter(
+                SnapshotPosicao.user_id == user_id,
+                SnapshotPosicao.data == mais_recente
+            ).all()
             
+            carteira = CarteiraLotes(Config.COST_BASIS_METHOD)
+            for snapshot in snapshots:
+                carteira.restaurar(
+                    snapshot.ativo_id,
+                    deserializar_lotes(snapshot.lotes),
+                    float(snapshot.custo_total or 0) if Config.COST_BASIS_METHOD == 'MEDIO' else None,
+                    float(snapshot.resultado_realizado or 0)
+                )
+            datas_snapshot = {snapshot.ativo_id: snapshot.data for snapshot in snapshots}
+            
+            # Solo el tramo de operaciones posterior a cada instantánea
+            desde = session.query(
+                SnapshotPosicao.ativo_id.label('ativo_id'),
+                SnapshotPosicao.data.label('data')
+            ).filter(
+                SnapshotPosicao.user_id == user_id,
+                SnapshotPosicao.data == mais_recente
+            ).subquery()
+            tramo = session.query(
+                Operacao.id,
+                Operacao.ativo_id,
+                Operacao.data,
+                Operacao.tipo,
+                Operacao.quantidade,
+                cast(Operacao.preco, Float).label('preco')
+            ).outerjoin(
+                desde, desde.c.ativo_id == Operacao.ativo_id
+            ).filter(
+                Operacao.user_id == user_id,
+                Operacao.data <= data,
+                or_(desde.c.data.is_(None), Operacao.data > desde.c.data)
+            ).order_by(Operacao.ativo_id, Operacao.data, Operacao.id).all()
+            
+            reproduzidas = defaultdict(int)
+            for operacao in tramo:
+                carteira.processar(operacao._asdict())
+                reproduzidas[operacao.ativo_id] += 1
+            
+            ativos = [ativo_id for ativo_id in carteira.ativos() if carteira.quantidade[ativo_id] > 0]
+            tickers = dict(
+                session.query(Ativo.id, Ativo.ticker).filter(Ativo.id.in_(ativos)).all()
+            ) if ativos else {}
         except Exception as e:
-            logger.error(f"Erro ao obter resumo do portfolio: {e}")
-            return {
-                'total_ativos': 0,
-                'valor_total_investido': 0,
-                'valor_atual_portfolio': 0,
-                'resultado_total_dia': 0,
-                'resultado_total_acumulado': 0,
-                'percentual_resultado': 0,
-                'user_id': user_id
-            }
+            logger.error(f"Erro ao reconstruir posições do usuario {user_id} em {data}: {e}", exc_info=True)
+            return []
         finally:
             session.close()
+        
+        fechamentos = MatrizPrecosService.obter_fechamentos(list(set(tickers.values())), data) if tickers else {}
+        
+        posicoes = []
+        for ativo_id in ativos:
+            preco = fechamentos.get(tickers.get(ativo_id))
+            resumo = carteira.resumo(ativo_id, preco)
+            posicoes.append({
+                'ativo_id': ativo_id,
+                'ticker': tickers.get(ativo_id),
+                'quantidade': resumo['quantidade'],
+                'custo_total': resumo['custo_total'],
+                'preco_medio': resumo['preco_medio'],
+                'resultado_realizado': resumo['resultado_realizado'],
+                'resultado_nao_realizado': resumo['resultado_nao_realizado'],
+                'preco': preco,
+                'valor': resumo['quantidade'] * preco if preco else None,
+                'snapshot': datas_snapshot.get(ativo_id),
+                'operacoes_reproduzidas': reproduzidas[ativo_id]
+            })
+        
+        logger.info(
+            f"Usuario {user_id}: {len(posicoes)} posições em {data} "
+            f"({len(snapshots)} instantâneas, {len(tramo)} operações reproduzidas)"
+        )
+        return posicoes
     
     @staticmethod
     def eliminar_posicao(ativo_id: int, user_id: int = None) -> bool:
@@ -344,6 +1162,7 @@ class PosicaoService:
             
             session.delete(posicao)
             session.commit()
+            PosicaoService.invalidar_avaliacao(user_id)
             
             logger.info(f"Posição eliminada para ativo {ativo_id} usuario {user_id}")
             return True
@@ -401,40 +1220,23 @@ class PosicaoService:
             if user_id is None:
                 user_id = PosicaoService._get_current_user_id()
             
-            # Posiciones activas
-            posicoes_ativas = session.query(Posicao).filter(
-                Posicao.user_id == user_id,
-                Posicao.quantidade_total > 0
-            ).all()
-            
             # Posiciones totales (incluyendo cero)
             total_posicoes = session.query(Posicao).filter(
                 Posicao.user_id == user_id
             ).count()
             
-            # Mejor y peor posición
-            melhor_resultado = max(
-                (float(p.resultado_acumulado) for p in posicoes_ativas), 
-                default=0
-            )
-            
-            pior_resultado = min(
-                (float(p.resultado_acumulado) for p in posicoes_ativas), 
-                default=0
-            )
-            
-            # Portfolio summary
-            resumo = PosicaoService.obter_resumo_portfolio(user_id)
+            # Posiciones activas, resumen y mejor/peor posición de la misma valoración
+            avaliacao = PosicaoService.obter_avaliacao(user_id)
+            resumo = avaliacao.resumo()
             
             return {
-                'posicoes_ativas': len(posicoes_ativas),
+                'posicoes_ativas': len(avaliacao),
                 'total_posicoes': total_posicoes,
                 'valor_portfolio': resumo['valor_atual_portfolio'],
                 'resultado_acumulado': resumo['resultado_total_acumulado'],
                 'resultado_dia': resumo['resultado_total_dia'],
                 'percentual_resultado': resumo['percentual_resultado'],
-                'melhor_resultado': melhor_resultado,
-                'pior_resultado': pior_resultado,
+                **avaliacao.estatisticas(),
                 'user_id': user_id
             }
             
@@ -452,4 +1254,8 @@ class PosicaoService:
                 'user_id': user_id
             }
         finally:
-            session.close()
\ No newline at end of file
+            session.close()
+
+
+# Las series de patrimonio se invalidan cuando cambian los cierres de la matriz
+MatrizPrecosService.ao_alterar(PosicaoService.invalidar_series_patrimonio)
@@ -5,18 +5,104 @@ Este módulo contiene la lógica para validar tickers y activos financieros.
 """
 
 import logging
-import time
-import random
-import yfinance as yf
-from ..utils import KNOWN_TICKERS, Config
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from ..models import SessionLocal, ValidacaoTicker
+from ..utils import Config, KNOWN_TICKERS
+from ..providers import get_provider
+from ..utils.circuit_breaker import validation_circuit
+from ..utils.symbol_master import get_symbol_master
 
 # Configurar logger
 logger = logging.getLogger(__name__)
 
 
+def obter_validacao_cache(ticker: str) -> Optional[dict]:
+    """
+    Obtiene la validación guardada de un ticker si no ha caducado
+    
+    Los tickers encontrados caducan tras TICKER_VALIDATION_TTL y los no
+    encontrados (cache negativo) tras TICKER_VALIDATION_NEGATIVE_TTL.
+    
+    Args:
+        ticker: Símbolo del ticker normalizado
+        
+    Returns:
+        Optional[dict]: encontrado, nome, fonte y validado_em, o None si no
+        hay validación vigente
+    """
+    session = SessionLocal()
+    try:
+        validacao = session.get(ValidacaoTicker, ticker)
+        if not validacao:
+            return None
+        
+        ttl = Config.TICKER_VALIDATION_TTL if validacao.encontrado else Config.TICKER_VALIDATION_NEGATIVE_TTL
+        validado_em = validacao.validado_em
+        if validado_em.tzinfo is None:
+            validado_em = validado_em.replace(tzinfo=timezone.utc)
+        if datetime.now(timezone.utc) - validado_em >= timedelta(seconds=ttl):
+            return None
+        
+        return {
+            'encontrado': validacao.encontrado,
+            'nome': validacao.nome,
+            'fonte': validacao.fonte,
+            'validado_em': validado_em
+        }
+    except Exception as e:
+        logger.warning(f"Erro ao ler cache de validação de {ticker}: {e}")
+        return None
+    finally:
+        session.close()
+
+
+def guardar_validacao(ticker: str, encontrado: bool, nome: Optional[str] = None, fonte: Optional[str] = None):
+    """
+    Guarda (o renueva) la validación de un ticker en el cache persistente
+    
+    Args:
+        ticker: Símbolo del ticker normalizado
+        encontrado: True si el proveedor devolvió datos del ticker
+        nome: Nombre del activo
+        fonte: Proveedor que realizó la validación
+    """
+    session = SessionLocal()
+    try:
+        session.merge(ValidacaoTicker(
+            ticker=ticker,
+            encontrado=encontrado,
+            nome=nome[:200] if nome else None,
+            fonte=fonte,
+            validado_em=datetime.now(timezone.utc)
+        ))
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        logger.warning(f"Erro ao guardar cache de validação de {ticker}: {e}")
+    finally:
+        session.close()
+
+
+def _resultado_manual(ticker: str) -> dict:
+    """Resultado para un ticker que el proveedor no reconoce (se permite agregarlo manualmente)"""
+    return {
+        'valido': True,  # Permitir agregar
+        'nome': f'{ticker} (Validação manual)',
+        'ticker': ticker,
+        'fonte': 'MANUAL',
+        'warning': 'Ticker no validado online - se agregará como manual'
+    }
+
+
 def validar_ticker(ticker: str) -> dict:
     """
-    Valida que un ticker existe en Yahoo Finance y retorna información básica
+    Valida que un ticker existe en el proveedor de datos de mercado y retorna información básica
+    
+    Los tickers del maestro de símbolos offline se validan sin acceder a la
+    red. El resultado de la consulta al proveedor (encontrado o no) se guarda en
+    la tabla validacoes_ticker, de modo que validar de nuevo el mismo ticker
+    (desde cualquier usuario o tras un reinicio) solo cuesta una lectura de BD.
     
     Args:
         ticker: Símbolo del ticker a validar
@@ -61,36 +147,60 @@ def validar_ticker(ticker: str) -> dict:
                 'fonte': 'LISTA_CONOCIDA'
             }
         
-        # Intentar validación online (con rate limiting)
-        yahoo_config = Config.get_yahoo_config()
-        delay = random.uniform(yahoo_config['delay_min'], yahoo_config['delay_max'])
-        time.sleep(delay)
+        # Validación offline contra el maestro de símbolos (sin red)
+        simbolo = get_symbol_master().obter(ticker_upper)
+        if simbolo:
+            logger.info(f"Ticker {ticker_upper} encontrado no maestro de símbolos")
+            return {
+                'valido': True,
+                'nome': simbolo['nome'],
+                'ticker': ticker_upper,
+                'fonte': 'MAESTRO_SIMBOLOS',
+                'bolsa': simbolo['bolsa'],
+                'moeda': simbolo['moeda']
+            }
+        
+        # Validación ya guardada (positiva o negativa) y vigente
+        cache = obter_validacao_cache(ticker_upper)
+        if cache:
+            logger.info(f"Ticker {ticker_upper} encontrado no cache de validação (encontrado={cache['encontrado']})")
+            if not cache['encontrado']:
+                return dict(_resultado_manual(ticker_upper), cache=True)
+            return {
+                'valido': True,
+                'nome': cache['nome'] or ticker_upper,
+                'ticker': ticker_upper,
+                'fonte': cache['fonte'],
+                'cache': True
+            }
         
-        stock = yf.Ticker(ticker_upper)
-        info = stock.info
+        # Intentar validación online con el proveedor configurado, con su
+        # propio circuito (con el circuito abierto se pasa directamente a la
+        # validación manual)
+        provider = get_provider()
+        info = validation_circuit.call(lambda: provider.obter_info(ticker_upper), provider.e_falha_transporte)
         
         # Verificar que tengamos información válida
         if not info or 'regularMarketPrice' not in info:
-            hist = stock.history(period="1d", timeout=yahoo_config['timeout'])
+            hist = validation_circuit.call(
+                lambda: provider.obter_historico(ticker_upper, dias=1),
+                provider.e_falha_transporte
+            )
             if hist.empty:
                 logger.warning(f"Ticker {ticker_upper} não retornou dados válidos")
+                guardar_validacao(ticker_upper, False, fonte=provider.nome)
                 # Para tickers desconocidos, permitir agregar manualmente
-                return {
-                    'valido': True,  # Permitir agregar
-                    'nome': f'{ticker_upper} (Validação manual)',
-                    'ticker': ticker_upper,
-                    'fonte': 'MANUAL',
-                    'warning': 'Ticker no validado online - se agregará como manual'
-                }
-        
-        nome = info.get('longName') or info.get('shortName') or ticker_upper
+                return _resultado_manual(ticker_upper)
+        
+        nome = (info or {}).get('longName') or (info or {}).get('shortName') or ticker_upper
         logger.info(f"Ticker {ticker_upper} válido online: {nome}")
+        guardar_validacao(ticker_upper, True, nome, provider.nome)
         
         return {
             'valido': True,
             'nome': nome,
             'ticker': ticker_upper,
-            'fonte': 'YAHOO_FINANCE',
+            'fonte': provider.nome,
             'info': info
         }
         
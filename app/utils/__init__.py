@@ -7,6 +7,7 @@ Este módulo contiene utilidades generales y configuraciones para BolsaV1.
 from .config import Config, KNOWN_TICKERS, DEV_CONFIG, PROD_CONFIG
 from .database import init_database, test_connection
 from .logging_config import setup_logging, get_logger
+from .cache import QuoteCache
 from .helpers import (
     format_currency,
     format_percentage,
@@ -32,6 +33,7 @@ __all__ = [
     'test_connection',
     'setup_logging',
     'get_logger',
+    'QuoteCache',
     'format_currency',
     'format_percentage',
     'format_number',
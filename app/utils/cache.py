@@ -0,0 +1,277 @@
+"""
+Cache de Cotizaciones en Memoria
+
+Este módulo implementa un cache LRU con TTL compartido por todo el proceso,
+con límites de memoria configurables por número de entradas y por bytes.
+
+Las expiraciones se gestionan con un min-heap ordenado por instante de
+expiración, de modo que la limpieza solo procesa las entradas vencidas en
+lugar de recorrer todo el cache.
+
+Opcionalmente las entradas se conservan durante una ventana adicional
+(stale_ttl) tras su TTL para poder servirlas como datos obsoletos mientras
+se revalidan en segundo plano (stale-while-revalidate).
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional, Tuple
+
+
+class QuoteCache:
+    """Cache LRU con expiración por TTL y presupuesto de memoria acotado"""
+
+    def __init__(self, ttl: int, max_entries: int = 0, max_bytes: int = 0, stale_ttl: int = 0):
+        """
+        Args:
+            ttl: Tiempo de vida de cada entrada en segundos
+            max_entries: Número máximo de entradas (0 = sin límite)
+            max_bytes: Tamaño máximo estimado en bytes (0 = sin límite)
+            stale_ttl: Segundos adicionales tras el TTL en los que la entrada
+                se conserva como obsoleta (0 = se elimina al expirar)
+        """
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        # key -> (timestamp, value, size); el orden refleja el uso (LRU al principio)
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any, int]]" = OrderedDict()
+        # (expira_em, seq, key, timestamp); los registros obsoletos se descartan al extraerlos
+        self._heap: List[Tuple[float, int, Hashable, float]] = []
+        self._seq = itertools.count()
+        self._lock = threading.RLock()
+        self._bytes = 0
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def make_key(ticker: str, provider: str, interval: str) -> Tuple[str, str, str]:
+        """
+        Construye la clave de cache de una cotización
+
+        Args:
+            ticker: Símbolo del ticker
+            provider: Proveedor de datos de mercado
+            interval: Intervalo/periodo de los datos
+
+        Returns:
+            Tuple[str, str, str]: Clave (ticker, proveedor, intervalo)
+        """
+        return (ticker.upper().strip(), provider, interval)
+
+    @staticmethod
+    def _estimate_size(value: Any) -> int:
+        """Estima el tamaño en bytes de un valor (aproximado)"""
+        return len(repr(value))
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Obtiene un valor del cache si existe y no ha expirado
+
+        Args:
+            key: Clave de la entrada
+
+        Returns:
+            Optional[Any]: Valor almacenado o None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            timestamp, value, _ = entry
+            idade = time.monotonic() - timestamp
+            if idade >= self.ttl:
+                if idade >= self.ttl + self.stale_ttl:
+                    self._remove(key)
+                    self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def get_with_age(self, key: Hashable) -> Optional[Tuple[Any, float, bool]]:
+        """
+        Obtiene un valor del cache aunque haya superado su TTL, indicando su antigüedad
+
+        Las entradas se devuelven mientras estén dentro de la ventana
+        ttl + stale_ttl.
+
+        Args:
+            key: Clave de la entrada
+
+        Returns:
+            Optional[Tuple[Any, float, bool]]: (valor, antigüedad en segundos,
+            True si todavía está dentro del TTL) o None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            timestamp, value, _ = entry
+            idade = time.monotonic() - timestamp
+            if idade >= self.ttl + self.stale_ttl:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            fresco = idade < self.ttl
+            if fresco:
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+            return value, idade, fresco
+
+    def set(self, key: Hashable, value: Any):
+        """
+        Almacena un valor, desalojando las entradas menos usadas si se supera el presupuesto
+
+        Args:
+            key: Clave de la entrada
+            value: Valor a almacenar
+        """
+        size = self._estimate_size(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            timestamp = time.monotonic()
+            self._entries[key] = (timestamp, value, size)
+            self._bytes += size
+            heapq.heappush(self._heap, (timestamp + self._max_age, next(self._seq), key, timestamp))
+            self._evict()
+            self._compact_heap()
+
+    def delete(self, key: Hashable) -> bool:
+        """
+        Elimina una entrada del cache si existe
+
+        Args:
+            key: Clave de la entrada
+
+        Returns:
+            bool: True si la entrada existía
+        """
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._remove(key)
+            return True
+
+    def purge_expired(self) -> int:
+        """
+        Elimina las entradas expiradas extrayéndolas del heap de expiración
+
+        El coste es proporcional al número de entradas vencidas (O(k log n)),
+        no al tamaño total del cache.
+
+        Returns:
+            int: Número de entradas eliminadas
+        """
+        with self._lock:
+            agora = time.monotonic()
+            removidas = 0
+            while self._heap and self._heap[0][0] <= agora:
+                _, _, key, timestamp = heapq.heappop(self._heap)
+                entry = self._entries.get(key)
+                # Ignorar registros de entradas ya reemplazadas o desalojadas
+                if entry is not None and entry[0] == timestamp:
+                    self._remove(key)
+                    removidas += 1
+            self.expirations += removidas
+            return removidas
+
+    def values(self) -> List[Any]:
+        """
+        Obtiene los valores vigentes del cache (incluidos los obsoletos) sin alterar el orden LRU
+
+        Returns:
+            List[Any]: Valores de las entradas que no han superado ttl + stale_ttl
+        """
+        with self._lock:
+            agora = time.monotonic()
+            return [
+                value for timestamp, value, _ in self._entries.values()
+                if agora - timestamp < self._max_age
+            ]
+
+    def clear(self):
+        """Vacía el cache (los contadores se mantienen)"""
+        with self._lock:
+            self._entries.clear()
+            self._heap.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """
+        Obtiene estadísticas del cache
+
+        Returns:
+            dict: Entradas, tamaño y contadores de aciertos/fallos/desalojos
+        """
+        with self._lock:
+            consultas = self.hits + self.stale_hits + self.misses
+            return {
+                'total_entries': len(self._entries),
+                'cache_size_kb': round(self._bytes / 1024, 2),
+                'max_entries': self.max_entries,
+                'max_size_kb': round(self.max_bytes / 1024, 2),
+                'ttl': self.ttl,
+                'stale_ttl': self.stale_ttl,
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / consultas * 100, 2) if consultas > 0 else 0,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+    @property
+    def _max_age(self) -> float:
+        """Antigüedad a partir de la cual una entrada se elimina definitivamente"""
+        return self.ttl + self.stale_ttl
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def _remove(self, key: Hashable):
+        """Elimina una entrada actualizando el tamaño (requiere el lock)"""
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def _evict(self):
+        """Desaloja entradas LRU hasta respetar los límites (requiere el lock)"""
+        while self._entries and (
+            (self.max_entries and len(self._entries) > self.max_entries) or
+            (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.evictions += 1
+
+    def _compact_heap(self):
+        """Reconstruye el heap si acumula demasiados registros obsoletos (requiere el lock)"""
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [
+                (timestamp + self._max_age, next(self._seq), key, timestamp)
+                for key, (timestamp, _, _) in self._entries.items()
+            ]
+            heapq.heapify(self._heap)
@@ -0,0 +1,208 @@
+"""
+Circuit Breaker para Proveedores Externos
+
+Este módulo implementa un circuit breaker compartido por todo el proceso. Tras
+N fallos consecutivos del proveedor el circuito se abre y las llamadas fallan
+de inmediato (sin esperar al timeout) durante un periodo de enfriamiento;
+después se permiten peticiones de prueba (semiabierto) para decidir si se
+cierra de nuevo.
+
+Solo cuentan como fallo los errores que indican que el proveedor no responde
+(red, timeout, HTTP 5xx/429); un símbolo desconocido es una respuesta válida
+sin datos y no debe abrir el circuito para los demás usuarios.
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Optional
+from .config import Config
+
+# Estados del circuito
+CLOSED = 'CLOSED'
+OPEN = 'OPEN'
+HALF_OPEN = 'HALF_OPEN'
+
+
+class CircuitOpenError(Exception):
+    """El circuito está abierto y la llamada no se ha realizado"""
+
+
+class CircuitBreaker:
+    """Circuit breaker con estados CLOSED/OPEN/HALF_OPEN y métricas"""
+
+    def __init__(self, nome: str, failure_threshold: int, reset_timeout: float, half_open_probes: int = 1):
+        """
+        Args:
+            nome: Nombre del circuito (para mensajes y métricas)
+            failure_threshold: Fallos consecutivos que abren el circuito
+            reset_timeout: Segundos que el circuito permanece abierto
+            half_open_probes: Peticiones de prueba simultáneas en estado semiabierto
+        """
+        if failure_threshold < 1 or reset_timeout <= 0 or half_open_probes < 1:
+            raise ValueError("failure_threshold y half_open_probes deben ser >= 1 y reset_timeout > 0")
+
+        self.nome = nome
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+
+        self._estado = CLOSED
+        self._falhas_consecutivas = 0
+        self._aberto_em = 0.0
+        self._sondas_em_curso = 0
+        self._lock = threading.Lock()
+
+        # Métricas
+        self._total_chamadas = 0
+        self._total_falhas = 0
+        self._total_rejeitadas = 0
+        self._aberturas = 0
+        self._ultima_abertura: Optional[datetime] = None
+        self._ultimo_erro: Optional[str] = None
+
+    def _estado_atual(self, agora: float) -> str:
+        """Pasa de OPEN a HALF_OPEN al terminar el enfriamiento (requiere el lock)"""
+        if self._estado == OPEN and agora - self._aberto_em >= self.reset_timeout:
+            self._estado = HALF_OPEN
+            self._sondas_em_curso = 0
+        return self._estado
+
+    def _abrir(self, agora: float):
+        """Abre el circuito (requiere el lock)"""
+        self._estado = OPEN
+        self._aberto_em = agora
+        self._aberturas += 1
+        self._ultima_abertura = datetime.now()
+
+    def permitir(self) -> bool:
+        """
+        Indica si se puede llamar al proveedor, reservando una sonda en estado semiabierto
+
+        Cada llamada permitida debe terminar con registrar_sucesso o registrar_falha.
+
+        Returns:
+            bool: True si la llamada puede realizarse
+        """
+        with self._lock:
+            estado = self._estado_atual(time.monotonic())
+            if estado == CLOSED:
+                return True
+            if estado == HALF_OPEN and self._sondas_em_curso < self.half_open_probes:
+                self._sondas_em_curso += 1
+                return True
+            self._total_rejeitadas += 1
+            return False
+
+    def registrar_sucesso(self):
+        """Registra una llamada correcta y cierra el circuito"""
+        with self._lock:
+            self._total_chamadas += 1
+            self._falhas_consecutivas = 0
+            self._estado = CLOSED
+            self._sondas_em_curso = 0
+
+    def registrar_falha(self, erro: Optional[BaseException] = None):
+        """
+        Registra una llamada fallida; abre el circuito al alcanzar el umbral
+        o si falla una sonda en estado semiabierto
+
+        Args:
+            erro: Excepción producida (para diagnóstico)
+        """
+        with self._lock:
+            agora = time.monotonic()
+            self._total_chamadas += 1
+            self._total_falhas += 1
+            self._falhas_consecutivas += 1
+            if erro is not None:
+                self._ultimo_erro = str(erro)[:200]
+
+            if self._estado == HALF_OPEN or (
+                self._estado == CLOSED and self._falhas_consecutivas >= self.failure_threshold
+            ):
+                self._abrir(agora)
+
+    def call(self, fn: Callable[[], Any], e_falha: Optional[Callable[[BaseException], bool]] = None) -> Any:
+        """
+        Ejecuta fn protegida por el circuito
+
+        Args:
+            fn: Función sin argumentos que llama al proveedor
+            e_falha: Indica si una excepción de fn es un fallo del proveedor
+                (None = todas); las demás se propagan sin contar como fallo
+
+        Returns:
+            Any: Resultado de fn
+
+        Raises:
+            CircuitOpenError: Si el circuito está abierto
+            Exception: La excepción de fn
+        """
+        if not self.permitir():
+            raise CircuitOpenError(f"Circuito {self.nome} aberto")
+
+        try:
+            resultado = fn()
+        except Exception as e:
+            if e_falha is None or e_falha(e):
+                self.registrar_falha(e)
+            else:
+                # El proveedor respondió: la llamada cuenta como correcta
+                self.registrar_sucesso()
+            raise
+
+        self.registrar_sucesso()
+        return resultado
+
+    def reset(self):
+        """Cierra el circuito manualmente"""
+        with self._lock:
+            self._estado = CLOSED
+            self._falhas_consecutivas = 0
+            self._sondas_em_curso = 0
+
+    @property
+    def estado(self) -> str:
+        """Estado actual del circuito"""
+        with self._lock:
+            return self._estado_atual(time.monotonic())
+
+    def stats(self) -> dict:
+        """
+        Obtiene el estado y las métricas del circuito
+
+        Returns:
+            dict: Estado, fallos consecutivos, segundos hasta reintentar y contadores
+        """
+        with self._lock:
+            agora = time.monotonic()
+            estado = self._estado_atual(agora)
+            return {
+                'nome': self.nome,
+                'estado': estado,
+                'falhas_consecutivas': self._falhas_consecutivas,
+                'failure_threshold': self.failure_threshold,
+                'reset_timeout': self.reset_timeout,
+                'reabre_em_s': round(max(self.reset_timeout - (agora - self._aberto_em), 0), 1) if estado == OPEN else 0,
+                'total_chamadas': self._total_chamadas,
+                'total_falhas': self._total_falhas,
+                'total_rejeitadas': self._total_rejeitadas,
+                'aberturas': self._aberturas,
+                'ultima_abertura': self._ultima_abertura,
+                'ultimo_erro': self._ultimo_erro
+            }
+
+
+# Circuito compartido por todas las llamadas al proveedor de datos de mercado del proceso
+market_data_circuit = CircuitBreaker(
+    nome='market_data',
+    **Config.get_circuit_breaker_config()
+)
+
+# Circuito propio de la validación de tickers: los símbolos mal escritos no
+# deben dejar sin cotizaciones al resto de usuarios
+validation_circuit = CircuitBreaker(
+    nome='ticker_validation',
+    **Config.get_circuit_breaker_config()
+)
@@ -0,0 +1,190 @@
+"""
+Cache Columnar de Histórico en Disco
+
+Este módulo guarda el histórico OHLCV diario de cada ticker como un único
+fichero NumPy (.npy) con una fila por columna (fecha, apertura, máximo,
+mínimo, cierre y volumen), de modo que cada columna es contigua en disco.
+
+Los ficheros se leen con memory mapping: extraer una ventana de fechas es un
+slice sobre el mapa (sin copiar datos ni construir objetos ORM), y solo se
+leen de disco las páginas que realmente se usan.
+"""
+
+import os
+import threading
+from datetime import date
+from typing import Dict, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+# Filas del array (cada una es una columna del histórico)
+COLUNAS = ('data', 'abertura', 'maximo', 'minimo', 'fechamento', 'volume')
+DATA, ABERTURA, MAXIMO, MINIMO, FECHAMENTO, VOLUME = range(len(COLUNAS))
+
+# Nombres de columna equivalentes a los DataFrames de yfinance
+COLUNAS_DATAFRAME = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+
+def data_para_dia(data: date) -> int:
+    """Convierte una fecha en días desde 1970-01-01 (formato de la fila de fechas)"""
+    return int(np.datetime64(data, 'D').astype(np.int64))
+
+
+class ColumnarHistoryCache:
+    """Histórico OHLCV por ticker en ficheros .npy leídos con memory mapping"""
+
+    def __init__(self, diretorio: str):
+        """
+        Args:
+            diretorio: Directorio de los ficheros .npy
+        """
+        self.diretorio = diretorio
+        # ticker normalizado -> (mtime del fichero, array mapeado)
+        self._mapas: Dict[str, Tuple[float, np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _chave(ticker: str) -> str:
+        """Ticker normalizado: nombre del fichero y clave de los mapas abiertos"""
+        return ticker.upper().strip()
+
+    def _caminho(self, chave: str) -> str:
+        return os.path.join(self.diretorio, f"{chave}.npy")
+
+    def carregar(self, ticker: str) -> Optional[np.ndarray]:
+        """
+        Obtiene el histórico completo de un ticker mapeado en memoria
+
+        Args:
+            ticker: Símbolo del ticker
+
+        Returns:
+            Optional[np.ndarray]: Array de solo lectura (6, n) o None si no hay fichero
+        """
+        chave = self._chave(ticker)
+        caminho = self._caminho(chave)
+        try:
+            mtime = os.path.getmtime(caminho)
+        except OSError:
+            return None
+
+        with self._lock:
+            mapa = self._mapas.get(chave)
+            if mapa is None or mapa[0] != mtime:
+                mapa = (mtime, np.load(caminho, mmap_mode='r'))
+                self._mapas[chave] = mapa
+            return mapa[1]
+
+    def janela(self, ticker: str, inicio: date, fim: Optional[date] = None) -> Optional[np.ndarray]:
+        """
+        Obtiene la ventana de fechas [inicio, fim] de un ticker sin copiar datos
+
+        Args:
+            ticker: Símbolo del ticker
+            inicio: Primera fecha (incluida)
+            fim: Última fecha (incluida, None = hasta el final)
+
+        Returns:
+            Optional[np.ndarray]: Vista (6, k) sobre el mapa o None si no hay fichero
+        """
+        dados = self.carregar(ticker)
+        if dados is None:
+            return None
+
+        datas = dados[DATA]
+        i = np.searchsorted(datas, data_para_dia(inicio), side='left')
+        j = np.searchsorted(datas, data_para_dia(fim), side='right') if fim else datas.shape[0]
+        return dados[:, i:j]
+
+    def gravar(self, ticker: str, dados: np.ndarray):
+        """
+        Sustituye el histórico de un ticker (escritura atómica)
+
+        Args:
+            ticker: Símbolo del ticker
+            dados: Array (6, n) ordenado por fecha
+        """
+        os.makedirs(self.diretorio, exist_ok=True)
+        chave = self._chave(ticker)
+        caminho = self._caminho(chave)
+        temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporario, 'wb') as f:
+            np.save(f, np.ascontiguousarray(dados, dtype=np.float64))
+        os.replace(temporario, caminho)
+
+        with self._lock:
+            self._mapas.pop(chave, None)
+
+    def mesclar(self, ticker: str, novos: np.ndarray) -> np.ndarray:
+        """
+        Añade al final del histórico las filas nuevas, sustituyendo las fechas solapadas
+
+        Args:
+            ticker: Símbolo del ticker
+            novos: Array (6, k) ordenado por fecha
+
+        Returns:
+            np.ndarray: Histórico resultante
+        """
+        existente = self.carregar(ticker)
+        if existente is not None and novos.shape[1]:
+            corte = np.searchsorted(existente[DATA], novos[DATA, 0], side='left')
+            dados = np.concatenate([existente[:, :corte], novos], axis=1)
+        elif existente is not None:
+            return existente
+        else:
+            dados = novos
+
+        self.gravar(ticker, dados)
+        return dados
+
+    def remover(self, ticker: str):
+        """Elimina el histórico de un ticker"""
+        chave = self._chave(ticker)
+        with self._lock:
+            self._mapas.pop(chave, None)
+        try:
+            os.remove(self._caminho(chave))
+        except OSError:
+            pass
+
+    def stats(self) -> dict:
+        """
+        Obtiene estadísticas del cache en disco
+
+        Returns:
+            dict: Número de tickers, tamaño en disco y mapas abiertos
+        """
+        try:
+            ficheiros = [f for f in os.listdir(self.diretorio) if f.endswith('.npy')]
+        except OSError:
+            ficheiros = []
+
+        return {
+            'diretorio': self.diretorio,
+            'tickers': len(ficheiros),
+            'tamanho_kb': round(sum(
+                os.path.getsize(os.path.join(self.diretorio, f)) for f in ficheiros
+            ) / 1024, 2),
+            'mapas_abertos': len(self._mapas)
+        }
+
+    @staticmethod
+    def para_dataframe(dados: np.ndarray) -> pd.DataFrame:
+        """
+        Convierte un array (6, n) en un DataFrame OHLCV indexado por fecha
+
+        Args:
+            dados: Array o vista con las filas de COLUNAS
+
+        Returns:
+            pd.DataFrame: Columnas Open/High/Low/Close/Volume
+        """
+        if dados is None or dados.shape[1] == 0:
+            return pd.DataFrame()
+
+        indice = pd.DatetimeIndex(dados[DATA].astype('datetime64[D]').astype('datetime64[ns]'), name='Date')
+        return pd.DataFrame(
+            {nome: dados[linha] for nome, linha in zip(COLUNAS_DATAFRAME, range(ABERTURA, VOLUME + 1))},
+            index=indice
+        )
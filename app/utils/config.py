@@ -19,11 +19,42 @@ class Config:
     
     # Cache de cotizaciones
     CACHE_TIMEOUT: int = int(os.getenv("CACHE_TIMEOUT", "300"))  # 5 minutos
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", "5000"))
+    CACHE_MAX_BYTES: int = int(os.getenv("CACHE_MAX_BYTES", "5242880"))  # 5MB
+    CACHE_STALE_WHILE_REVALIDATE: bool = os.getenv("CACHE_STALE_WHILE_REVALIDATE", "true").lower() == "true"
+    CACHE_STALE_MAX_AGE: int = int(os.getenv("CACHE_STALE_MAX_AGE", "3600"))  # 1 hora tras expirar
+    COLUMNAR_CACHE_ENABLED: bool = os.getenv("COLUMNAR_CACHE_ENABLED", "true").lower() == "true"
+    COLUMNAR_CACHE_DIR: str = os.getenv("COLUMNAR_CACHE_DIR", "data/historico")
+    MATRIZ_PRECOS_TTL: int = int(os.getenv("MATRIZ_PRECOS_TTL", "3600"))  # recarga completa de la matriz de precios
+    TICKER_VALIDATION_TTL: int = int(os.getenv("TICKER_VALIDATION_TTL", "2592000"))  # 30 días
+    TICKER_VALIDATION_NEGATIVE_TTL: int = int(os.getenv("TICKER_VALIDATION_NEGATIVE_TTL", "86400"))  # 1 día
+    
+    # Proveedor de datos de mercado ("yahoo" o "replay")
+    MARKET_DATA_PROVIDER: str = os.getenv("MARKET_DATA_PROVIDER", "yahoo")
+    REPLAY_DATA_DIR: str = os.getenv("REPLAY_DATA_DIR", "data/replay")
+    REPLAY_AS_OF: str = os.getenv("REPLAY_AS_OF", "")  # YYYY-MM-DD, vacío = última fecha grabada
+    REPLAY_LATENCY_MS: int = int(os.getenv("REPLAY_LATENCY_MS", "0"))
+    SYMBOL_MASTER_FILE: str = os.getenv("SYMBOL_MASTER_FILE", "data/symbols.csv")  # maestro de símbolos offline
+    
+    # Posiciones
+    COST_BASIS_METHOD: str = os.getenv("COST_BASIS_METHOD", "FIFO").upper()  # FIFO | MEDIO
+    POSITION_SNAPSHOT_EVERY: int = int(os.getenv("POSITION_SNAPSHOT_EVERY", "50"))  # operaciones entre instantáneas
     
     # Yahoo Finance
-    REQUEST_DELAY_MIN: float = float(os.getenv("REQUEST_DELAY_MIN", "1.0"))
-    REQUEST_DELAY_MAX: float = float(os.getenv("REQUEST_DELAY_MAX", "3.0"))
+    YAHOO_RATE_LIMIT: float = float(os.getenv("YAHOO_RATE_LIMIT", "2.0"))  # peticiones/segundo
+    YAHOO_RATE_BURST: int = int(os.getenv("YAHOO_RATE_BURST", "5"))
     YAHOO_TIMEOUT: int = int(os.getenv("YAHOO_TIMEOUT", "15"))
+    QUOTE_FETCH_WORKERS: int = int(os.getenv("QUOTE_FETCH_WORKERS", "8"))
+    
+    # Circuit breaker del proveedor de datos de mercado
+    CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+    CIRCUIT_RESET_TIMEOUT: int = int(os.getenv("CIRCUIT_RESET_TIMEOUT", "60"))  # segundos abierto
+    CIRCUIT_HALF_OPEN_PROBES: int = int(os.getenv("CIRCUIT_HALF_OPEN_PROBES", "1"))
+    
+    # Actualizador de mercado en segundo plano
+    REFRESHER_ENABLED: bool = os.getenv("REFRESHER_ENABLED", "true").lower() == "true"
+    REFRESHER_INTERVAL_OPEN: int = int(os.getenv("REFRESHER_INTERVAL_OPEN", "120"))  # 2 minutos
+    REFRESHER_INTERVAL_CLOSED: int = int(os.getenv("REFRESHER_INTERVAL_CLOSED", "1800"))  # 30 minutos
     
     # Logging
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
@@ -76,16 +107,63 @@ class Config:
     def get_cache_config(cls) -> Dict[str, Any]:
         """Retorna configuración de cache"""
         return {
-            "timeout": cls.CACHE_TIMEOUT
+            "timeout": cls.CACHE_TIMEOUT,
+            "max_entries": cls.CACHE_MAX_ENTRIES,
+            "max_bytes": cls.CACHE_MAX_BYTES,
+            "stale_while_revalidate": cls.CACHE_STALE_WHILE_REVALIDATE,
+            "stale_max_age": cls.CACHE_STALE_MAX_AGE,
+            "columnar_enabled": cls.COLUMNAR_CACHE_ENABLED,
+            "columnar_dir": cls.COLUMNAR_CACHE_DIR,
+            "price_matrix_ttl": cls.MATRIZ_PRECOS_TTL,
+            "ticker_validation_ttl": cls.TICKER_VALIDATION_TTL,
+            "ticker_validation_negative_ttl": cls.TICKER_VALIDATION_NEGATIVE_TTL
+        }
+    
+    @classmethod
+    def get_market_data_config(cls) -> Dict[str, Any]:
+        """Retorna configuración del proveedor de datos de mercado"""
+        return {
+            "provider": cls.MARKET_DATA_PROVIDER,
+            "replay_data_dir": cls.REPLAY_DATA_DIR,
+            "replay_as_of": cls.REPLAY_AS_OF,
+            "replay_latency_ms": cls.REPLAY_LATENCY_MS,
+            "symbol_master_file": cls.SYMBOL_MASTER_FILE
+        }
+    
+    @classmethod
+    def get_positions_config(cls) -> Dict[str, Any]:
+        """Retorna configuración del cálculo de posiciones"""
+        return {
+            "cost_basis_method": cls.COST_BASIS_METHOD,
+            "snapshot_every": cls.POSITION_SNAPSHOT_EVERY
         }
     
     @classmethod
     def get_yahoo_config(cls) -> Dict[str, Any]:
         """Retorna configuración para Yahoo Finance"""
         return {
-            "request_delay_min": cls.REQUEST_DELAY_MIN,
-            "request_delay_max": cls.REQUEST_DELAY_MAX,
-            "timeout": cls.YAHOO_TIMEOUT
+            "rate_limit": cls.YAHOO_RATE_LIMIT,
+            "rate_burst": cls.YAHOO_RATE_BURST,
+            "timeout": cls.YAHOO_TIMEOUT,
+            "fetch_workers": cls.QUOTE_FETCH_WORKERS
+        }
+    
+    @classmethod
+    def get_circuit_breaker_config(cls) -> Dict[str, Any]:
+        """Retorna configuración del circuit breaker del proveedor"""
+        return {
+            "failure_threshold": cls.CIRCUIT_FAILURE_THRESHOLD,
+            "reset_timeout": cls.CIRCUIT_RESET_TIMEOUT,
+            "half_open_probes": cls.CIRCUIT_HALF_OPEN_PROBES
+        }
+    
+    @classmethod
+    def get_refresher_config(cls) -> Dict[str, Any]:
+        """Retorna configuración del actualizador de mercado"""
+        return {
+            "enabled": cls.REFRESHER_ENABLED,
+            "interval_open": cls.REFRESHER_INTERVAL_OPEN,
+            "interval_closed": cls.REFRESHER_INTERVAL_CLOSED
         }
     
     @classmethod
@@ -0,0 +1,187 @@
+"""
+Motor de Lotes y Coste Base
+
+Este módulo mantiene los lotes abiertos de cada activo en una deque (el lote
+más antiguo a la izquierda) y procesa las operaciones en una sola pasada:
+las compras abren un lote y las ventas consumen lotes desde el más antiguo
+(FIFO). El coste que sale de la cartera en cada venta se calcula con el
+método configurado:
+
+    FIFO   el coste de los lotes consumidos
+    MEDIO  la cantidad vendida por el coste medio de la posición
+
+y la diferencia con el importe de la venta es el resultado realizado. El
+resultado no realizado es el valor de mercado menos el coste base abierto.
+"""
+
+from collections import defaultdict, deque
+from typing import Deque, Dict, Iterable, List, Optional
+
+# Métodos de coste base soportados
+METODOS = ('FIFO', 'MEDIO')
+
+
+class CarteiraLotes:
+    """Lotes abiertos, coste base y resultado realizado por activo"""
+
+    def __init__(self, metodo: str = 'FIFO'):
+        """
+        Args:
+            metodo: Método de coste base ('FIFO' o 'MEDIO')
+        """
+        metodo = (metodo or 'FIFO').upper()
+        if metodo not in METODOS:
+            raise ValueError(f"Método de coste base no soportado: {metodo}")
+        self.metodo = metodo
+        self.lotes: Dict[int, Deque[dict]] = defaultdict(deque)
+        self.quantidade: Dict[int, int] = defaultdict(int)
+        self.custo: Dict[int, float] = defaultdict(float)
+        self.realizado: Dict[int, float] = defaultdict(float)
+
+    @classmethod
+    def de_lotes(cls, ativo_id: int, lotes: Iterable[dict], metodo: str = 'FIFO',
+                 custo: Optional[float] = None, realizado: float = 0) -> 'CarteiraLotes':
+        """
+        Crea una cartera con el estado de un activo a partir de sus lotes abiertos guardados
+
+        Args:
+            ativo_id: ID del activo
+            lotes: Lotes abiertos (id, operacao_id, data, quantidade, preco) del más antiguo al más reciente
+            metodo: Método de coste base
+            custo: Coste base abierto guardado (None = suma de los lotes; necesario con MEDIO)
+            realizado: Resultado realizado acumulado
+
+        Returns:
+            CarteiraLotes: Cartera con el estado del activo
+        """
+        carteira = cls(metodo)
+        carteira.restaurar(ativo_id, lotes, custo, realizado)
+        return carteira
+
+    def restaurar(self, ativo_id: int, lotes: Iterable[dict],
+                  custo: Optional[float] = None, realizado: float = 0):
+        """
+        Sustituye el estado de un activo por el de sus lotes abiertos guardados
+
+        Args:
+            ativo_id: ID del activo
+            lotes: Lotes abiertos del más antiguo al más reciente
+            custo: Coste base abierto guardado (None = suma de los lotes)
+            realizado: Resultado realizado acumulado
+        """
+        self.lotes[ativo_id] = deque(dict(lote) for lote in lotes)
+        self.quantidade[ativo_id] = sum(lote['quantidade'] for lote in self.lotes[ativo_id])
+        self.custo[ativo_id] = (
+            sum(lote['quantidade'] * lote['preco'] for lote in self.lotes[ativo_id])
+            if custo is None else custo
+        )
+        self.realizado[ativo_id] = realizado
+
+    def processar(self, operacao: dict) -> dict:
+        """
+        Aplica una operación
+
+        Args:
+            operacao: Operación con id, ativo_id, data, tipo ('compra' o
+                'venta'), quantidade y preco
+
+        Returns:
+            dict: Coste que sale de la cartera ('custo'), resultado realizado
+            ('realizado') y lotes afectados ('lotes': el abierto en una compra,
+            los consumidos en una venta, con su cantidad restante)
+
+        Raises:
+            ValueError: Si la venta supera la cantidad en cartera
+        """
+        ativo_id = operacao['ativo_id']
+        quantidade = operacao['quantidade']
+        preco = float(operacao['preco'])
+        lotes = self.lotes[ativo_id]
+
+        if operacao['tipo'] == 'compra':
+            lote = {
+                'id': None,
+                'operacao_id': operacao['id'],
+                'data': operacao['data'],
+                'quantidade': quantidade,
+                'preco': preco
+            }
+            lotes.append(lote)
+            self.quantidade[ativo_id] += quantidade
+            self.custo[ativo_id] += quantidade * preco
+            return {'custo': 0.0, 'realizado': 0.0, 'lotes': [lote]}
+
+        if quantidade > self.quantidade[ativo_id]:
+            raise ValueError(
+                f"Venta de {quantidade} supera la cantidad en cartera ({self.quantidade[ativo_id]}) "
+                f"del activo {ativo_id}"
+            )
+
+        # Consumir lotes desde el más antiguo
+        restante = quantidade
+        custo_lotes = 0.0
+        consumidos = []
+        while restante > 0:
+            lote = lotes[0]
+            usada = min(restante, lote['quantidade'])
+            custo_lotes += usada * lote['preco']
+            lote['quantidade'] -= usada
+            restante -= usada
+            consumidos.append(lote)
+            if lote['quantidade'] == 0:
+                lotes.popleft()
+
+        if self.metodo == 'MEDIO':
+            custo = self.custo[ativo_id] / self.quantidade[ativo_id] * quantidade
+        else:
+            custo = custo_lotes
+
+        self.quantidade[ativo_id] -= quantidade
+        self.custo[ativo_id] = self.custo[ativo_id] - custo if self.quantidade[ativo_id] else 0.0
+        realizado = quantidade * preco - custo
+        self.realizado[ativo_id] += realizado
+        return {'custo': custo, 'realizado': realizado, 'lotes': consumidos}
+
+    def processar_todas(self, operacoes: Iterable[dict]) -> 'CarteiraLotes':
+        """
+        Aplica operaciones en una sola pasada (ordenadas por fecha dentro de cada activo)
+
+        Args:
+            operacoes: Operaciones a aplicar
+
+        Returns:
+            CarteiraLotes: La propia cartera
+        """
+        for operacao in operacoes:
+            self.processar(operacao)
+        return self
+
+    def ativos(self) -> List[int]:
+        """IDs de los activos con operaciones procesadas"""
+        return sorted(set(self.quantidade) | set(self.realizado))
+
+    def resumo(self, ativo_id: int, preco_atual: Optional[float] = None) -> dict:
+        """
+        Obtiene cantidad, coste base y resultados de un activo
+
+        Args:
+            ativo_id: ID del activo
+            preco_atual: Precio de mercado para el resultado no realizado
+
+        Returns:
+            dict: quantidade, custo_total, preco_medio, resultado_realizado y
+            resultado_nao_realizado (0 sin precio)
+        """
+        quantidade = self.quantidade.get(ativo_id, 0)
+        custo = self.custo.get(ativo_id, 0.0) if quantidade else 0.0
+        return {
+            'quantidade': quantidade,
+            'custo_total': custo,
+            'preco_medio': custo / quantidade if quantidade else 0.0,
+            'resultado_realizado': self.realizado.get(ativo_id, 0.0),
+            'resultado_nao_realizado': quantidade * preco_atual - custo if quantidade and preco_atual else 0.0
+        }
+
+    def lotes_abertos(self, ativo_id: int) -> List[dict]:
+        """Lotes abiertos de un activo, del más antiguo al más reciente"""
+        return list(self.lotes.get(ativo_id, ()))
@@ -0,0 +1,259 @@
+"""
+Serie de Patrimonio de una Cartera
+
+Este módulo calcula la curva diaria de patrimonio (NAV) de una cartera sobre
+arrays NumPy. Las operaciones se guardan como deltas por día de operación
+(día x ticker) y sus sumas acumuladas dan la cantidad en cartera en cada día
+de operación; la cantidad en cualquier sesión se obtiene con una búsqueda
+binaria (searchsorted) y el patrimonio es el producto de esas cantidades por
+la matriz de cierres.
+
+El estado es incremental: las operaciones nuevas solo recalculan las sumas
+acumuladas desde su fecha, y la serie ya calculada se conserva hasta la
+primera sesión afectada, de modo que extenderla con días nuevos solo valora
+las sesiones que faltan. Cuando se guardan o corrigen cierres de sus tickers
+la serie valorada se invalida desde el primer día modificado (ver
+invalidar_precos).
+
+Las fechas se representan como días desde 1970-01-01 (ver data_para_dia).
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+
+
+class SeriePatrimonio:
+    """Cantidades acumuladas por ticker y curva de patrimonio ya calculada de una cartera"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # Invalidación pendiente por cambios de precios (primer día afectado)
+        self._invalidacao_lock = threading.Lock()
+        self._invalidada_desde: Optional[int] = None
+        self.limpar()
+
+    def limpar(self):
+        """Vacía el estado (operaciones y serie valorada)"""
+        with self._lock:
+            self.tickers: List[str] = []
+            self._indice: Dict[str, int] = {}
+
+            # Días con operaciones (ordenados, únicos) y deltas/acumulados por día x ticker
+            self.dias_operacao = np.empty(0, dtype=np.int64)
+            self._deltas = np.empty((0, 0))
+            self._posicoes = np.empty((0, 0))
+
+            # Efectivo neto aportado (compras - ventas) por día de operación y acumulado
+            self._deltas_aporte = np.empty(0)
+            self._aportes = np.empty(0)
+
+            # Precio de la operación que abrió cada ticker, para las sesiones
+            # anteriores a su primer cierre (solo usa precios ya conocidos)
+            self._preco_abertura = np.empty(0)
+            self._dia_abertura = np.empty(0, dtype=np.int64)
+
+            self.ultima_operacao_id = 0
+            self.n_operacoes = 0
+
+            # Serie ya valorada
+            self.dias = np.empty(0, dtype=np.int64)
+            self.patrimonio = np.empty(0)
+            self.investido = np.empty(0)
+
+    def __len__(self) -> int:
+        return self.dias.shape[0]
+
+    @contextmanager
+    def bloqueio(self) -> Iterator['SeriePatrimonio']:
+        """
+        Bloquea la serie durante una secuencia de operaciones que debe ser
+        atómica (aplicar operaciones, extender y leer la ventana)
+
+        Yields:
+            SeriePatrimonio: La propia serie
+        """
+        with self._lock:
+            yield self
+
+    def _garantir_tickers(self, tickers: List[str]):
+        """Añade columnas para los tickers nuevos"""
+        novos = [t for t in dict.fromkeys(tickers) if t not in self._indice]
+        if not novos:
+            return
+        for ticker in novos:
+            self._indice[ticker] = len(self.tickers)
+            self.tickers.append(ticker)
+        extra = ((0, 0), (0, len(novos)))
+        self._deltas = np.pad(self._deltas, extra)
+        self._posicoes = np.pad(self._posicoes, extra)
+        self._preco_abertura = np.pad(self._preco_abertura, (0, len(novos)), constant_values=np.nan)
+        self._dia_abertura = np.pad(self._dia_abertura, (0, len(novos)), constant_values=np.iinfo(np.int64).max)
+
+    def aplicar_operacoes(self, operacoes: List[dict]) -> Optional[int]:
+        """
+        Incorpora operaciones a las cantidades acumuladas
+
+        Args:
+            operacoes: Operaciones con id, ticker, dia, quantidade (con signo:
+                negativa en ventas) y preco
+
+        Returns:
+            Optional[int]: Primer día afectado (None si no había operaciones)
+        """
+        if not operacoes:
+            return None
+
+        with self._lock:
+            self._garantir_tickers([op['ticker'] for op in operacoes])
+
+            colunas = np.array([self._indice[op['ticker']] for op in operacoes], dtype=np.int64)
+            dias = np.array([op['dia'] for op in operacoes], dtype=np.int64)
+            quantidades = np.array([op['quantidade'] for op in operacoes], dtype=np.float64)
+            precos = np.array([op['preco'] for op in operacoes], dtype=np.float64)
+
+            # Nuevo eje de días de operación (unión ordenada) y reubicación de los deltas existentes
+            todos = np.union1d(self.dias_operacao, dias)
+            if todos.shape[0] != self.dias_operacao.shape[0]:
+                deltas = np.zeros((todos.shape[0], len(self.tickers)))
+                deltas_aporte = np.zeros(todos.shape[0])
+                antigas = np.searchsorted(todos, self.dias_operacao)
+                deltas[antigas] = self._deltas
+                deltas_aporte[antigas] = self._deltas_aporte
+                self._deltas, self._deltas_aporte = deltas, deltas_aporte
+
+                posicoes = np.zeros_like(self._deltas)
+                aportes = np.zeros(todos.shape[0])
+                posicoes[antigas] = self._posicoes
+                aportes[antigas] = self._aportes
+                self._posicoes, self._aportes = posicoes, aportes
+                self.dias_operacao = todos
+
+            linhas = np.searchsorted(self.dias_operacao, dias)
+            np.add.at(self._deltas, (linhas, colunas), quantidades)
+            np.add.at(self._deltas_aporte, linhas, quantidades * precos)
+
+            # Recalcular los acumulados solo desde el primer día afectado
+            k = int(linhas.min())
+            base = self._posicoes[k - 1] if k > 0 else 0
+            base_aporte = self._aportes[k - 1] if k > 0 else 0
+            self._posicoes[k:] = base + np.cumsum(self._deltas[k:], axis=0)
+            self._aportes[k:] = base_aporte + np.cumsum(self._deltas_aporte[k:])
+
+            # Precio de apertura: el de la primera operación de cada ticker
+            for coluna, dia, preco in zip(colunas, dias, precos):
+                if dia < self._dia_abertura[coluna]:
+                    self._dia_abertura[coluna] = dia
+                    self._preco_abertura[coluna] = preco
+
+            self.ultima_operacao_id = max(self.ultima_operacao_id, max(int(op['id']) for op in operacoes))
+            self.n_operacoes += len(operacoes)
+
+            # La serie valorada deja de ser válida desde el primer día afectado
+            primeiro = int(dias.min())
+            self.truncar(primeiro)
+            return primeiro
+
+    def truncar(self, dia: int):
+        """Descarta la serie valorada a partir del día indicado (incluido)"""
+        with self._lock:
+            n = int(np.searchsorted(self.dias, dia, side='left'))
+            self.dias = self.dias[:n]
+            self.patrimonio = self.patrimonio[:n]
+            self.investido = self.investido[:n]
+
+    def invalidar_precos(self, alteracoes: Optional[Dict[str, int]] = None):
+        """
+        Marca la serie valorada como inválida desde el primer cierre modificado de sus tickers
+
+        No espera al lock de la serie (puede llamarse desde el hilo que guarda
+        los cierres): se aplica en el siguiente aplicar_invalidacoes.
+
+        Args:
+            alteracoes: Primer día modificado por ticker (None = todos los cierres)
+        """
+        if alteracoes is None:
+            dia = np.iinfo(np.int64).min
+        else:
+            dias = [alteracoes[ticker] for ticker in list(self.tickers) if ticker in alteracoes]
+            if not dias:
+                return
+            dia = min(dias)
+
+        with self._invalidacao_lock:
+            if self._invalidada_desde is None or dia < self._invalidada_desde:
+                self._invalidada_desde = dia
+
+    def aplicar_invalidacoes(self):
+        """Descarta la serie valorada afectada por las invalidaciones pendientes"""
+        with self._lock:
+            with self._invalidacao_lock:
+                dia, self._invalidada_desde = self._invalidada_desde, None
+            if dia is not None:
+                self.truncar(dia)
+
+    def posicoes_em(self, dias: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Obtiene las cantidades en cartera y el efectivo aportado en varios días
+
+        Args:
+            dias: Días de referencia (incluidos)
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (matriz len(dias) x tickers de
+            cantidades, efectivo neto aportado en cada día)
+        """
+        with self._lock:
+            dias = np.asarray(dias, dtype=np.int64)
+            posicoes = np.zeros((dias.shape[0], len(self.tickers)))
+            aportes = np.zeros(dias.shape[0])
+            linhas = np.searchsorted(self.dias_operacao, dias, side='right') - 1
+            validos = linhas >= 0
+            posicoes[validos] = self._posicoes[linhas[validos]]
+            aportes[validos] = self._aportes[linhas[validos]]
+            return posicoes, aportes
+
+    def estender(self, dias: np.ndarray, precos: np.ndarray):
+        """
+        Valora las sesiones nuevas y las añade a la serie
+
+        Las sesiones anteriores o iguales a la última ya valorada se vuelven a
+        valorar (su cierre puede haber cambiado). Los cierres que faltan
+        (sesiones anteriores al primer cierre del ticker) se sustituyen por el
+        precio de la operación que abrió la posición, no por uno posterior.
+
+        Args:
+            dias: Días de las sesiones a valorar (ordenados)
+            precos: Matriz tickers x sesiones con el último cierre conocido
+                (filas en el orden de self.tickers)
+        """
+        dias = np.asarray(dias, dtype=np.int64)
+        with self._lock:
+            if dias.shape[0]:
+                self.truncar(int(dias[0]))
+
+            posicoes, aportes = self.posicoes_em(dias)
+            precos = np.where(np.isnan(precos), self._preco_abertura[:, None], precos)
+            patrimonio = np.nansum(posicoes * precos.T, axis=1)
+
+            self.dias = np.concatenate([self.dias, dias])
+            self.patrimonio = np.concatenate([self.patrimonio, patrimonio])
+            self.investido = np.concatenate([self.investido, aportes])
+
+    def janela(self, inicio: int, fim: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Obtiene la serie valorada en [inicio, fim]
+
+        Args:
+            inicio: Primer día (incluido)
+            fim: Último día (incluido)
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: (días, patrimonio,
+            efectivo neto aportado)
+        """
+        with self._lock:
+            i = np.searchsorted(self.dias, inicio, side='left')
+            j = np.searchsorted(self.dias, fim, side='right')
+            return self.dias[i:j].copy(), self.patrimonio[i:j].copy(), self.investido[i:j].copy()
@@ -0,0 +1,145 @@
+"""
+Motor de Valoración de Carteras
+
+Este módulo valora las posiciones de una cartera sobre arrays NumPy: las
+posiciones se cargan una sola vez como columnas (cantidad, precio medio,
+precio actual, resultados) y todas las métricas (invertido, valor actual,
+rentabilidades, pesos, mejores/peores posiciones y distribución) se calculan
+en una pasada vectorizada, sin convertir Decimal a float posición a posición.
+"""
+
+from typing import Dict, List, Optional
+import numpy as np
+
+
+class AvaliacaoCarteira:
+    """Valoración vectorizada de las posiciones de una cartera"""
+
+    def __init__(self, posicoes: List[dict], user_id: Optional[int] = None):
+        """
+        Args:
+            posicoes: Posiciones con ativo_id, ticker, nome, ativo, quantidade_total,
+                preco_medio, preco_atual, resultado_dia y resultado_acumulado
+            user_id: ID del usuario propietario
+        """
+        self.user_id = user_id
+        self.ativo_ids = np.array([p['ativo_id'] for p in posicoes], dtype=np.int64)
+        self.tickers = [p['ticker'] for p in posicoes]
+        self.nomes = [p.get('nome') or p['ticker'] for p in posicoes]
+        self.ativos = np.array([bool(p.get('ativo', True)) for p in posicoes], dtype=bool)
+
+        def coluna(campo: str) -> np.ndarray:
+            return np.array([p[campo] or 0 for p in posicoes], dtype=np.float64)
+
+        self.quantidade = coluna('quantidade_total')
+        self.preco_medio = coluna('preco_medio')
+        self.preco_atual = coluna('preco_atual')
+        self.resultado_dia = coluna('resultado_dia')
+        self.resultado_acumulado = coluna('resultado_acumulado')
+
+        # Métricas por posición
+        self.investido = self.quantidade * self.preco_medio
+        self.valor_atual = self.quantidade * self.preco_atual
+        self.rentabilidade = np.divide(
+            self.resultado_acumulado * 100, self.investido,
+            out=np.zeros_like(self.investido), where=self.investido > 0
+        )
+
+        # Totales
+        self.total_investido = float(self.investido.sum())
+        self.total_atual = float(self.valor_atual.sum())
+        self.total_resultado_dia = float(self.resultado_dia.sum())
+        self.total_resultado_acumulado = float(self.resultado_acumulado.sum())
+
+        self.pesos = (
+            self.valor_atual / self.total_atual * 100
+            if self.total_atual > 0 else np.zeros_like(self.valor_atual)
+        )
+
+        # Orden por resultado acumulado (mejores primero)
+        self._ordem_resultado = np.argsort(-self.resultado_acumulado, kind='stable')
+
+    def __len__(self) -> int:
+        return self.quantidade.shape[0]
+
+    def resumo(self) -> dict:
+        """
+        Obtiene el resumen de la cartera
+
+        Returns:
+            dict: Totales con el formato de PosicaoService.obter_resumo_portfolio
+        """
+        return {
+            'total_ativos': len(self),
+            'valor_total_investido': self.total_investido,
+            'valor_atual_portfolio': self.total_atual,
+            'resultado_total_dia': self.total_resultado_dia,
+            'resultado_total_acumulado': self.total_resultado_acumulado,
+            'percentual_resultado': (
+                self.total_resultado_acumulado / self.total_investido * 100
+                if self.total_investido > 0 else 0
+            ),
+            'user_id': self.user_id
+        }
+
+    def _linha(self, i: int) -> dict:
+        """Métricas de la posición i como dict"""
+        return {
+            'ativo_id': int(self.ativo_ids[i]),
+            'ticker': self.tickers[i],
+            'nome': self.nomes[i],
+            'ativo': bool(self.ativos[i]),
+            'quantidade_total': int(self.quantidade[i]),
+            'preco_medio': float(self.preco_medio[i]),
+            'preco_atual': float(self.preco_atual[i]),
+            'investido': float(self.investido[i]),
+            'valor_atual': float(self.valor_atual[i]),
+            'resultado_dia': float(self.resultado_dia[i]),
+            'resultado_acumulado': float(self.resultado_acumulado[i]),
+            'rentabilidade': float(self.rentabilidade[i]),
+            'peso': float(self.pesos[i])
+        }
+
+    def posicoes(self) -> List[dict]:
+        """
+        Obtiene las métricas de todas las posiciones ordenadas por resultado acumulado
+
+        Returns:
+            List[dict]: Una fila por posición (mejores primero)
+        """
+        return [self._linha(i) for i in self._ordem_resultado]
+
+    def melhores(self, n: int = 3) -> List[dict]:
+        """Las n posiciones con mayor resultado acumulado"""
+        return [self._linha(i) for i in self._ordem_resultado[:n]]
+
+    def piores(self, n: int = 3) -> List[dict]:
+        """Las n posiciones con menor resultado acumulado (peor primero)"""
+        return [self._linha(i) for i in self._ordem_resultado[::-1][:n]]
+
+    def distribuicao(self, n: Optional[int] = None) -> List[dict]:
+        """
+        Obtiene el peso de cada posición en el valor de la cartera
+
+        Args:
+            n: Número máximo de posiciones (None = todas)
+
+        Returns:
+            List[dict]: Posiciones ordenadas por valor actual (mayor primero)
+        """
+        ordem = np.argsort(-self.valor_atual, kind='stable')
+        return [self._linha(i) for i in ordem[:n]]
+
+    def estatisticas(self) -> Dict[str, float]:
+        """
+        Obtiene los extremos de resultado de la cartera
+
+        Returns:
+            dict: melhor_resultado y pior_resultado (0 si no hay posiciones)
+        """
+        if not len(self):
+            return {'melhor_resultado': 0, 'pior_resultado': 0}
+        return {
+            'melhor_resultado': float(self.resultado_acumulado.max()),
+            'pior_resultado': float(self.resultado_acumulado.min())
+        }
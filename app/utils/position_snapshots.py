@@ -0,0 +1,105 @@
+"""
+Instantáneas de Posiciones
+
+Este módulo define cuándo se guarda una instantánea de una posición y cómo
+se reconstruye la posición en una fecha a partir de ella. Una instantánea
+con fecha D contiene la cantidad, el coste base, el resultado realizado y
+los lotes abiertos tras todas las operaciones del activo con fecha <= D, de
+modo que la posición en cualquier fecha posterior solo necesita reproducir
+las operaciones entre la instantánea y esa fecha.
+
+Se guarda una instantánea cada N operaciones del activo y al cerrar cada mes
+con operaciones, siempre con la fecha de la última operación de un día ya
+completo (el de la operación anterior a una de fecha posterior).
+"""
+
+from collections import defaultdict
+from datetime import date
+from typing import Iterable, List, Optional, Tuple
+from .cost_basis import CarteiraLotes
+
+
+def precisa_snapshot(ultima_data: Optional[date], nova_data: date, operacoes_desde: int, a_cada: int) -> bool:
+    """
+    Indica si antes de aplicar una operación hay que guardar la posición a la fecha de la anterior
+
+    Args:
+        ultima_data: Fecha de la última operación ya aplicada del activo
+        nova_data: Fecha de la operación que se va a aplicar
+        operacoes_desde: Operaciones aplicadas desde la última instantánea
+        a_cada: Número de operaciones entre instantáneas
+
+    Returns:
+        bool: True si se completan a_cada operaciones o termina un mes
+    """
+    if ultima_data is None or not operacoes_desde or nova_data <= ultima_data:
+        return False
+    return operacoes_desde >= a_cada or (ultima_data.year, ultima_data.month) != (nova_data.year, nova_data.month)
+
+
+def serializar_lotes(lotes: Iterable[dict]) -> List[list]:
+    """Lotes abiertos en formato compacto [operacao_id, data ISO, quantidade, preco]"""
+    return [
+        [lote['operacao_id'], lote['data'].isoformat(), lote['quantidade'], round(float(lote['preco']), 4)]
+        for lote in lotes
+    ]
+
+
+def deserializar_lotes(dados: Optional[List[list]]) -> List[dict]:
+    """Inversa de serializar_lotes"""
+    return [
+        {'id': None, 'operacao_id': operacao_id, 'data': date.fromisoformat(data), 'quantidade': quantidade, 'preco': preco}
+        for operacao_id, data, quantidade, preco in dados or []
+    ]
+
+
+def instantanea(carteira: CarteiraLotes, ativo_id: int, data: date) -> dict:
+    """
+    Obtiene la instantánea del estado actual de un activo
+
+    Args:
+        carteira: Cartera con el activo procesado hasta la fecha
+        ativo_id: ID del activo
+        data: Fecha de la instantánea
+
+    Returns:
+        dict: ativo_id, data, quantidade, custo_total, resultado_realizado y lotes
+    """
+    resumo = carteira.resumo(ativo_id)
+    return {
+        'ativo_id': ativo_id,
+        'data': data,
+        'quantidade': resumo['quantidade'],
+        'custo_total': round(resumo['custo_total'], 4),
+        'resultado_realizado': round(resumo['resultado_realizado'], 4),
+        'lotes': serializar_lotes(carteira.lotes_abertos(ativo_id))
+    }
+
+
+def gerar_snapshots(operacoes: Iterable[dict], metodo: str, a_cada: int) -> Tuple[CarteiraLotes, List[dict]]:
+    """
+    Procesa las operaciones en una sola pasada y genera las instantáneas por el camino
+
+    Args:
+        operacoes: Operaciones ordenadas por activo, fecha e id
+        metodo: Método de coste base
+        a_cada: Número de operaciones entre instantáneas
+
+    Returns:
+        Tuple[CarteiraLotes, List[dict]]: (cartera final, instantáneas)
+    """
+    carteira = CarteiraLotes(metodo)
+    snapshots = []
+    ultima_data = {}
+    desde = defaultdict(int)
+
+    for operacao in operacoes:
+        ativo_id = operacao['ativo_id']
+        if precisa_snapshot(ultima_data.get(ativo_id), operacao['data'], desde[ativo_id], a_cada):
+            snapshots.append(instantanea(carteira, ativo_id, ultima_data[ativo_id]))
+            desde[ativo_id] = 0
+        carteira.processar(operacao)
+        ultima_data[ativo_id] = operacao['data']
+        desde[ativo_id] += 1
+
+    return carteira, snapshots
@@ -0,0 +1,217 @@
+"""
+Matriz de Precios en Memoria
+
+Este módulo implementa una matriz de cierres diarios (ticker x sesión) sobre
+arrays NumPy. Las consultas "cierre de estos tickers en la fecha D" y las
+ventanas de precios son operaciones vectorizadas sobre la matriz, sin SQL ni
+objetos ORM por fila.
+
+Las fechas se representan como días desde 1970-01-01 (ver data_para_dia).
+Las celdas sin cierre valen NaN; las consultas "a fecha" usan el último
+cierre conocido hasta esa fecha.
+"""
+
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+# Capacidad inicial de filas (tickers) y columnas (sesiones)
+CAPACIDADE_INICIAL = 64
+
+
+class MatrizPrecos:
+    """Matriz de cierres (ticker x sesión) con actualización in situ y consultas a fecha"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.limpar()
+
+    def limpar(self):
+        """Vacía la matriz"""
+        with self._lock:
+            self._indice: Dict[str, int] = {}
+            self._dias = np.empty(CAPACIDADE_INICIAL, dtype=np.int64)
+            self._fechamentos = np.full((CAPACIDADE_INICIAL, CAPACIDADE_INICIAL), np.nan)
+            self._n_tickers = 0
+            self._n_dias = 0
+            # Matriz con el último cierre conocido propagado (se recalcula al consultar)
+            self._preenchida: Optional[np.ndarray] = None
+
+    # ------------------------------------------------------------------
+    # Estructura (requieren el lock)
+    # ------------------------------------------------------------------
+
+    def _crescer(self, linhas: int, colunas: int):
+        """Amplía la capacidad reservada duplicándola cuando hace falta"""
+        cap_linhas, cap_colunas = self._fechamentos.shape
+        if linhas <= cap_linhas and colunas <= cap_colunas:
+            return
+
+        nova_linhas = max(cap_linhas, CAPACIDADE_INICIAL)
+        while nova_linhas < linhas:
+            nova_linhas *= 2
+        nova_colunas = max(cap_colunas, CAPACIDADE_INICIAL)
+        while nova_colunas < colunas:
+            nova_colunas *= 2
+
+        fechamentos = np.full((nova_linhas, nova_colunas), np.nan)
+        fechamentos[:self._n_tickers, :self._n_dias] = self._fechamentos[:self._n_tickers, :self._n_dias]
+        self._fechamentos = fechamentos
+
+        if nova_colunas > self._dias.shape[0]:
+            dias = np.empty(nova_colunas, dtype=np.int64)
+            dias[:self._n_dias] = self._dias[:self._n_dias]
+            self._dias = dias
+
+    def _linha(self, ticker: str) -> int:
+        """Obtiene (o crea) la fila de un ticker"""
+        linha = self._indice.get(ticker)
+        if linha is None:
+            self._crescer(self._n_tickers + 1, self._n_dias)
+            linha = self._n_tickers
+            self._indice[ticker] = linha
+            self._n_tickers += 1
+        return linha
+
+    def _garantir_dias(self, dias: np.ndarray):
+        """Añade al eje de sesiones los días que no existen"""
+        atuais = self._dias[:self._n_dias]
+        novos = np.setdiff1d(dias, atuais)
+        if novos.shape[0] == 0:
+            return
+
+        self._crescer(self._n_tickers, self._n_dias + novos.shape[0])
+
+        if self._n_dias == 0 or novos[0] > atuais[-1]:
+            # Caso habitual: sesiones nuevas al final, sin mover datos
+            self._dias[self._n_dias:self._n_dias + novos.shape[0]] = novos
+        else:
+            # Sesiones intermedias (relleno de histórico): reordenar columnas
+            todos = np.union1d(atuais, novos)
+            posicoes = np.searchsorted(todos, atuais)
+            fechamentos = np.full(self._fechamentos.shape, np.nan)
+            fechamentos[:self._n_tickers, posicoes] = self._fechamentos[:self._n_tickers, :self._n_dias]
+            self._fechamentos = fechamentos
+            self._dias[:todos.shape[0]] = todos
+
+        self._n_dias += novos.shape[0]
+
+    def _colunas(self, dias: np.ndarray) -> np.ndarray:
+        """Posiciones de días existentes en el eje de sesiones"""
+        return np.searchsorted(self._dias[:self._n_dias], dias)
+
+    def _matriz_preenchida(self) -> np.ndarray:
+        """Matriz con el último cierre conocido propagado hacia delante (vectorizado)"""
+        if self._preenchida is None:
+            valores = self._fechamentos[:self._n_tickers, :self._n_dias]
+            posicoes = np.where(np.isnan(valores), 0, np.arange(self._n_dias))
+            np.maximum.accumulate(posicoes, axis=1, out=posicoes)
+            self._preenchida = valores[np.arange(self._n_tickers)[:, None], posicoes]
+        return self._preenchida
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+
+    def definir_serie(self, ticker: str, dias: np.ndarray, fechamentos: np.ndarray):
+        """
+        Carga (o sustituye) la serie de cierres de un ticker
+
+        Args:
+            ticker: Símbolo del ticker
+            dias: Días de las sesiones (ordenados)
+            fechamentos: Cierres de cada sesión
+        """
+        dias = np.asarray(dias, dtype=np.int64)
+        with self._lock:
+            self._garantir_dias(dias)
+            linha = self._linha(ticker)
+            self._fechamentos[linha, :self._n_dias] = np.nan
+            self._fechamentos[linha, self._colunas(dias)] = fechamentos
+            self._preenchida = None
+
+    def atualizar(self, ticker: str, dia: int, fechamento: float):
+        """
+        Actualiza in situ el cierre de un ticker en una sesión
+
+        Args:
+            ticker: Símbolo del ticker
+            dia: Día de la sesión
+            fechamento: Precio de cierre
+        """
+        with self._lock:
+            self._garantir_dias(np.array([dia], dtype=np.int64))
+            linha = self._linha(ticker)
+            self._fechamentos[linha, self._colunas(np.array([dia]))[0]] = fechamento
+            self._preenchida = None
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+
+    def contem(self, ticker: str) -> bool:
+        """Indica si el ticker está cargado en la matriz"""
+        return ticker in self._indice
+
+    def fechamentos_em(self, tickers: List[str], dia: int) -> np.ndarray:
+        """
+        Obtiene el último cierre conocido de varios tickers en una fecha
+
+        Args:
+            tickers: Lista de símbolos de ticker
+            dia: Día de referencia (incluido)
+
+        Returns:
+            np.ndarray: Cierres en el orden de tickers (NaN si no hay cierre
+            anterior o el ticker no está cargado)
+        """
+        with self._lock:
+            resultado = np.full(len(tickers), np.nan)
+            coluna = np.searchsorted(self._dias[:self._n_dias], dia, side='right') - 1
+            if coluna < 0:
+                return resultado
+
+            linhas = np.array([self._indice.get(t, -1) for t in tickers], dtype=np.int64)
+            validos = linhas >= 0
+            resultado[validos] = self._matriz_preenchida()[linhas[validos], coluna]
+            return resultado
+
+    def janela(self, tickers: List[str], inicio: int, fim: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Obtiene los cierres de varios tickers en las sesiones de [inicio, fim]
+
+        Args:
+            tickers: Lista de símbolos de ticker
+            inicio: Primer día (incluido)
+            fim: Último día (incluido)
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (días de las sesiones, matriz
+            len(tickers) x sesiones con el último cierre conocido)
+        """
+        with self._lock:
+            dias = self._dias[:self._n_dias]
+            i = np.searchsorted(dias, inicio, side='left')
+            j = np.searchsorted(dias, fim, side='right')
+
+            valores = np.full((len(tickers), j - i), np.nan)
+            linhas = np.array([self._indice.get(t, -1) for t in tickers], dtype=np.int64)
+            validos = linhas >= 0
+            valores[validos] = self._matriz_preenchida()[linhas[validos], i:j]
+            return dias[i:j].copy(), valores
+
+    def stats(self) -> dict:
+        """
+        Obtiene estadísticas de la matriz
+
+        Returns:
+            dict: Tickers, sesiones, rango de fechas y memoria reservada
+        """
+        with self._lock:
+            return {
+                'tickers': self._n_tickers,
+                'sessoes': self._n_dias,
+                'primeira_data': str(np.datetime64(int(self._dias[0]), 'D')) if self._n_dias else None,
+                'ultima_data': str(np.datetime64(int(self._dias[self._n_dias - 1]), 'D')) if self._n_dias else None,
+                'memoria_kb': round((self._fechamentos.nbytes + self._dias.nbytes) / 1024, 2)
+            }
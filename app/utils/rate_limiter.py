@@ -0,0 +1,106 @@
+"""
+Limitador de Peticiones (Token Bucket)
+
+Este módulo implementa un limitador de tasa compartido por todo el proceso
+para las llamadas a proveedores externos de datos de mercado. Las llamadas
+solo esperan cuando el presupuesto de peticiones está realmente agotado.
+"""
+
+import threading
+import time
+from .config import Config
+
+
+class TokenBucket:
+    """Limitador token bucket con tasa y ráfaga configurables y métricas de espera"""
+
+    def __init__(self, rate: float, burst: int):
+        """
+        Args:
+            rate: Tokens repuestos por segundo (peticiones/segundo sostenidas)
+            burst: Capacidad máxima del bucket (peticiones en ráfaga)
+        """
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate debe ser > 0 y burst >= 1")
+
+        self.rate = rate
+        self.burst = burst
+
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+        # Métricas
+        self._total_requests = 0
+        self._total_waited = 0
+        self._total_wait_s = 0.0
+        self._max_wait_s = 0.0
+        self._waiting = 0
+
+    def _refill(self, agora: float):
+        """Repone tokens según el tiempo transcurrido (requiere el lock)"""
+        self._tokens = min(self.burst, self._tokens + (agora - self._updated_at) * self.rate)
+        self._updated_at = agora
+
+    def acquire(self, tokens: int = 1) -> float:
+        """
+        Consume tokens del bucket, esperando solo si no hay suficientes
+
+        Cada llamada reserva sus tokens al entrar (el saldo puede quedar
+        negativo), de modo que los llamadores concurrentes se atienden en
+        orden de llegada.
+
+        Args:
+            tokens: Número de tokens a consumir
+
+        Returns:
+            float: Segundos esperados en la cola
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= tokens
+            espera = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+            self._total_requests += 1
+            if espera > 0:
+                self._total_waited += 1
+                self._total_wait_s += espera
+                self._max_wait_s = max(self._max_wait_s, espera)
+                self._waiting += 1
+
+        if espera > 0:
+            try:
+                time.sleep(espera)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+
+        return espera
+
+    def stats(self) -> dict:
+        """
+        Obtiene métricas del limitador
+
+        Returns:
+            dict: Configuración, tokens disponibles y tiempos de espera en cola
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                'rate': self.rate,
+                'burst': self.burst,
+                'tokens_disponiveis': round(max(self._tokens, 0), 2),
+                'total_requests': self._total_requests,
+                'total_waited': self._total_waited,
+                'waiting': self._waiting,
+                'total_wait_s': round(self._total_wait_s, 3),
+                'avg_wait_s': round(self._total_wait_s / self._total_waited, 3) if self._total_waited else 0,
+                'max_wait_s': round(self._max_wait_s, 3)
+            }
+
+
+# Limitador compartido por todas las llamadas a Yahoo Finance del proceso
+yahoo_rate_limiter = TokenBucket(
+    rate=Config.YAHOO_RATE_LIMIT,
+    burst=Config.YAHOO_RATE_BURST
+)
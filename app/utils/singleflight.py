@@ -0,0 +1,137 @@
+"""
+Coalescencia de Peticiones (Single-Flight)
+
+Este módulo permite que varias llamadas concurrentes que piden la misma clave
+esperen a una única ejecución en curso y compartan su resultado, en lugar de
+lanzar peticiones duplicadas al proveedor externo.
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+
+class _Chamada:
+    """Ejecución en curso de una clave"""
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado: Any = None
+        self.erro: Optional[BaseException] = None
+        self.seguidores = 0
+
+
+class SingleFlight:
+    """Agrupa llamadas concurrentes por clave para que solo una llegue al proveedor"""
+
+    def __init__(self, timeout: Optional[float] = None):
+        """
+        Args:
+            timeout: Segundos máximos que un seguidor espera al líder (None = sin límite)
+        """
+        self.timeout = timeout
+        self._chamadas: Dict[Hashable, _Chamada] = {}
+        self._lock = threading.Lock()
+
+        self.lideres = 0
+        self.compartidas = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Ejecuta fn para la clave o espera a la ejecución en curso y comparte su resultado
+
+        Args:
+            key: Clave a coalescer
+            fn: Función sin argumentos que obtiene el resultado
+
+        Returns:
+            Any: Resultado de fn (propio o del líder)
+
+        Raises:
+            Exception: La excepción de fn, también para los seguidores
+        """
+        resultados = self.do_many([key], lambda keys: {key: fn()}, propagar_erros=True)
+        return resultados.get(key)
+
+    def do_many(self, keys: Iterable[Hashable], fn: Callable[[list], Dict[Hashable, Any]],
+                propagar_erros: bool = False) -> Dict[Hashable, Any]:
+        """
+        Versión por lotes: las claves libres se obtienen con una sola llamada a fn
+        y las que ya están en curso se esperan
+
+        Args:
+            keys: Claves solicitadas
+            fn: Función que recibe la lista de claves reclamadas y devuelve un
+                dict clave -> resultado (las claves ausentes se consideran sin datos)
+            propagar_erros: Si True, los errores del líder también se lanzan a
+                los seguidores; si False, sus claves se devuelven sin resultado
+
+        Returns:
+            Dict[Hashable, Any]: Resultados disponibles (sin las claves sin datos)
+
+        Raises:
+            Exception: La excepción de fn si la ejecución propia falla
+        """
+        proprias = []
+        alheias = {}
+
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                chamada = self._chamadas.get(key)
+                if chamada is None:
+                    chamada = _Chamada()
+                    self._chamadas[key] = chamada
+                    proprias.append((key, chamada))
+                else:
+                    chamada.seguidores += 1
+                    alheias[key] = chamada
+            if proprias:
+                self.lideres += 1
+            self.compartidas += len(alheias)
+
+        resultados = {}
+        erro_proprio = None
+
+        if proprias:
+            try:
+                obtidos = fn([key for key, _ in proprias]) or {}
+            except BaseException as e:
+                obtidos = {}
+                erro_proprio = e
+
+            with self._lock:
+                for key, chamada in proprias:
+                    chamada.resultado = obtidos.get(key)
+                    chamada.erro = erro_proprio
+                    del self._chamadas[key]
+                    chamada.evento.set()
+
+            resultados.update({k: v for k, v in obtidos.items() if v is not None})
+
+        for key, chamada in alheias.items():
+            if not chamada.evento.wait(self.timeout):
+                continue
+            if chamada.erro is not None:
+                if propagar_erros:
+                    raise chamada.erro
+                continue
+            if chamada.resultado is not None:
+                resultados[key] = chamada.resultado
+
+        if erro_proprio is not None:
+            raise erro_proprio
+
+        return resultados
+
+    def stats(self) -> dict:
+        """
+        Obtiene métricas de coalescencia
+
+        Returns:
+            dict: Ejecuciones líderes, claves compartidas y claves en curso
+        """
+        with self._lock:
+            return {
+                'lideres': self.lideres,
+                'compartidas': self.compartidas,
+                'em_curso': len(self._chamadas)
+            }
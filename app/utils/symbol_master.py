@@ -0,0 +1,202 @@
+"""
+Maestro de Símbolos Offline
+
+Este módulo carga un fichero maestro de símbolos (ticker, nombre, bolsa y
+moneda) y lo indexa en memoria con arrays ordenados, de modo que la búsqueda
+por prefijo de ticker o de palabra del nombre es una búsqueda binaria
+(bisect) y la validación de un ticker es una consulta a un dict, sin acceder
+a la red.
+
+El fichero es un CSV con cabecera ticker,nome,bolsa,moeda (ver
+gerar_simbolos.py para generarlo a partir de los listados de NASDAQ Trader).
+Si no existe, el maestro se construye con KNOWN_TICKERS.
+"""
+
+import csv
+import difflib
+import os
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from typing import Dict, List, Optional
+from .config import Config, KNOWN_TICKERS
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Columnas del fichero maestro
+CAMPOS = ('ticker', 'nome', 'bolsa', 'moeda')
+
+# Similitud mínima (0-1) para las sugerencias aproximadas de ticker
+CORTE_APROXIMADO = 0.75
+
+
+def normalizar(texto: str) -> str:
+    """Pasa a mayúsculas y elimina acentos para comparar textos"""
+    texto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in texto if not unicodedata.combining(c)).upper().strip()
+
+
+class SymbolMaster:
+    """Maestro de símbolos indexado por ticker y por palabras del nombre"""
+
+    def __init__(self, simbolos: List[dict]):
+        """
+        Args:
+            simbolos: Registros con ticker, nome, bolsa y moeda
+        """
+        self._registros: Dict[str, dict] = {}
+        for simbolo in simbolos:
+            ticker = normalizar(simbolo.get('ticker'))
+            if ticker:
+                self._registros[ticker] = {
+                    'ticker': ticker,
+                    'nome': (simbolo.get('nome') or ticker).strip(),
+                    'bolsa': (simbolo.get('bolsa') or '').strip(),
+                    'moeda': (simbolo.get('moeda') or 'USD').strip()
+                }
+
+        # Tickers ordenados para búsqueda por prefijo
+        self._tickers = sorted(self._registros)
+
+        # Pares (palabra del nombre, ticker) ordenados para búsqueda por prefijo de palabra
+        self._palavras = sorted(
+            (palavra, ticker)
+            for ticker, registro in self._registros.items()
+            for palavra in set(re.findall(r'[A-Z0-9]+', normalizar(registro['nome'])))
+        )
+
+    @classmethod
+    def carregar(cls, caminho: str) -> 'SymbolMaster':
+        """
+        Carga el maestro desde un fichero CSV
+
+        Args:
+            caminho: Ruta del CSV con cabecera ticker,nome,bolsa,moeda
+
+        Returns:
+            SymbolMaster: Maestro indexado
+        """
+        with open(caminho, newline='', encoding='utf-8') as f:
+            return cls(list(csv.DictReader(f)))
+
+    @classmethod
+    def de_tickers_conhecidos(cls) -> 'SymbolMaster':
+        """Construye un maestro mínimo con KNOWN_TICKERS (sin las redirecciones de nombre)"""
+        return cls([
+            {'ticker': ticker, 'nome': nome}
+            for ticker, nome in KNOWN_TICKERS.items()
+            if nome not in KNOWN_TICKERS
+        ])
+
+    def __len__(self) -> int:
+        return len(self._registros)
+
+    def __contains__(self, ticker: str) -> bool:
+        return normalizar(ticker) in self._registros
+
+    def obter(self, ticker: str) -> Optional[dict]:
+        """
+        Obtiene el registro de un ticker
+
+        Args:
+            ticker: Símbolo del ticker
+
+        Returns:
+            Optional[dict]: ticker, nome, bolsa y moeda, o None si no existe
+        """
+        registro = self._registros.get(normalizar(ticker))
+        return dict(registro) if registro else None
+
+    def buscar_prefixo(self, prefixo: str, limite: int = 10) -> List[dict]:
+        """
+        Busca símbolos cuyo ticker o alguna palabra del nombre empieza por el prefijo
+
+        Los tickers coincidentes van primero (el exacto y luego los más
+        cortos), seguidos de las coincidencias por nombre.
+
+        Args:
+            prefixo: Texto buscado
+            limite: Número máximo de resultados
+
+        Returns:
+            List[dict]: Registros encontrados
+        """
+        prefixo = normalizar(prefixo)
+        if not prefixo:
+            return []
+
+        encontrados = []
+        i = bisect_left(self._tickers, prefixo)
+        while i < len(self._tickers) and self._tickers[i].startswith(prefixo):
+            encontrados.append(self._tickers[i])
+            i += 1
+        encontrados.sort(key=lambda t: (t != prefixo, len(t), t))
+
+        vistos = set(encontrados)
+        i = bisect_left(self._palavras, (prefixo,))
+        while i < len(self._palavras) and self._palavras[i][0].startswith(prefixo) and len(encontrados) < limite:
+            ticker = self._palavras[i][1]
+            if ticker not in vistos:
+                vistos.add(ticker)
+                encontrados.append(ticker)
+            i += 1
+
+        return [dict(self._registros[t]) for t in encontrados[:limite]]
+
+    def buscar(self, texto: str, limite: int = 10) -> List[dict]:
+        """
+        Busca símbolos por prefijo y, si no hay suficientes, por similitud de ticker
+
+        Args:
+            texto: Ticker o nombre (o su comienzo)
+            limite: Número máximo de resultados
+
+        Returns:
+            List[dict]: Registros encontrados, los de prefijo primero
+        """
+        resultados = self.buscar_prefixo(texto, limite)
+        if len(resultados) < limite and normalizar(texto):
+            vistos = {r['ticker'] for r in resultados}
+            for ticker in difflib.get_close_matches(normalizar(texto), self._tickers, n=limite, cutoff=CORTE_APROXIMADO):
+                if ticker not in vistos and len(resultados) < limite:
+                    resultados.append(dict(self._registros[ticker]))
+        return resultados
+
+
+# Maestro compartido por el proceso (se carga en el primer uso)
+_maestro: Optional[SymbolMaster] = None
+_maestro_lock = threading.Lock()
+
+
+def get_symbol_master() -> SymbolMaster:
+    """
+    Obtiene el maestro de símbolos del proceso, cargándolo de SYMBOL_MASTER_FILE en el primer uso
+
+    Returns:
+        SymbolMaster: Maestro cargado del fichero o, si no existe, de KNOWN_TICKERS
+    """
+    global _maestro
+    if _maestro is None:
+        with _maestro_lock:
+            if _maestro is None:
+                caminho = Config.SYMBOL_MASTER_FILE
+                if os.path.exists(caminho):
+                    try:
+                        _maestro = SymbolMaster.carregar(caminho)
+                        logger.info(f"Maestro de símbolos cargado de {caminho}: {len(_maestro)} símbolos")
+                    except Exception as e:
+                        logger.error(f"Erro ao carregar maestro de símbolos {caminho}: {e}")
+                if _maestro is None:
+                    _maestro = SymbolMaster.de_tickers_conhecidos()
+                    logger.info(f"Maestro de símbolos não encontrado, usando {len(_maestro)} tickers conhecidos")
+    return _maestro
+
+
+def recarregar_symbol_master() -> SymbolMaster:
+    """Descarta el maestro cargado y lo vuelve a leer del fichero"""
+    global _maestro
+    with _maestro_lock:
+        _maestro = None
+    return get_symbol_master()
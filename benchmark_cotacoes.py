@@ -0,0 +1,75 @@
+"""
+Benchmark de Cotizaciones
+
+Mide el camino de obtención de cotizaciones (descarga en lote, cache y
+peticiones concurrentes) con el proveedor configurado en MARKET_DATA_PROVIDER.
+Con el proveedor de reproducción no se accede a la red:
+
+    MARKET_DATA_PROVIDER=replay REPLAY_DATA_DIR=data/replay python benchmark_cotacoes.py
+
+Para grabar datos reales de Yahoo Finance en el directorio de reproducción:
+
+    python benchmark_cotacoes.py --gravar AAPL MSFT GOOGL --dias 365
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(__file__))
+
+from app.utils import Config, KNOWN_TICKERS
+from app.providers import criar_provider, get_provider, gravar_historicos
+from app.services.cotacao_service import CotacaoService, cotizacoes_cache
+
+
+def medir(nome: str, funcao, repeticoes: int = 1):
+    """Ejecuta una función y muestra el tiempo medio por repetición"""
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        resultado = funcao()
+    duracao = (time.perf_counter() - inicio) / repeticoes
+    print(f"{nome:<45} {duracao * 1000:>10.2f} ms")
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de obtención de cotizaciones")
+    parser.add_argument("tickers", nargs="*", help="Tickers (por defecto, los tickers conocidos)")
+    parser.add_argument("--gravar", action="store_true", help="Grabar históricos de Yahoo Finance en REPLAY_DATA_DIR")
+    parser.add_argument("--dias", type=int, default=30, help="Días de histórico a grabar")
+    parser.add_argument("--sessoes", type=int, default=8, help="Sesiones concurrentes simuladas")
+    args = parser.parse_args()
+
+    # Las entradas cuyo valor es otro ticker son redirecciones de nombres
+    tickers = args.tickers or sorted(t for t, nome in KNOWN_TICKERS.items() if nome not in KNOWN_TICKERS)
+
+    if args.gravar:
+        gravados = gravar_historicos(criar_provider('yahoo'), tickers, args.dias, Config.REPLAY_DATA_DIR)
+        print(f"{gravados} de {len(tickers)} tickers gravados em {Config.REPLAY_DATA_DIR}")
+        return
+
+    print(f"Proveedor: {get_provider().nome} - {len(tickers)} tickers\n")
+
+    cotizacoes_cache.clear()
+    cotacoes = medir("Descarga en lote (cache frío)", lambda: CotacaoService._buscar_cotacoes_provedor(tickers))
+    medir("Lectura de cache (todos los tickers)",
+          lambda: [CotacaoService._obter_do_cache(t) for t in tickers], repeticoes=100)
+
+    cotizacoes_cache.clear()
+    with ThreadPoolExecutor(max_workers=args.sessoes) as executor:
+        medir(f"{args.sessoes} sesiones concurrentes (cache frío)", lambda: list(executor.map(
+            lambda _: CotacaoService._buscar_cotacoes_provedor(tickers), range(args.sessoes)
+        )))
+
+    medir("Histórico de un ticker (30 días)", lambda: CotacaoService.obter_historico(tickers[0], 30))
+
+    print(f"\nCotizaciones obtenidas: {len(cotacoes)} de {len(tickers)}")
+    print(f"Cache: {CotacaoService.get_cache_stats()}")
+    print(f"Coalescencia: {CotacaoService.get_coalescing_stats()}")
+
+
+if __name__ == "__main__":
+    main()
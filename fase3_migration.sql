@@ -111,6 +111,22 @@ ALTER TABLE operacoes ALTER COLUMN user_id SET NOT NULL;
 ALTER TABLE posicoes ALTER COLUMN user_id SET NOT NULL;
 -- precos_diarios puede tener user_id NULL para precios globales
 
+-- Claves foráneas de las tablas creadas por init-db.sql antes de existir users
+DO $$
+BEGIN
+    IF to_regclass('lotes') IS NOT NULL
+            AND NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'lotes_user_id_fkey') THEN
+        ALTER TABLE lotes ADD CONSTRAINT lotes_user_id_fkey
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE;
+    END IF;
+    IF to_regclass('snapshots_posicao') IS NOT NULL
+            AND NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'snapshots_posicao_user_id_fkey') THEN
+        ALTER TABLE snapshots_posicao ADD CONSTRAINT snapshots_posicao_user_id_fkey
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE;
+    END IF;
+END
+$$;
+
 -- Crear función para actualizar timestamp automáticamente
 CREATE OR REPLACE FUNCTION update_updated_at_column()
 RETURNS TRIGGER AS $$
@@ -0,0 +1,104 @@
+"""
+Generador del Maestro de Símbolos
+
+Descarga los listados públicos de valores cotizados de NASDAQ Trader
+(nasdaqlisted.txt y otherlisted.txt: NASDAQ, NYSE, NYSE American, NYSE Arca,
+Cboe BZX, ...) y los guarda en el fichero maestro de símbolos que usa la
+aplicación para autocompletar y validar tickers sin acceder a la red:
+
+    python gerar_simbolos.py                  # escribe SYMBOL_MASTER_FILE
+    python gerar_simbolos.py -o otro.csv
+
+Los tickers de KNOWN_TICKERS se añaden siempre, aunque no aparezcan en los listados.
+"""
+
+import argparse
+import csv
+import os
+import sys
+import urllib.request
+
+sys.path.append(os.path.dirname(__file__))
+
+from app.utils import Config, KNOWN_TICKERS
+from app.utils.symbol_master import CAMPOS
+
+URL_NASDAQ = "https://www.nasdaqtrader.com/dynamic/SymDir/nasdaqlisted.txt"
+URL_OUTROS = "https://www.nasdaqtrader.com/dynamic/SymDir/otherlisted.txt"
+
+# Códigos de bolsa de otherlisted.txt
+BOLSAS = {
+    'A': 'NYSE American',
+    'N': 'NYSE',
+    'P': 'NYSE Arca',
+    'Z': 'Cboe BZX',
+    'V': 'IEX'
+}
+
+
+def ler_listado(url: str) -> list:
+    """Descarga un listado separado por '|' y devuelve sus filas como dicts (sin la línea de pie)"""
+    with urllib.request.urlopen(url, timeout=Config.YAHOO_TIMEOUT * 2) as resposta:
+        linhas = resposta.read().decode('utf-8', errors='replace').splitlines()
+    return [
+        linha for linha in csv.DictReader(linhas, delimiter='|')
+        if not next(iter(linha.values()), '').startswith('File Creation Time')
+    ]
+
+
+def ticker_yahoo(simbolo: str) -> str:
+    """Convierte el símbolo del listado al formato de Yahoo Finance (BRK.B -> BRK-B)"""
+    return simbolo.strip().replace('.', '-')
+
+
+def gerar_simbolos() -> list:
+    """
+    Construye la lista de símbolos a partir de los listados de NASDAQ Trader
+
+    Returns:
+        list: Registros ticker, nome, bolsa y moeda ordenados por ticker
+    """
+    simbolos = {}
+
+    for linha in ler_listado(URL_NASDAQ):
+        if linha.get('Test Issue') == 'Y':
+            continue
+        ticker = ticker_yahoo(linha['Symbol'])
+        simbolos[ticker] = {'ticker': ticker, 'nome': linha['Security Name'], 'bolsa': 'NASDAQ', 'moeda': 'USD'}
+
+    for linha in ler_listado(URL_OUTROS):
+        if linha.get('Test Issue') == 'Y' or '$' in linha['ACT Symbol']:
+            continue
+        ticker = ticker_yahoo(linha['ACT Symbol'])
+        simbolos.setdefault(ticker, {
+            'ticker': ticker,
+            'nome': linha['Security Name'],
+            'bolsa': BOLSAS.get(linha['Exchange'], linha['Exchange']),
+            'moeda': 'USD'
+        })
+
+    for ticker, nome in KNOWN_TICKERS.items():
+        if nome not in KNOWN_TICKERS:
+            simbolos.setdefault(ticker, {'ticker': ticker, 'nome': nome, 'bolsa': '', 'moeda': 'USD'})
+
+    return [simbolos[ticker] for ticker in sorted(simbolos)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera el maestro de símbolos offline")
+    parser.add_argument("-o", "--saida", default=Config.SYMBOL_MASTER_FILE, help="Fichero CSV de salida")
+    args = parser.parse_args()
+
+    simbolos = gerar_simbolos()
+
+    os.makedirs(os.path.dirname(args.saida) or '.', exist_ok=True)
+    with open(args.saida, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=CAMPOS)
+        writer.writeheader()
+        writer.writerows(simbolos)
+
+    print(f"{len(simbolos)} símbolos guardados en {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -47,6 +47,39 @@ CREATE INDEX IF NOT EXISTS idx_precos_ativo_data ON precos_diarios(ativo_id, dat
 
 \echo '✅ Tabla precos_diarios creada/verificada'
 
+-- ============================================================================
+-- TABLA: cotacoes_diarias
+-- Cotizaciones OHLCV diarias por ticker, compartidas entre usuarios
+-- ============================================================================
+CREATE TABLE IF NOT EXISTS cotacoes_diarias (
+    id SERIAL PRIMARY KEY,
+    ticker VARCHAR(10) NOT NULL,
+    data DATE NOT NULL,
+    abertura NUMERIC(12, 4),
+    maximo NUMERIC(12, 4),
+    minimo NUMERIC(12, 4),
+    fechamento NUMERIC(12, 4) NOT NULL,
+    volume BIGINT DEFAULT 0,
+    fonte VARCHAR(20),
+    atualizado_em TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT unique_quote_per_ticker_date UNIQUE (ticker, data)
+);
+
+\echo '✅ Tabla cotacoes_diarias creada/verificada'
+
+-- ============================================================================
+-- TABLA: validacoes_ticker
+-- Cache persistente de validaciones de tickers (encontrados y no encontrados)
+-- ============================================================================
+CREATE TABLE IF NOT EXISTS validacoes_ticker (
+    ticker VARCHAR(20) PRIMARY KEY,
+    encontrado BOOLEAN NOT NULL,
+    nome VARCHAR(200),
+    fonte VARCHAR(20),
+    validado_em TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+\echo '✅ Tabla validacoes_ticker creada/verificada'
+
 -- ============================================================================
 -- TABLA: operacoes
 -- Registra todas las operaciones de compra y venta
@@ -76,9 +109,11 @@ CREATE TABLE IF NOT EXISTS posicoes (
     ativo_id INTEGER NOT NULL UNIQUE REFERENCES ativos(id) ON DELETE CASCADE,
     quantidade_total INTEGER DEFAULT 0,
     preco_medio NUMERIC(12, 4) DEFAULT 0,
+    custo_total NUMERIC(16, 4) DEFAULT 0,
     preco_atual NUMERIC(12, 4) DEFAULT 0,
     resultado_dia NUMERIC(15, 2) DEFAULT 0,
     resultado_acumulado NUMERIC(15, 2) DEFAULT 0,
+    resultado_realizado NUMERIC(16, 4) DEFAULT 0,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -86,6 +121,66 @@ CREATE INDEX IF NOT EXISTS idx_posicoes_ativo_id ON posicoes(ativo_id);
 
 \echo '✅ Tabla posicoes creada/verificada'
 
+-- ============================================================================
+-- TABLA: lotes
+-- Lotes abiertos de compra de cada posición (coste base FIFO)
+-- ============================================================================
+CREATE TABLE IF NOT EXISTS lotes (
+    id SERIAL PRIMARY KEY,
+    ativo_id INTEGER NOT NULL REFERENCES ativos(id) ON DELETE CASCADE,
+    operacao_id INTEGER NOT NULL REFERENCES operacoes(id) ON DELETE CASCADE,
+    data DATE NOT NULL,
+    quantidade INTEGER NOT NULL CHECK (quantidade > 0),
+    preco NUMERIC(12, 4) NOT NULL,
+    user_id INTEGER NOT NULL
+);
+
+-- La tabla users se crea en fase3_migration.sql: la clave foránea se añade
+-- aquí si ya existe y, si no, al ejecutar esa migración
+DO $$
+BEGIN
+    IF to_regclass('users') IS NOT NULL
+            AND NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'lotes_user_id_fkey') THEN
+        ALTER TABLE lotes ADD CONSTRAINT lotes_user_id_fkey
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE;
+    END IF;
+END
+$$;
+
+CREATE INDEX IF NOT EXISTS idx_lotes_user_id ON lotes(user_id);
+CREATE INDEX IF NOT EXISTS idx_lotes_posicao_fifo ON lotes(user_id, ativo_id, data, id);
+
+\echo '✅ Tabla lotes creada/verificada'
+
+-- ============================================================================
+-- TABLA: snapshots_posicao
+-- Instantáneas periódicas de posiciones para consultas a fecha
+-- ============================================================================
+CREATE TABLE IF NOT EXISTS snapshots_posicao (
+    id SERIAL PRIMARY KEY,
+    ativo_id INTEGER NOT NULL REFERENCES ativos(id) ON DELETE CASCADE,
+    data DATE NOT NULL,
+    quantidade INTEGER NOT NULL DEFAULT 0,
+    custo_total NUMERIC(16, 4) DEFAULT 0,
+    resultado_realizado NUMERIC(16, 4) DEFAULT 0,
+    lotes JSON,
+    user_id INTEGER NOT NULL,
+    CONSTRAINT unique_snapshot_per_position_date UNIQUE (user_id, ativo_id, data)
+);
+
+-- Clave foránea a users (ver la tabla lotes)
+DO $$
+BEGIN
+    IF to_regclass('users') IS NOT NULL
+            AND NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'snapshots_posicao_user_id_fkey') THEN
+        ALTER TABLE snapshots_posicao ADD CONSTRAINT snapshots_posicao_user_id_fkey
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE;
+    END IF;
+END
+$$;
+
+\echo '✅ Tabla snapshots_posicao creada/verificada'
+
 -- ============================================================================
 -- FUNCIÓN: Actualizar timestamp
 -- ============================================================================
@@ -142,7 +237,7 @@ ORDER BY tablename;
 
 \echo ''
 \echo '🎉 Base de datos BolsaV1 configurada correctamente!'
-\echo '📝 Tablas: ativos, precos_diarios, operacoes, posicoes'
+\echo '📝 Tablas: ativos, precos_diarios, cotacoes_diarias, validacoes_ticker, operacoes, posicoes, lotes, snapshots_posicao'
 \echo '🔗 Indices y triggers configurados'
 \echo '📈 Datos de ejemplo incluidos'
 \echo ''
\ No newline at end of file
@@ -21,6 +21,7 @@ from app.pages.layout import show_header, show_sidebar, show_footer
 from app.pages.router import route_to_page
 from app.models.base import remove_db_session
 from app.pages.auth import show_login_page, show_register_page
+from app.services.atualizador_service import AtualizadorMercado
 
 
 def configure_streamlit():
@@ -36,6 +37,8 @@ def initialize_application():
         st.error("❌ Error al conectar con la base de datos")
         st.stop()
         return False
+    if Config.REFRESHER_ENABLED and AtualizadorMercado.iniciar():
+        logger.info("Actualizador de mercado en segundo plano iniciado")
     logger.info("Aplicación inicializada correctamente")
     return True
 
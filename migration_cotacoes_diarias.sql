@@ -0,0 +1,36 @@
+-- ============================================================================
+-- MIGRACIÓN: Cotizaciones OHLCV diarias globales (cotacoes_diarias)
+-- BolsaV1
+--
+-- Crea la tabla de cotizaciones compartida entre usuarios y la rellena con los
+-- cierres ya guardados por usuario en precos_diarios (un cierre por ticker y
+-- fecha). Es idempotente: puede ejecutarse varias veces.
+--
+-- Uso: psql $DATABASE_URL -f migration_cotacoes_diarias.sql
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS cotacoes_diarias (
+    id SERIAL PRIMARY KEY,
+    ticker VARCHAR(10) NOT NULL,
+    data DATE NOT NULL,
+    abertura NUMERIC(12, 4),
+    maximo NUMERIC(12, 4),
+    minimo NUMERIC(12, 4),
+    fechamento NUMERIC(12, 4) NOT NULL,
+    volume BIGINT DEFAULT 0,
+    fonte VARCHAR(20),
+    atualizado_em TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT unique_quote_per_ticker_date UNIQUE (ticker, data)
+);
+
+-- Backfill desde precos_diarios: si varios usuarios guardaron el mismo día,
+-- se conserva el cierre guardado más recientemente
+INSERT INTO cotacoes_diarias (ticker, data, fechamento, fonte)
+SELECT DISTINCT ON (a.ticker, p.data)
+    a.ticker, p.data, p.preco_fechamento, 'PRECOS_DIARIOS'
+FROM precos_diarios p
+JOIN ativos a ON a.id = p.ativo_id
+ORDER BY a.ticker, p.data, p.id DESC
+ON CONFLICT (ticker, data) DO NOTHING;
+
+SELECT COUNT(*) AS cotacoes_migradas FROM cotacoes_diarias;
@@ -0,0 +1,34 @@
+-- ============================================================================
+-- MIGRACIÓN: Lotes abiertos y resultado realizado (coste base FIFO)
+-- BolsaV1
+--
+-- Crea la tabla lotes, en la que cada posición guarda sus lotes de compra
+-- abiertos, y añade posicoes.resultado_realizado. Es idempotente: puede
+-- ejecutarse varias veces.
+--
+-- Los lotes de las posiciones existentes se reconstruyen desde sus
+-- operaciones la primera vez que se usan (o con "Actualizar Posiciones").
+--
+-- Uso: psql $DATABASE_URL -f migration_lotes.sql
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS lotes (
+    id SERIAL PRIMARY KEY,
+    ativo_id INTEGER NOT NULL REFERENCES ativos(id) ON DELETE CASCADE,
+    operacao_id INTEGER NOT NULL REFERENCES operacoes(id) ON DELETE CASCADE,
+    data DATE NOT NULL,
+    quantidade INTEGER NOT NULL CHECK (quantidade > 0),
+    preco NUMERIC(12, 4) NOT NULL,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- Tablas creadas por una versión anterior de init-db.sql sin user_id
+ALTER TABLE lotes ADD COLUMN IF NOT EXISTS user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE;
+DROP INDEX IF EXISTS idx_lotes_ativo_id;
+
+CREATE INDEX IF NOT EXISTS idx_lotes_user_id ON lotes(user_id);
+CREATE INDEX IF NOT EXISTS idx_lotes_posicao_fifo ON lotes(user_id, ativo_id, data, id);
+
+ALTER TABLE posicoes ADD COLUMN IF NOT EXISTS resultado_realizado NUMERIC(16, 4) DEFAULT 0;
+
+SELECT COUNT(*) AS lotes_abertos FROM lotes;
@@ -0,0 +1,30 @@
+-- ============================================================================
+-- MIGRACIÓN: Coste acumulado de las posiciones (posicoes.custo_total)
+-- BolsaV1
+--
+-- Añade la columna custo_total, que las posiciones mantienen de forma
+-- incremental al registrar o eliminar operaciones, y la rellena a partir de
+-- las operaciones existentes. Es idempotente: puede ejecutarse varias veces.
+--
+-- Uso: psql $DATABASE_URL -f migration_posicoes_custo_total.sql
+-- ============================================================================
+
+ALTER TABLE posicoes ADD COLUMN IF NOT EXISTS custo_total NUMERIC(16, 4) DEFAULT 0;
+
+-- Recalcular cantidad, coste y precio medio de cada posición desde sus operaciones
+UPDATE posicoes p
+SET quantidade_total = o.quantidade,
+    custo_total = o.custo,
+    preco_medio = CASE WHEN o.quantidade > 0 THEN o.custo / o.quantidade ELSE 0 END
+FROM (
+    SELECT ativo_id,
+           user_id,
+           SUM(CASE WHEN tipo = 'compra' THEN quantidade ELSE -quantidade END) AS quantidade,
+           SUM(CASE WHEN tipo = 'compra' THEN quantidade * preco ELSE -quantidade * preco END) AS custo
+    FROM operacoes
+    GROUP BY ativo_id, user_id
+) o
+WHERE p.ativo_id = o.ativo_id
+  AND p.user_id = o.user_id;
+
+SELECT COUNT(*) AS posicoes_atualizadas FROM posicoes WHERE custo_total IS NOT NULL;
@@ -0,0 +1,45 @@
+-- ============================================================================
+-- MIGRACIÓN: Instantáneas periódicas de posiciones (snapshots_posicao)
+-- BolsaV1
+--
+-- Crea la tabla de instantáneas de cada posición (cada N operaciones y al
+-- cerrar cada mes) usada para reconstruir posiciones en fechas pasadas sin
+-- reproducir todo el histórico. Es idempotente: puede ejecutarse varias veces.
+--
+-- Las instantáneas de las posiciones existentes se generan al pulsar
+-- "Actualizar Posiciones" (o con PosicaoService.atualizar_todas_posicoes).
+--
+-- Uso: psql $DATABASE_URL -f migration_snapshots_posicao.sql
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS snapshots_posicao (
+    id SERIAL PRIMARY KEY,
+    ativo_id INTEGER NOT NULL REFERENCES ativos(id) ON DELETE CASCADE,
+    data DATE NOT NULL,
+    quantidade INTEGER NOT NULL DEFAULT 0,
+    custo_total NUMERIC(16, 4) DEFAULT 0,
+    resultado_realizado NUMERIC(16, 4) DEFAULT 0,
+    lotes JSON,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    CONSTRAINT unique_snapshot_per_position_date UNIQUE (user_id, ativo_id, data)
+);
+
+-- Tablas creadas por una versión anterior de init-db.sql sin user_id y con
+-- la restricción única sin él (las instantáneas se regeneran al actualizar
+-- posiciones, por lo que se descartan)
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'snapshots_posicao' AND column_name = 'user_id'
+    ) THEN
+        DELETE FROM snapshots_posicao;
+        ALTER TABLE snapshots_posicao ADD COLUMN user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE;
+        ALTER TABLE snapshots_posicao DROP CONSTRAINT IF EXISTS unique_snapshot_per_position_date;
+        ALTER TABLE snapshots_posicao ADD CONSTRAINT unique_snapshot_per_position_date
+            UNIQUE (user_id, ativo_id, data);
+    END IF;
+END
+$$;
+
+SELECT COUNT(*) AS instantaneas FROM snapshots_posicao;
@@ -0,0 +1,20 @@
+-- ============================================================================
+-- MIGRACIÓN: Cache persistente de validación de tickers (validacoes_ticker)
+-- BolsaV1
+--
+-- Crea la tabla donde se guarda el resultado de validar un ticker contra el
+-- proveedor de datos de mercado (encontrado o no), compartida entre usuarios.
+-- Es idempotente: puede ejecutarse varias veces.
+--
+-- Uso: psql $DATABASE_URL -f migration_validacoes_ticker.sql
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS validacoes_ticker (
+    ticker VARCHAR(20) PRIMARY KEY,
+    encontrado BOOLEAN NOT NULL,
+    nome VARCHAR(200),
+    fonte VARCHAR(20),
+    validado_em TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+SELECT COUNT(*) AS validacoes_guardadas FROM validacoes_ticker;
@@ -0,0 +1,10 @@
+"""
+Configuración común de las pruebas
+
+Las pruebas usan una base de datos SQLite en memoria: DATABASE_URL debe
+definirse antes de importar app (los modelos crean el engine al importarse).
+"""
+
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
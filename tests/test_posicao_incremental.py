@@ -0,0 +1,109 @@
+"""
+Pruebas del mantenimiento incremental de posiciones y lotes
+
+Una operación con la fecha más reciente del activo debe ajustar solo los
+lotes afectados; la reconstrucción desde las operaciones queda para las
+eliminaciones, las operaciones retroactivas y los lotes inconsistentes.
+"""
+
+from datetime import date
+
+import pytest
+
+from app.models import (
+    Ativo, Base, CotacaoDiaria, Lote, Operacao, Posicao, SessionLocal, SnapshotPosicao, engine
+)
+from app.services.posicao_service import PosicaoService
+
+USER_ID = 1
+TABELAS = [Ativo.__table__, Operacao.__table__, Posicao.__table__, Lote.__table__,
+           CotacaoDiaria.__table__, SnapshotPosicao.__table__]
+
+
+@pytest.fixture
+def ativo_id():
+    Base.metadata.create_all(engine, tables=TABELAS)
+    session = SessionLocal()
+    try:
+        ativo = Ativo(ticker='AAA', nome='Ativo A', user_id=USER_ID)
+        session.add(ativo)
+        session.commit()
+        yield ativo.id
+    finally:
+        session.close()
+        Base.metadata.drop_all(engine, tables=TABELAS)
+
+
+@pytest.fixture
+def reconstrucoes(monkeypatch):
+    """Registra las llamadas a la reconstrucción completa de lotes"""
+    chamadas = []
+    original = PosicaoService._reconstruir_lotes
+
+    def espiar(*args, **kwargs):
+        chamadas.append(args)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(PosicaoService, '_reconstruir_lotes', staticmethod(espiar))
+    return chamadas
+
+
+def _registrar(ativo_id, data, tipo, quantidade, preco) -> int:
+    """Registra una operación como OperacaoService: misma transacción que la posición"""
+    session = SessionLocal()
+    try:
+        operacao = Operacao(ativo_id=ativo_id, data=data, tipo=tipo,
+                            quantidade=quantidade, preco=preco, user_id=USER_ID)
+        session.add(operacao)
+        PosicaoService.aplicar_operacao(session, operacao)
+        session.commit()
+        return operacao.id
+    finally:
+        session.close()
+
+
+def _eliminar(operacao_id):
+    session = SessionLocal()
+    try:
+        operacao = session.get(Operacao, operacao_id)
+        PosicaoService.aplicar_operacao(session, operacao, sinal=-1)
+        session.delete(operacao)
+        session.commit()
+    finally:
+        session.close()
+
+
+def _estado(ativo_id):
+    """Posición y lotes abiertos (cantidad, precio) del activo"""
+    session = SessionLocal()
+    try:
+        posicao = session.query(Posicao).filter(Posicao.ativo_id == ativo_id).one()
+        lotes = session.query(Lote).filter(Lote.ativo_id == ativo_id).order_by(Lote.data, Lote.id).all()
+        return (
+            posicao.quantidade_total,
+            float(posicao.resultado_realizado),
+            [(lote.quantidade, float(lote.preco)) for lote in lotes]
+        )
+    finally:
+        session.close()
+
+
+def test_operaciones_en_la_ultima_fecha_no_reconstruyen(ativo_id, reconstrucoes):
+    _registrar(ativo_id, date(2024, 1, 2), 'compra', 10, 10)
+    _registrar(ativo_id, date(2024, 1, 3), 'compra', 10, 20)
+    _registrar(ativo_id, date(2024, 1, 4), 'venda', 15, 30)
+
+    assert reconstrucoes == []
+    # FIFO: se consume el lote de 10 a 10 y 5 del lote a 20
+    assert _estado(ativo_id) == (5, 15 * 30 - (10 * 10 + 5 * 20), [(5, 20.0)])
+
+
+def test_operacion_retroactiva_y_eliminacion_reconstruyen(ativo_id, reconstrucoes):
+    _registrar(ativo_id, date(2024, 1, 3), 'compra', 10, 20)
+    retroactiva = _registrar(ativo_id, date(2024, 1, 2), 'compra', 10, 10)
+    assert len(reconstrucoes) == 1
+    assert _estado(ativo_id) == (20, 0.0, [(10, 10.0), (10, 20.0)])
+
+    _eliminar(retroactiva)
+    assert len(reconstrucoes) == 2
+    assert _estado(ativo_id) == (10, 0.0, [(10, 20.0)])
@@ -0,0 +1,56 @@
+"""
+Pruebas del proveedor Yahoo Finance
+
+yfinance se sustituye por un doble que devuelve cierres ajustados o sin
+ajustar según auto_adjust, como hace Yahoo Finance.
+"""
+
+import pandas as pd
+import pytest
+
+from app.providers import yahoo
+
+FECHAS = pd.date_range("2024-06-03", periods=3)
+CIERRES = [100.0, 101.0, 102.0]
+FACTOR_AJUSTE = 0.98  # dividendo posterior a las fechas pedidas
+
+
+def _historico(auto_adjust: bool) -> pd.DataFrame:
+    """Histórico de un ticker tal como lo devuelve Yahoo Finance"""
+    cierres = [c * FACTOR_AJUSTE for c in CIERRES] if auto_adjust else CIERRES
+    hist = pd.DataFrame(
+        {"Open": cierres, "High": cierres, "Low": cierres, "Close": cierres, "Volume": 1000},
+        index=FECHAS
+    )
+    if not auto_adjust:
+        hist["Adj Close"] = [c * FACTOR_AJUSTE for c in CIERRES]
+    return hist
+
+
+class _YFinanceFalso:
+    """Doble de yfinance con el valor por defecto auto_adjust=True de Ticker.history"""
+
+    class Ticker:
+        def __init__(self, ticker):
+            self.ticker = ticker
+
+        def history(self, auto_adjust=True, **kwargs):
+            return _historico(auto_adjust)
+
+    @staticmethod
+    def download(tickers, auto_adjust=True, **kwargs):
+        return pd.concat({ticker: _historico(auto_adjust) for ticker in tickers}, axis=1)
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    monkeypatch.setattr(yahoo, "yf", _YFinanceFalso)
+    return yahoo.YahooFinanceProvider()
+
+
+def test_cierre_igual_con_uno_o_varios_tickers(provider):
+    individual = provider.obter_historicos(["AAPL"])["AAPL"]
+    lote = provider.obter_historicos(["AAPL", "MSFT"])["AAPL"]
+
+    pd.testing.assert_series_equal(individual["Close"], lote["Close"])
+    assert individual["Close"].tolist() == CIERRES